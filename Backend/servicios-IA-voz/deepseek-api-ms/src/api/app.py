@@ -1,6 +1,7 @@
 """
 Punto de entrada principal para la API de DeepSeek.
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -11,15 +12,32 @@ from src.api.routes import router as api_router
 from src.api.middlewares.logging_middleware import LoggingMiddleware
 from src.api.middlewares.auth_middleware import APIKeyMiddleware
 from src.config.settings import get_settings
+from src.services.deepseek_service import DeepSeekService
 
 # Obtener configuración
 settings = get_settings()
 
+@asynccontextmanager
+async def ciclo_vida(app: FastAPI):
+    """
+    Crea el servicio DeepSeek compartido al iniciar la aplicación y lo cierra al detenerla.
+
+    Con CALENTAR_CONEXION activo, la conexión con DeepSeek se abre durante el arranque
+    para que la primera solicitud no pague la resolución DNS ni el handshake TLS.
+    """
+    servicio = DeepSeekService()
+    if settings.CALENTAR_CONEXION:
+        await servicio.calentar()
+    app.state.servicio_deepseek = servicio
+    yield
+    await servicio.cerrar()
+
 # Inicialización de la aplicación FastAPI
 app = FastAPI(
     title="DeepSeek API",
     description="API para procesamiento de texto utilizando la API de DeepSeek",
     version="1.0.0",
+    lifespan=ciclo_vida,
 )
 
 # Configuración de CORS
@@ -3,7 +3,7 @@ Controlador para la API de DeepSeek.
 """
 import time
 import logging
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional
 
 from src.services.deepseek_service import DeepSeekService, DeepSeekException
 from src.config.settings import get_settings
@@ -20,10 +20,13 @@ class DeepSeekController:
     """
     
     @staticmethod
-    def verificar_estado() -> Dict[str, Any]:
+    def verificar_estado(servicio: DeepSeekService) -> Dict[str, Any]:
         """
         Verifica el estado del servicio.
         
+        Args:
+            servicio: Servicio DeepSeek de la aplicación
+            
         Returns:
             Diccionario con información del estado del servicio
         """
@@ -31,24 +34,29 @@ class DeepSeekController:
             'estado': 'operativo',
             'mensaje': 'El servicio de procesamiento de texto con DeepSeek está funcionando correctamente',
             'modelo_predeterminado': settings.DEEPSEEK_MODELO,
+            'metricas': servicio.obtener_metricas(),
             'timestamp': time.time()
         }
     
     @staticmethod
-    def procesar_texto(
+    async def procesar_texto(
+        servicio: DeepSeekService,
         texto: str, 
         temperatura: Optional[float] = settings.TEMPERATURA_PREDETERMINADA, 
         max_tokens: Optional[int] = settings.MAX_TOKENS_PREDETERMINADO, 
-        modelo: Optional[str] = settings.DEEPSEEK_MODELO
+        modelo: Optional[str] = settings.DEEPSEEK_MODELO,
+        usar_cache: Optional[bool] = None
     ) -> Dict[str, Any]:
         """
         Procesa texto utilizando la API de DeepSeek.
         
         Args:
+            servicio: Servicio DeepSeek de la aplicación
             texto: Texto a procesar
             temperatura: Nivel de aleatoriedad (0.0 a 1.0)
             max_tokens: Número máximo de tokens a generar
             modelo: Modelo de DeepSeek a utilizar
+            usar_cache: Usar la caché de respuestas (None = solo con temperatura 0)
             
         Returns:
             Diccionario con la respuesta procesada
@@ -57,15 +65,13 @@ class DeepSeekController:
             DeepSeekException: Si ocurre un error en la API
         """
         try:
-            # Crear instancia del servicio
-            servicio = DeepSeekService()
-            
             # Procesar texto
-            resultado = servicio.procesar_texto(
+            resultado = await servicio.procesar_texto(
                 texto=texto,
                 temperatura=temperatura,
                 max_tokens=max_tokens,
-                modelo=modelo
+                modelo=modelo,
+                usar_cache=usar_cache
             )
             
             return resultado
@@ -75,3 +81,45 @@ class DeepSeekController:
         except Exception as e:
             logger.error(f"Error inesperado en el controlador: {str(e)}")
             raise DeepSeekException(f"Error interno del servidor: {str(e)}")
+    
+    @staticmethod
+    async def procesar_texto_stream(
+        servicio: DeepSeekService,
+        texto: str, 
+        temperatura: Optional[float] = settings.TEMPERATURA_PREDETERMINADA, 
+        max_tokens: Optional[int] = settings.MAX_TOKENS_PREDETERMINADO, 
+        modelo: Optional[str] = settings.DEEPSEEK_MODELO,
+        usar_cache: Optional[bool] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Procesa texto utilizando la API de DeepSeek, devolviendo los fragmentos generados.
+        
+        Args:
+            servicio: Servicio DeepSeek de la aplicación
+            texto: Texto a procesar
+            temperatura: Nivel de aleatoriedad (0.0 a 1.0)
+            max_tokens: Número máximo de tokens a generar
+            modelo: Modelo de DeepSeek a utilizar
+            usar_cache: Usar la caché de respuestas (None = solo con temperatura 0)
+            
+        Yields:
+            Eventos de fragmento generado y un evento final con el consumo de tokens
+            
+        Raises:
+            DeepSeekException: Si ocurre un error en la API
+        """
+        try:
+            async for evento in servicio.procesar_texto_stream(
+                texto=texto,
+                temperatura=temperatura,
+                max_tokens=max_tokens,
+                modelo=modelo,
+                usar_cache=usar_cache
+            ):
+                yield evento
+        except DeepSeekException as e:
+            logger.error(f"Error en el procesamiento de texto en streaming: {str(e)}")
+            raise e
+        except Exception as e:
+            logger.error(f"Error inesperado en el controlador: {str(e)}")
+            raise DeepSeekException(f"Error interno del servidor: {str(e)}")
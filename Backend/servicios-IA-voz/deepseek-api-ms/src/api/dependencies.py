@@ -0,0 +1,18 @@
+"""
+Dependencias compartidas por las rutas de la API.
+"""
+from fastapi import Request
+
+from src.services.deepseek_service import DeepSeekService
+
+def obtener_servicio(request: Request) -> DeepSeekService:
+    """
+    Devuelve la instancia del servicio DeepSeek creada en el ciclo de vida de la aplicación.
+
+    Args:
+        request: Solicitud en curso
+
+    Returns:
+        Servicio DeepSeek compartido por todas las solicitudes
+    """
+    return request.app.state.servicio_deepseek
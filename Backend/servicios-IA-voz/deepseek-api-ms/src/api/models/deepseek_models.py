@@ -12,6 +12,7 @@ class ProcesamientoRequest(BaseModel):
     temperatura: Optional[float] = Field(None, description="Nivel de aleatoriedad en la generación (0.0 a 1.0)")
     max_tokens: Optional[int] = Field(None, description="Número máximo de tokens a generar")
     modelo: Optional[str] = Field(None, description="Modelo de DeepSeek a utilizar")
+    cache: Optional[bool] = Field(None, description="Usar la caché de respuestas (por defecto, solo con temperatura 0)")
     
     @validator('texto')
     def texto_no_vacio(cls, v):
@@ -40,6 +41,7 @@ class ProcesamientoResponse(BaseModel):
     tokens_entrada: int = Field(..., description="Número de tokens en el texto de entrada")
     tokens_salida: int = Field(..., description="Número de tokens generados")
     tiempo_proceso: float = Field(..., description="Tiempo de proceso en segundos")
+    desde_cache: bool = Field(False, description="Indica si la respuesta se obtuvo de la caché")
 
 class ErrorResponse(BaseModel):
     """
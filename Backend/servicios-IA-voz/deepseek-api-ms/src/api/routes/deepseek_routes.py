@@ -2,26 +2,31 @@
 Rutas para la API de DeepSeek.
 """
 from fastapi import APIRouter, Body, HTTPException, Depends
-from fastapi.responses import JSONResponse
-from typing import Dict, Any, Optional
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import AsyncIterator, Dict, Any, Optional
+import json
 
 from src.api.controllers.deepseek_controller import DeepSeekController
+from src.api.dependencies import obtener_servicio
 from src.api.models.deepseek_models import ProcesamientoRequest, ProcesamientoResponse, ErrorResponse
-from src.services.deepseek_service import DeepSeekException
+from src.services.deepseek_service import DeepSeekService, DeepSeekException
 
 router = APIRouter(tags=["DeepSeek"])
 
 @router.get("/estado", 
           summary="Verificar estado del servicio",
           response_model=Dict[str, Any])
-async def verificar_estado():
+async def verificar_estado(servicio: DeepSeekService = Depends(obtener_servicio)):
     """
     Verifica el estado actual del servicio de procesamiento de texto.
     
+    Args:
+        servicio: Servicio DeepSeek de la aplicación
+        
     Returns:
         Información sobre el estado del servicio
     """
-    return DeepSeekController.verificar_estado()
+    return DeepSeekController.verificar_estado(servicio)
 
 @router.post("/procesar",
            summary="Procesar texto con DeepSeek", 
@@ -30,12 +35,16 @@ async def verificar_estado():
                400: {"model": ErrorResponse, "description": "Error en la solicitud"},
                500: {"model": ErrorResponse, "description": "Error interno del servidor"}
            })
-async def procesar_texto(request: ProcesamientoRequest):
+async def procesar_texto(
+    request: ProcesamientoRequest,
+    servicio: DeepSeekService = Depends(obtener_servicio)
+):
     """
     Procesa texto utilizando la API de DeepSeek.
     
     Args:
         request: Objeto con el texto a procesar y parámetros opcionales
+        servicio: Servicio DeepSeek de la aplicación
         
     Returns:
         Respuesta con el texto procesado y metadatos
@@ -44,11 +53,13 @@ async def procesar_texto(request: ProcesamientoRequest):
         HTTPException: Si ocurre un error en el procesamiento
     """
     try:
-        resultado = DeepSeekController.procesar_texto(
+        resultado = await DeepSeekController.procesar_texto(
+            servicio,
             texto=request.texto,
             temperatura=request.temperatura,
             max_tokens=request.max_tokens,
-            modelo=request.modelo
+            modelo=request.modelo,
+            usar_cache=request.cache
         )
         
         return ProcesamientoResponse(
@@ -56,7 +67,8 @@ async def procesar_texto(request: ProcesamientoRequest):
             modelo_usado=resultado["modelo_usado"],
             tokens_entrada=resultado["tokens_entrada"],
             tokens_salida=resultado["tokens_salida"],
-            tiempo_proceso=resultado["tiempo_proceso"]
+            tiempo_proceso=resultado["tiempo_proceso"],
+            desde_cache=resultado.get("desde_cache", False)
         )
     except DeepSeekException as e:
         raise HTTPException(
@@ -68,3 +80,86 @@ async def procesar_texto(request: ProcesamientoRequest):
             status_code=500,
             detail={"error": "Error interno del servidor", "detalle": str(e), "codigo": 500}
         )
+
+def _formatear_evento(evento: Dict[str, Any]) -> str:
+    """
+    Convierte un evento del servicio al formato Server-Sent Events.
+    
+    Args:
+        evento: Diccionario con el tipo de evento y sus datos
+        
+    Returns:
+        Evento SSE con el tipo como nombre y el resto de campos como datos JSON
+    """
+    datos = {clave: valor for clave, valor in evento.items() if clave != "tipo"}
+    return f"event: {evento['tipo']}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+async def _emitir_eventos(primer_evento: Dict[str, Any], eventos: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """
+    Emite los eventos SSE de una generación en curso.
+    
+    Una vez enviada la cabecera 200 ya no se puede cambiar el código de estado, así
+    que los errores posteriores al primer fragmento se notifican con un evento `error`.
+    """
+    yield _formatear_evento(primer_evento)
+    try:
+        async for evento in eventos:
+            yield _formatear_evento(evento)
+    except DeepSeekException as e:
+        yield _formatear_evento({"tipo": "error", "error": "Error en el servicio DeepSeek", "detalle": str(e), "codigo": 500})
+
+@router.post("/procesar/stream",
+           summary="Procesar texto con DeepSeek en streaming",
+           response_class=StreamingResponse,
+           responses={
+               200: {
+                   "content": {"text/event-stream": {}},
+                   "description": "Eventos `token` con cada fragmento generado y un evento `fin` con la respuesta completa"
+               },
+               400: {"model": ErrorResponse, "description": "Error en la solicitud"},
+               500: {"model": ErrorResponse, "description": "Error interno del servidor"}
+           })
+async def procesar_texto_stream(
+    request: ProcesamientoRequest,
+    servicio: DeepSeekService = Depends(obtener_servicio)
+):
+    """
+    Procesa texto utilizando la API de DeepSeek y envía los tokens a medida que se generan.
+    
+    La respuesta es un flujo Server-Sent Events: un evento `token` por fragmento y un
+    evento final `fin` con los mismos campos que /procesar más `tiempo_primer_token`.
+    La respuesta empieza en cuanto llega el primer fragmento, de modo que los errores
+    previos (autenticación, límites, conexión) se devuelven como en /procesar.
+    
+    Args:
+        request: Objeto con el texto a procesar y parámetros opcionales
+        servicio: Servicio DeepSeek de la aplicación
+        
+    Returns:
+        Respuesta en streaming con los eventos de la generación
+        
+    Raises:
+        HTTPException: Si ocurre un error antes del primer fragmento
+    """
+    eventos = DeepSeekController.procesar_texto_stream(
+        servicio,
+        texto=request.texto,
+        temperatura=request.temperatura,
+        max_tokens=request.max_tokens,
+        modelo=request.modelo,
+        usar_cache=request.cache
+    )
+    
+    try:
+        primer_evento = await eventos.__anext__()
+    except DeepSeekException as e:
+        raise HTTPException(
+            status_code=500,
+            detail={"error": "Error en el servicio DeepSeek", "detalle": str(e), "codigo": 500}
+        )
+    
+    return StreamingResponse(
+        _emitir_eventos(primer_evento, eventos),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
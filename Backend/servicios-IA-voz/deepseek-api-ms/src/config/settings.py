@@ -14,7 +14,8 @@ class Settings(BaseSettings):
     Configuración de la aplicación basada en variables de entorno.
     
     No se incluyen valores por defecto para garantizar que todas
-    las configuraciones sean explícitamente definidas.
+    las configuraciones sean explícitamente definidas, salvo en los
+    parámetros de ajuste del rendimiento.
     """
     # Servidor
     API_HOST: str = os.getenv("API_HOST")
@@ -39,6 +40,23 @@ class Settings(BaseSettings):
     MAX_REINTENTOS: int = os.getenv("MAX_REINTENTOS")
     TIEMPO_ENTRE_REINTENTOS: int = os.getenv("TIEMPO_ENTRE_REINTENTOS")
     
+    # Pool de conexiones con DeepSeek
+    HTTP2: bool = os.getenv("HTTP2", True)
+    MAX_CONEXIONES: int = os.getenv("MAX_CONEXIONES", 200)
+    MAX_CONEXIONES_KEEPALIVE: int = os.getenv("MAX_CONEXIONES_KEEPALIVE", 50)
+    TIEMPO_KEEPALIVE: float = os.getenv("TIEMPO_KEEPALIVE", 30.0)
+    CALENTAR_CONEXION: bool = os.getenv("CALENTAR_CONEXION", True)
+    
+    # Caché de respuestas
+    CACHE_CAPACIDAD: int = os.getenv("CACHE_CAPACIDAD", 1000)
+    CACHE_TTL: int = os.getenv("CACHE_TTL", 3600)
+    CACHE_RUTA_DISCO: str = os.getenv("CACHE_RUTA_DISCO", "")
+    CACHE_CAPACIDAD_DISCO: int = os.getenv("CACHE_CAPACIDAD_DISCO", 100000)
+    
+    # Agrupación de solicitudes idénticas concurrentes
+    COALESCENCIA_MAX_ESPERAS: int = os.getenv("COALESCENCIA_MAX_ESPERAS", 100)
+    COALESCENCIA_TIEMPO_ESPERA: float = os.getenv("COALESCENCIA_TIEMPO_ESPERA", 60.0)
+    
     model_config = {
         "env_file": ".env",
         "env_prefix": "",
@@ -0,0 +1,247 @@
+"""
+Caché de respuestas de DeepSeek para prompts deterministas.
+
+La clave es un hash de (modelo, texto, temperatura, max_tokens): el mismo prompt
+reenviado con los mismos parámetros devuelve la respuesta guardada sin llamar a la API
+ni consumir tokens. Tiene un nivel en memoria (LRU con TTL) y un nivel opcional en disco
+(SQLite) que sobrevive a los reinicios. El nivel en disco se consulta en un hilo aparte
+para no bloquear el bucle de eventos.
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Número de escrituras en disco entre purgas de entradas expiradas o excedentes
+INTERVALO_PURGA_DISCO = 100
+
+class CacheRespuestas:
+    """
+    Caché LRU con TTL en memoria y nivel opcional en SQLite.
+
+    Cada entrada guarda el texto generado y los tokens que consumió, para poder
+    informar de los tokens ahorrados por los aciertos.
+    """
+
+    def __init__(self, capacidad: int, ttl: float, ruta_disco: str = "", capacidad_disco: int = 100000):
+        """
+        Inicializa la caché.
+
+        Args:
+            capacidad: Número máximo de entradas en memoria (0 = caché desactivada)
+            ttl: Segundos de validez de cada entrada
+            ruta_disco: Ruta al archivo SQLite del nivel en disco (vacío = sin nivel en disco)
+            capacidad_disco: Número máximo de entradas en disco
+        """
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self.ruta_disco = ruta_disco
+        self.capacidad_disco = capacidad_disco
+
+        self._memoria: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._conexion: Optional[sqlite3.Connection] = None
+        # Las consultas en disco se ejecutan en hilos del pool por defecto: una a la vez
+        self._bloqueo_disco = threading.Lock()
+        # Últimos accesos a entradas del disco, pendientes de escribir con la siguiente escritura
+        self._accesos_pendientes: Dict[str, float] = {}
+        self._escrituras_disco = 0
+        self._contadores = {
+            "aciertos_memoria": 0,
+            "aciertos_disco": 0,
+            "fallos": 0,
+            "expulsiones": 0,
+            "tokens_ahorrados": 0
+        }
+
+    @property
+    def activa(self) -> bool:
+        """Indica si la caché está habilitada."""
+        return self.capacidad > 0
+
+    @staticmethod
+    def calcular_clave(modelo: str, texto: str, temperatura: float, max_tokens: int) -> str:
+        """
+        Calcula la clave de un prompt.
+
+        Args:
+            modelo: Modelo de DeepSeek
+            texto: Texto enviado al modelo
+            temperatura: Temperatura de la generación
+            max_tokens: Número máximo de tokens a generar
+
+        Returns:
+            Clave hexadecimal
+        """
+        datos = json.dumps([modelo, texto, float(temperatura), int(max_tokens)], ensure_ascii=False)
+        return hashlib.blake2b(datos.encode(), digest_size=32).hexdigest()
+
+    async def obtener(self, clave: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca una respuesta en la caché.
+
+        Args:
+            clave: Clave calculada con calcular_clave
+
+        Returns:
+            Diccionario con texto_procesado, tokens_entrada y tokens_salida, o None si
+            no está en caché o ha expirado
+        """
+        if not self.activa:
+            return None
+
+        ahora = time.time()
+        entrada = self._memoria.get(clave)
+        if entrada and entrada[1] > ahora:
+            self._memoria.move_to_end(clave)
+            self._contadores["aciertos_memoria"] += 1
+            return self._registrar_acierto(entrada[0])
+        if entrada:
+            del self._memoria[clave]
+
+        entrada = await self._en_hilo(self._leer_disco, clave, ahora)
+        if entrada:
+            self._guardar_memoria(clave, *entrada)
+            self._contadores["aciertos_disco"] += 1
+            return self._registrar_acierto(entrada[0])
+
+        self._contadores["fallos"] += 1
+        return None
+
+    async def guardar(self, clave: str, texto_procesado: str, tokens_entrada: int, tokens_salida: int) -> None:
+        """
+        Guarda una respuesta en la caché.
+
+        Args:
+            clave: Clave calculada con calcular_clave
+            texto_procesado: Texto generado por el modelo
+            tokens_entrada: Tokens del prompt
+            tokens_salida: Tokens generados
+        """
+        if not self.activa:
+            return
+
+        respuesta = {
+            "texto_procesado": texto_procesado,
+            "tokens_entrada": tokens_entrada,
+            "tokens_salida": tokens_salida
+        }
+        expira = time.time() + self.ttl
+        self._guardar_memoria(clave, respuesta, expira)
+        await self._en_hilo(self._escribir_disco, clave, respuesta, expira)
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """
+        Devuelve los contadores de aciertos, fallos y tokens ahorrados.
+
+        Returns:
+            Diccionario con los contadores y la ocupación
+        """
+        consultas = sum(self._contadores[c] for c in ("aciertos_memoria", "aciertos_disco", "fallos"))
+        aciertos = self._contadores["aciertos_memoria"] + self._contadores["aciertos_disco"]
+        return {
+            **self._contadores,
+            "entradas_memoria": len(self._memoria),
+            "tasa_aciertos": aciertos / consultas if consultas else 0.0,
+            "nivel_disco": bool(self.ruta_disco)
+        }
+
+    def cerrar(self) -> None:
+        """Escribe los accesos pendientes y cierra la conexión con el nivel en disco."""
+        with self._bloqueo_disco:
+            if self._conexion:
+                self._escribir_accesos(self._conexion)
+                self._conexion.commit()
+                self._conexion.close()
+                self._conexion = None
+
+    async def _en_hilo(self, funcion: Callable[..., Any], *args: Any) -> Any:
+        """Ejecuta una operación del nivel en disco fuera del bucle de eventos."""
+        if not self.ruta_disco:
+            return None
+        return await asyncio.to_thread(funcion, *args)
+
+    def _registrar_acierto(self, respuesta: Dict[str, Any]) -> Dict[str, Any]:
+        """Suma los tokens que habría consumido la llamada y devuelve una copia de la respuesta."""
+        self._contadores["tokens_ahorrados"] += respuesta["tokens_entrada"] + respuesta["tokens_salida"]
+        return dict(respuesta)
+
+    def _guardar_memoria(self, clave: str, respuesta: Dict[str, Any], expira: float) -> None:
+        """Inserta una entrada en memoria expulsando la menos usada si es necesario."""
+        self._memoria[clave] = (respuesta, expira)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.capacidad:
+            self._memoria.popitem(last=False)
+            self._contadores["expulsiones"] += 1
+
+    def _obtener_conexion(self) -> Optional[sqlite3.Connection]:
+        """Abre la base de datos del nivel en disco la primera vez que se necesita."""
+        if not self.ruta_disco:
+            return None
+        if self._conexion is None:
+            self._conexion = sqlite3.connect(self.ruta_disco, check_same_thread=False)
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute(
+                "CREATE TABLE IF NOT EXISTS respuestas ("
+                "clave TEXT PRIMARY KEY, respuesta TEXT NOT NULL, "
+                "expira REAL NOT NULL, acceso REAL NOT NULL)"
+            )
+            self._conexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_respuestas_acceso ON respuestas (acceso)"
+            )
+        return self._conexion
+
+    def _leer_disco(self, clave: str, ahora: float) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Lee una entrada vigente del nivel en disco.
+
+        El acceso no se escribe aquí: se anota y se guarda con la siguiente escritura,
+        para que un acierto no cueste una transacción.
+        """
+        with self._bloqueo_disco:
+            conexion = self._obtener_conexion()
+            if conexion is None:
+                return None
+            fila = conexion.execute(
+                "SELECT respuesta, expira FROM respuestas WHERE clave = ? AND expira > ?",
+                (clave, ahora)
+            ).fetchone()
+            if not fila:
+                return None
+            self._accesos_pendientes[clave] = ahora
+            return json.loads(fila[0]), fila[1]
+
+    def _escribir_disco(self, clave: str, respuesta: Dict[str, Any], expira: float) -> None:
+        """Escribe una entrada en disco y purga periódicamente las expiradas y las menos usadas."""
+        with self._bloqueo_disco:
+            conexion = self._obtener_conexion()
+            if conexion is None:
+                return
+            ahora = time.time()
+            self._escribir_accesos(conexion)
+            conexion.execute(
+                "INSERT OR REPLACE INTO respuestas (clave, respuesta, expira, acceso) VALUES (?, ?, ?, ?)",
+                (clave, json.dumps(respuesta, ensure_ascii=False), expira, ahora)
+            )
+            # La purga recorre la tabla, así que se hace cada cierto número de escrituras
+            self._escrituras_disco += 1
+            if self._escrituras_disco % INTERVALO_PURGA_DISCO == 0:
+                conexion.execute("DELETE FROM respuestas WHERE expira <= ?", (ahora,))
+                conexion.execute(
+                    "DELETE FROM respuestas WHERE clave IN ("
+                    "SELECT clave FROM respuestas ORDER BY acceso DESC LIMIT -1 OFFSET ?)",
+                    (self.capacidad_disco,)
+                )
+            conexion.commit()
+
+    def _escribir_accesos(self, conexion: sqlite3.Connection) -> None:
+        """Añade a la transacción en curso los accesos anotados por las lecturas."""
+        if self._accesos_pendientes:
+            conexion.executemany(
+                "UPDATE respuestas SET acceso = ? WHERE clave = ?",
+                [(acceso, clave) for clave, acceso in self._accesos_pendientes.items()]
+            )
+            self._accesos_pendientes.clear()
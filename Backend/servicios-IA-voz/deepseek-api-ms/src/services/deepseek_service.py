@@ -1,13 +1,18 @@
 """
 Servicio para interactuar con la API de DeepSeek.
 """
-import requests
+import asyncio
+import importlib.util
+import httpx
+import json
 import logging
 import time
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional
 from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
 
 from src.config.settings import get_settings
+from src.services.cache_respuestas import CacheRespuestas
+from src.services.solicitudes_en_vuelo import SolicitudesEnVuelo
 
 settings = get_settings()
 logger = logging.getLogger("deepseek_api")
@@ -16,117 +21,444 @@ class DeepSeekException(Exception):
     """Excepción personalizada para errores del servicio DeepSeek."""
     pass
 
+def crear_cliente_http() -> httpx.AsyncClient:
+    """
+    Crea el cliente HTTP asíncrono con pool de conexiones hacia DeepSeek.
+
+    Las conexiones se mantienen abiertas (keep-alive) y se reutilizan entre solicitudes,
+    de modo que solo la primera paga la resolución DNS y el handshake TLS. Con HTTP/2
+    todas las solicitudes concurrentes se multiplexan sobre pocas conexiones.
+
+    Returns:
+        Cliente httpx configurado con los límites de la configuración
+    """
+    http2 = settings.HTTP2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP/2 solicitado pero el paquete 'h2' no está instalado; se usará HTTP/1.1")
+        http2 = False
+
+    return httpx.AsyncClient(
+        http2=http2,
+        timeout=httpx.Timeout(settings.REQUEST_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=settings.MAX_CONEXIONES,
+            max_keepalive_connections=settings.MAX_CONEXIONES_KEEPALIVE,
+            keepalive_expiry=settings.TIEMPO_KEEPALIVE
+        )
+    )
+
 class DeepSeekService:
     """
     Servicio para interactuar con la API de DeepSeek.
-    
+
     Proporciona métodos para procesar texto utilizando los modelos de DeepSeek
-    con manejo de errores y reintentos automáticos.
+    con manejo de errores y reintentos automáticos. Las llamadas son asíncronas y
+    comparten un pool de conexiones, por lo que no bloquean el bucle de eventos.
+
+    La aplicación crea una única instancia durante su ciclo de vida, que es dueña
+    del cliente HTTP, de la caché de respuestas, de las llamadas en curso y de las
+    métricas de uso.
     """
-    
-    def __init__(self):
-        """Inicializa el servicio con la configuración de la API."""
+
+    def __init__(
+        self,
+        cliente: Optional[httpx.AsyncClient] = None,
+        cache: Optional[CacheRespuestas] = None,
+        en_vuelo: Optional[SolicitudesEnVuelo] = None
+    ):
+        """
+        Inicializa el servicio con la configuración de la API.
+
+        Args:
+            cliente: Cliente HTTP a utilizar (por defecto, uno nuevo con pool de conexiones)
+            cache: Caché de respuestas (por defecto, la definida en la configuración)
+            en_vuelo: Agrupador de llamadas idénticas (por defecto, el definido en la configuración)
+        """
         self.api_url = settings.DEEPSEEK_API_URL
         self.api_key = settings.DEEPSEEK_API_KEY
         self.default_model = settings.DEEPSEEK_MODELO
         self.default_temperature = settings.TEMPERATURA_PREDETERMINADA
         self.default_max_tokens = settings.MAX_TOKENS_PREDETERMINADO
         self.timeout = settings.REQUEST_TIMEOUT
-    
+        self.cliente = cliente if cliente is not None else crear_cliente_http()
+        self.cache = cache if cache is not None else CacheRespuestas(
+            capacidad=settings.CACHE_CAPACIDAD,
+            ttl=settings.CACHE_TTL,
+            ruta_disco=settings.CACHE_RUTA_DISCO,
+            capacidad_disco=settings.CACHE_CAPACIDAD_DISCO
+        )
+        self.en_vuelo = en_vuelo if en_vuelo is not None else SolicitudesEnVuelo(
+            max_esperas=settings.COALESCENCIA_MAX_ESPERAS,
+            tiempo_espera=settings.COALESCENCIA_TIEMPO_ESPERA
+        )
+        self.metricas = {
+            "solicitudes": 0,
+            "errores": 0,
+            "tokens_entrada": 0,
+            "tokens_salida": 0
+        }
+
+    async def calentar(self) -> None:
+        """
+        Abre la conexión con DeepSeek antes de la primera solicitud.
+
+        Resuelve el DNS y completa el handshake TLS con una consulta ligera al listado
+        de modelos; la conexión queda en el pool para las solicitudes de los usuarios.
+        Un fallo solo se registra: el servicio arranca igualmente.
+        """
+        inicio = time.time()
+        try:
+            response = await self.cliente.get(
+                f"{self.api_url}/v1/models",
+                headers={"Authorization": f"Bearer {self.api_key}"}
+            )
+            logger.info(f"Conexión con DeepSeek preparada en {time.time() - inicio:.2f}s (HTTP {response.status_code})")
+        except httpx.HTTPError as e:
+            logger.warning(f"No se pudo preparar la conexión con DeepSeek: {str(e)}")
+
+    async def cerrar(self) -> None:
+        """Cierra el cliente HTTP, las conexiones abiertas del pool y la caché en disco."""
+        await self.cliente.aclose()
+        self.cache.cerrar()
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """
+        Devuelve los contadores de uso del servicio.
+
+        Returns:
+            Diccionario con solicitudes, errores, tokens consumidos y métricas de la caché
+            y de la agrupación de llamadas
+        """
+        return {
+            **self.metricas,
+            "cache": self.cache.obtener_metricas(),
+            "coalescencia": self.en_vuelo.obtener_metricas()
+        }
+
     @retry(
-        retry=retry_if_exception_type((requests.exceptions.ConnectionError, requests.exceptions.Timeout)),
+        retry=retry_if_exception_type((httpx.TransportError,)),
         stop=stop_after_attempt(settings.MAX_REINTENTOS),
         wait=wait_fixed(settings.TIEMPO_ENTRE_REINTENTOS),
         reraise=True
     )
-    def procesar_texto(
-        self, 
-        texto: str, 
-        temperatura: Optional[float] = settings.TEMPERATURA_PREDETERMINADA, 
-        max_tokens: Optional[int] = settings.MAX_TOKENS_PREDETERMINADO, 
-        modelo: Optional[str] = settings.DEEPSEEK_MODELO
+    async def _enviar(self, payload: Dict[str, Any], stream: bool = False) -> httpx.Response:
+        """
+        Envía la solicitud de chat a DeepSeek, reintentando los errores de conexión y timeout.
+
+        Args:
+            payload: Cuerpo JSON de la solicitud
+            stream: Si es True, devuelve la respuesta sin leer el cuerpo (hay que cerrarla)
+
+        Returns:
+            Respuesta HTTP de la API
+        """
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        solicitud = self.cliente.build_request(
+            "POST",
+            f"{self.api_url}/v1/chat/completions",
+            headers=headers,
+            json=payload
+        )
+        return await self.cliente.send(solicitud, stream=stream)
+
+    def _crear_payload(
+        self,
+        texto: str,
+        temperatura: Optional[float],
+        max_tokens: Optional[int],
+        modelo: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        Prepara el cuerpo de la solicitud, usando los valores por defecto si no se proporcionan.
+
+        Returns:
+            Cuerpo JSON de la solicitud de chat
+        """
+        return {
+            "model": modelo if modelo is not None else self.default_model,
+            "messages": [{"role": "user", "content": texto}],
+            "temperature": temperatura if temperatura is not None else self.default_temperature,
+            "max_tokens": max_tokens if max_tokens is not None else self.default_max_tokens
+        }
+
+    def _clave_respuesta(self, payload: Dict[str, Any], usar_cache: Optional[bool]) -> Optional[str]:
+        """
+        Calcula la clave con la que se comparte la respuesta de una solicitud.
+
+        La respuesta se guarda en la caché y se comparte con las solicitudes idénticas
+        concurrentes. Por defecto solo se comparten las solicitudes con temperatura 0,
+        cuya respuesta es determinista; usar_cache=True lo fuerza con cualquier
+        temperatura y False lo evita.
+
+        Args:
+            payload: Cuerpo JSON de la solicitud
+            usar_cache: Preferencia explícita del cliente (None = según la temperatura)
+
+        Returns:
+            Clave de la respuesta, o None si no se debe compartir
+        """
+        if usar_cache is None:
+            usar_cache = payload["temperature"] == 0
+        if not usar_cache:
+            return None
+        return CacheRespuestas.calcular_clave(
+            payload["model"], payload["messages"][0]["content"], payload["temperature"], payload["max_tokens"]
+        )
+
+    def _convertir_error(self, e: Exception) -> DeepSeekException:
+        """
+        Registra un error de la llamada a DeepSeek y lo convierte en DeepSeekException.
+
+        Args:
+            e: Excepción capturada
+
+        Returns:
+            Excepción a lanzar
+        """
+        self.metricas["errores"] += 1
+        if isinstance(e, DeepSeekException):
+            return e
+        if isinstance(e, httpx.TimeoutException):
+            logger.error(f"Timeout en la conexión con la API de DeepSeek: {str(e)}")
+            return DeepSeekException(f"Timeout en la conexión con la API de DeepSeek")
+        if isinstance(e, httpx.TransportError):
+            logger.error(f"Error de conexión con la API de DeepSeek: {str(e)}")
+            return DeepSeekException(f"Error de conexión con la API de DeepSeek: {str(e)}")
+        if isinstance(e, httpx.HTTPError):
+            logger.error(f"Error en la solicitud a la API de DeepSeek: {str(e)}")
+            return DeepSeekException(f"Error en la solicitud a la API de DeepSeek: {str(e)}")
+        logger.error(f"Error inesperado al procesar texto: {str(e)}")
+        return DeepSeekException(f"Error inesperado al procesar texto: {str(e)}")
+
+    async def procesar_texto(
+        self,
+        texto: str,
+        temperatura: Optional[float] = settings.TEMPERATURA_PREDETERMINADA,
+        max_tokens: Optional[int] = settings.MAX_TOKENS_PREDETERMINADO,
+        modelo: Optional[str] = settings.DEEPSEEK_MODELO,
+        usar_cache: Optional[bool] = None
     ) -> Dict[str, Any]:
         """
         Procesa texto utilizando la API de DeepSeek.
-        
+
         Args:
             texto: Texto a procesar
             temperatura: Nivel de aleatoriedad (0.0 a 1.0)
             max_tokens: Número máximo de tokens a generar
             modelo: Modelo de DeepSeek a utilizar
-            
+            usar_cache: Usar la caché de respuestas (None = solo con temperatura 0)
+
         Returns:
-            Diccionario con la respuesta procesada
-            
+            Diccionario con la respuesta procesada; desde_cache indica si se obtuvo de la caché
+
         Raises:
             DeepSeekException: Si ocurre un error en la API
         """
-        # Usar valores por defecto si no se proporcionan
-        temperatura_final = temperatura if temperatura is not None else self.default_temperature
-        max_tokens_final = max_tokens if max_tokens is not None else self.default_max_tokens
-        modelo_final = modelo if modelo is not None else self.default_model
-        
+        payload = self._crear_payload(texto, temperatura, max_tokens, modelo)
+        modelo_final = payload["model"]
+
         # Registrar inicio de la solicitud
         inicio = time.time()
-        logger.info(f"Procesando texto con modelo {modelo_final}, temperatura {temperatura_final}")
-        
-        try:
-            # Preparar la solicitud a DeepSeek
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "model": modelo_final,
-                "messages": [{"role": "user", "content": texto}],
-                "temperature": temperatura_final,
-                "max_tokens": max_tokens_final
+        self.metricas["solicitudes"] += 1
+
+        # Devolver la respuesta guardada si el mismo prompt ya se procesó
+        clave = self._clave_respuesta(payload, usar_cache)
+        en_cache = await self.cache.obtener(clave) if clave else None
+        if en_cache:
+            logger.info(f"Respuesta obtenida de la caché para el modelo {modelo_final}")
+            return {
+                "texto_procesado": en_cache["texto_procesado"],
+                "modelo_usado": modelo_final,
+                "tokens_entrada": en_cache["tokens_entrada"],
+                "tokens_salida": en_cache["tokens_salida"],
+                "tiempo_proceso": time.time() - inicio,
+                "desde_cache": True
             }
-            
+
+        if clave is None:
+            return await self._solicitar(payload, inicio, clave)
+
+        # Las solicitudes idénticas concurrentes comparten la llamada en curso
+        try:
+            resultado = await self.en_vuelo.ejecutar(clave, lambda: self._solicitar(payload, inicio, clave))
+        except asyncio.TimeoutError:
+            self.metricas["errores"] += 1
+            logger.error(f"Timeout esperando la respuesta de una solicitud idéntica en curso ({modelo_final})")
+            raise DeepSeekException("Timeout esperando la respuesta de una solicitud idéntica en curso")
+        return dict(resultado)
+
+    async def _solicitar(self, payload: Dict[str, Any], inicio: float, clave: Optional[str]) -> Dict[str, Any]:
+        """
+        Llama a la API de DeepSeek y guarda la respuesta en la caché si tiene clave.
+
+        Args:
+            payload: Cuerpo JSON de la solicitud
+            inicio: Momento en que se recibió la solicitud
+            clave: Clave de la respuesta, o None si no se comparte
+
+        Returns:
+            Diccionario con la respuesta procesada
+
+        Raises:
+            DeepSeekException: Si ocurre un error en la API
+        """
+        modelo_final = payload["model"]
+        logger.info(f"Procesando texto con modelo {modelo_final}, temperatura {payload['temperature']}")
+
+        try:
             # Realizar la solicitud a la API
-            response = requests.post(
-                f"{self.api_url}/v1/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=self.timeout
-            )
-            
+            response = await self._enviar(payload)
+
             # Verificar respuesta
             if response.status_code != 200:
-                error_detail = response.json() if response.content else "Sin detalles"
+                error_detail = response.text or "Sin detalles"
                 logger.error(f"Error en la API de DeepSeek: {response.status_code} - {error_detail}")
                 raise DeepSeekException(f"Error en la API de DeepSeek: {response.status_code}")
-            
+
             # Procesar respuesta
             respuesta_json = response.json()
             texto_procesado = respuesta_json["choices"][0]["message"]["content"]
             tokens_entrada = respuesta_json["usage"]["prompt_tokens"]
             tokens_salida = respuesta_json["usage"]["completion_tokens"]
-            
+
             # Calcular tiempo de proceso
             tiempo_proceso = time.time() - inicio
-            
+            self.metricas["tokens_entrada"] += tokens_entrada
+            self.metricas["tokens_salida"] += tokens_salida
+
             # Registrar éxito
             logger.info(f"Texto procesado exitosamente en {tiempo_proceso:.2f}s - Tokens E/S: {tokens_entrada}/{tokens_salida}")
-            
+            if clave:
+                await self.cache.guardar(clave, texto_procesado, tokens_entrada, tokens_salida)
+
             return {
                 "texto_procesado": texto_procesado,
                 "modelo_usado": modelo_final,
                 "tokens_entrada": tokens_entrada,
                 "tokens_salida": tokens_salida,
-                "tiempo_proceso": tiempo_proceso
+                "tiempo_proceso": tiempo_proceso,
+                "desde_cache": False
             }
-            
-        except requests.exceptions.ConnectionError as e:
-            logger.error(f"Error de conexión con la API de DeepSeek: {str(e)}")
-            raise DeepSeekException(f"Error de conexión con la API de DeepSeek: {str(e)}")
-        except requests.exceptions.Timeout as e:
-            logger.error(f"Timeout en la conexión con la API de DeepSeek: {str(e)}")
-            raise DeepSeekException(f"Timeout en la conexión con la API de DeepSeek")
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error en la solicitud a la API de DeepSeek: {str(e)}")
-            raise DeepSeekException(f"Error en la solicitud a la API de DeepSeek: {str(e)}")
+
+        except Exception as e:
+            raise self._convertir_error(e)
+
+    async def procesar_texto_stream(
+        self,
+        texto: str,
+        temperatura: Optional[float] = settings.TEMPERATURA_PREDETERMINADA,
+        max_tokens: Optional[int] = settings.MAX_TOKENS_PREDETERMINADO,
+        modelo: Optional[str] = settings.DEEPSEEK_MODELO,
+        usar_cache: Optional[bool] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Procesa texto con DeepSeek devolviendo los fragmentos a medida que se generan.
+
+        La solicitud se envía con `stream: true` y se leen los eventos SSE de la API.
+        El último evento incluye el consumo de tokens que DeepSeek envía al final.
+
+        Args:
+            texto: Texto a procesar
+            temperatura: Nivel de aleatoriedad (0.0 a 1.0)
+            max_tokens: Número máximo de tokens a generar
+            modelo: Modelo de DeepSeek a utilizar
+            usar_cache: Usar la caché de respuestas (None = solo con temperatura 0)
+
+        Yields:
+            Eventos {"tipo": "token", "texto": ...} con cada fragmento generado y un
+            evento final {"tipo": "fin", ...} con los campos de la respuesta completa
+            y el tiempo hasta el primer fragmento
+
+        Raises:
+            DeepSeekException: Si ocurre un error en la API
+        """
+        payload = self._crear_payload(texto, temperatura, max_tokens, modelo)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        modelo_final = payload["model"]
+
+        # Registrar inicio de la solicitud
+        inicio = time.time()
+        tiempo_primer_token = None
+        self.metricas["solicitudes"] += 1
+
+        # Con la respuesta en caché, se envía completa en un único fragmento
+        clave = self._clave_respuesta(payload, usar_cache)
+        en_cache = await self.cache.obtener(clave) if clave else None
+        if en_cache:
+            logger.info(f"Respuesta obtenida de la caché para el modelo {modelo_final}")
+            yield {"tipo": "token", "texto": en_cache["texto_procesado"]}
+            tiempo_proceso = time.time() - inicio
+            yield {
+                "tipo": "fin",
+                "texto_procesado": en_cache["texto_procesado"],
+                "modelo_usado": modelo_final,
+                "tokens_entrada": en_cache["tokens_entrada"],
+                "tokens_salida": en_cache["tokens_salida"],
+                "tiempo_proceso": tiempo_proceso,
+                "tiempo_primer_token": tiempo_proceso,
+                "desde_cache": True
+            }
+            return
+
+        logger.info(f"Procesando texto en streaming con modelo {modelo_final}, temperatura {payload['temperature']}")
+
+        try:
+            response = await self._enviar(payload, stream=True)
+            try:
+                if response.status_code != 200:
+                    error_detail = (await response.aread()).decode(errors="replace") or "Sin detalles"
+                    logger.error(f"Error en la API de DeepSeek: {response.status_code} - {error_detail}")
+                    raise DeepSeekException(f"Error en la API de DeepSeek: {response.status_code}")
+
+                fragmentos = []
+                uso = {}
+                async for linea in response.aiter_lines():
+                    if not linea.startswith("data:"):
+                        continue
+                    datos = linea[len("data:"):].strip()
+                    if datos == "[DONE]":
+                        break
+
+                    evento = json.loads(datos)
+                    uso = evento.get("usage") or uso
+                    for opcion in evento.get("choices", []):
+                        contenido = (opcion.get("delta") or {}).get("content")
+                        if contenido:
+                            if tiempo_primer_token is None:
+                                tiempo_primer_token = time.time() - inicio
+                            fragmentos.append(contenido)
+                            yield {"tipo": "token", "texto": contenido}
+            finally:
+                await response.aclose()
+
+            texto_procesado = "".join(fragmentos)
+            tokens_entrada = uso.get("prompt_tokens", 0)
+            tokens_salida = uso.get("completion_tokens", 0)
+            tiempo_proceso = time.time() - inicio
+            self.metricas["tokens_entrada"] += tokens_entrada
+            self.metricas["tokens_salida"] += tokens_salida
+            if clave:
+                await self.cache.guardar(clave, texto_procesado, tokens_entrada, tokens_salida)
+
+            logger.info(
+                f"Texto procesado en streaming en {tiempo_proceso:.2f}s "
+                f"(primer token: {tiempo_primer_token or 0:.2f}s) - Tokens E/S: {tokens_entrada}/{tokens_salida}"
+            )
+
+            yield {
+                "tipo": "fin",
+                "texto_procesado": texto_procesado,
+                "modelo_usado": modelo_final,
+                "tokens_entrada": tokens_entrada,
+                "tokens_salida": tokens_salida,
+                "tiempo_proceso": tiempo_proceso,
+                "tiempo_primer_token": tiempo_primer_token,
+                "desde_cache": False
+            }
+
         except Exception as e:
-            logger.error(f"Error inesperado al procesar texto: {str(e)}")
-            raise DeepSeekException(f"Error inesperado al procesar texto: {str(e)}")
+            raise self._convertir_error(e)
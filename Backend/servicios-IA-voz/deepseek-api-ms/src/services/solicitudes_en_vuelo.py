@@ -0,0 +1,108 @@
+"""
+Agrupación de llamadas idénticas concurrentes a DeepSeek (single-flight).
+
+Cuando muchos usuarios envían a la vez el mismo prompt, solo la primera solicitud
+llama a la API; las demás esperan su resultado en lugar de repetir la llamada y pagar
+de nuevo los tokens. Se usa la misma clave que la caché de respuestas.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+class _LlamadaEnVuelo:
+    """Llamada en curso y número de solicitudes que esperan su resultado."""
+
+    def __init__(self, tarea: "asyncio.Future[Any]"):
+        self.tarea = tarea
+        self.esperas = 0
+
+class SolicitudesEnVuelo:
+    """
+    Comparte una única llamada en curso entre las solicitudes con la misma clave.
+
+    Está acotada para que una llamada atascada no retenga solicitudes sin límite: cada
+    llamada admite como máximo `max_esperas` solicitudes en espera (las siguientes
+    hacen su propia llamada) y cada espera dura como máximo `tiempo_espera` segundos.
+    """
+
+    def __init__(self, max_esperas: int, tiempo_espera: float):
+        """
+        Inicializa el agrupador.
+
+        Args:
+            max_esperas: Solicitudes que pueden esperar a una misma llamada (0 = desactivado)
+            tiempo_espera: Segundos máximos que una solicitud espera a la llamada compartida
+        """
+        self.max_esperas = max_esperas
+        self.tiempo_espera = tiempo_espera
+
+        self._en_vuelo: Dict[str, _LlamadaEnVuelo] = {}
+        self._contadores = {
+            "llamadas": 0,
+            "agrupadas": 0,
+            "desbordadas": 0,
+            "timeouts": 0
+        }
+
+    @property
+    def activa(self) -> bool:
+        """Indica si la agrupación está habilitada."""
+        return self.max_esperas > 0
+
+    async def ejecutar(self, clave: str, funcion: Callable[[], Awaitable[T]]) -> T:
+        """
+        Ejecuta la llamada o se une a la que ya está en curso con la misma clave.
+
+        La llamada compartida no se cancela si la solicitud que la inició se cancela
+        (por ejemplo, si su cliente se desconecta), porque otras pueden estar esperándola.
+
+        Args:
+            clave: Clave de la solicitud (la misma que la de la caché de respuestas)
+            funcion: Función sin argumentos que devuelve la corrutina de la llamada
+
+        Returns:
+            Resultado de la llamada, el mismo objeto para todas las solicitudes agrupadas
+
+        Raises:
+            asyncio.TimeoutError: Si la espera a la llamada compartida supera tiempo_espera
+            Exception: La excepción de la llamada, propagada a todas las solicitudes
+        """
+        if not self.activa:
+            return await funcion()
+
+        llamada = self._en_vuelo.get(clave)
+        if llamada is None:
+            llamada = _LlamadaEnVuelo(asyncio.ensure_future(funcion()))
+            self._en_vuelo[clave] = llamada
+            llamada.tarea.add_done_callback(lambda _: self._liberar(clave, llamada))
+            self._contadores["llamadas"] += 1
+            return await asyncio.shield(llamada.tarea)
+
+        if llamada.esperas >= self.max_esperas:
+            self._contadores["desbordadas"] += 1
+            return await funcion()
+
+        llamada.esperas += 1
+        self._contadores["agrupadas"] += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(llamada.tarea), self.tiempo_espera)
+        except asyncio.TimeoutError:
+            self._contadores["timeouts"] += 1
+            raise
+        finally:
+            llamada.esperas -= 1
+
+    def obtener_metricas(self) -> Dict[str, int]:
+        """
+        Devuelve los contadores de llamadas y solicitudes agrupadas.
+
+        Returns:
+            Diccionario con los contadores y las llamadas en curso
+        """
+        return {**self._contadores, "en_vuelo": len(self._en_vuelo)}
+
+    def _liberar(self, clave: str, llamada: _LlamadaEnVuelo) -> None:
+        """Retira la llamada terminada para que la siguiente solicitud lance una nueva."""
+        if self._en_vuelo.get(clave) is llamada:
+            del self._en_vuelo[clave]
@@ -22,11 +22,15 @@ os.environ["MAX_TOKENS_PREDETERMINADO"] = "200"
 os.environ["REQUEST_TIMEOUT"] = "30"
 os.environ["MAX_REINTENTOS"] = "3"
 os.environ["TIEMPO_ENTRE_REINTENTOS"] = "1"
+os.environ["CALENTAR_CONEXION"] = "false"
 
 @pytest.fixture
 def client():
     """
     Fixture para crear un cliente de prueba para la API.
+    
+    Ejecuta el ciclo de vida de la aplicación para que exista el servicio DeepSeek.
     """
     from src.api.app import app
-    return TestClient(app)
+    with TestClient(app) as cliente:
+        yield cliente
@@ -1,8 +1,11 @@
 """
 Tests de integración para la API.
 """
+import json
+
+import httpx
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock
 from fastapi.testclient import TestClient
 
 class TestDeepSeekAPI:
@@ -48,13 +51,11 @@ class TestDeepSeekAPI:
         
         assert response.status_code == 403
     
-    @patch("src.services.deepseek_service.requests.post")
-    def test_procesar_texto(self, mock_post, client):
+    @patch("src.services.deepseek_service.DeepSeekService._enviar", new_callable=AsyncMock)
+    def test_procesar_texto(self, mock_enviar, client):
         """Test para el endpoint de procesamiento de texto."""
         # Configurar el mock
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
+        mock_enviar.return_value = httpx.Response(200, json={
             "choices": [
                 {
                     "message": {
@@ -66,8 +67,7 @@ class TestDeepSeekAPI:
                 "prompt_tokens": 5,
                 "completion_tokens": 10
             }
-        }
-        mock_post.return_value = mock_response
+        })
         
         # Preparar payload y headers
         payload = {
@@ -105,11 +105,11 @@ class TestDeepSeekAPI:
         # Verificar respuesta de error
         assert response.status_code == 422  # Unprocessable Entity
     
-    @patch("src.services.deepseek_service.requests.post")
-    def test_procesar_texto_error_servicio(self, mock_post, client):
+    @patch("src.services.deepseek_service.DeepSeekService._enviar", new_callable=AsyncMock)
+    def test_procesar_texto_error_servicio(self, mock_enviar, client):
         """Test para el endpoint cuando el servicio falla."""
         # Configurar el mock para fallar
-        mock_post.side_effect = Exception("Error interno simulado")
+        mock_enviar.side_effect = Exception("Error interno simulado")
         
         # Preparar payload y headers
         payload = {"texto": "Texto de prueba"}
@@ -120,3 +120,38 @@ class TestDeepSeekAPI:
         
         # Verificar respuesta de error
         assert response.status_code == 500
+    
+    @patch("src.services.deepseek_service.DeepSeekService._enviar", new_callable=AsyncMock)
+    def test_procesar_texto_stream(self, mock_enviar, client):
+        """Test para el endpoint de procesamiento en streaming (SSE)."""
+        eventos = [
+            {"choices": [{"delta": {"content": "Hola"}}]},
+            {"choices": [{"delta": {"content": " mundo"}}]},
+            {"choices": [], "usage": {"prompt_tokens": 5, "completion_tokens": 2}}
+        ]
+        cuerpo = "".join(f"data: {json.dumps(evento)}\n\n" for evento in eventos) + "data: [DONE]\n\n"
+        mock_enviar.return_value = httpx.Response(200, content=cuerpo.encode())
+        
+        headers = {"X-API-Key": "test_default_api_key"}
+        response = client.post("/api/v1/ia/procesar/stream", json={"texto": "Texto de prueba"}, headers=headers)
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        bloques = [bloque.split("\n") for bloque in response.text.strip().split("\n\n")]
+        assert [bloque[0] for bloque in bloques] == ["event: token", "event: token", "event: fin"]
+        assert json.loads(bloques[0][1][len("data: "):]) == {"texto": "Hola"}
+        final = json.loads(bloques[-1][1][len("data: "):])
+        assert final["texto_procesado"] == "Hola mundo"
+        assert final["tokens_salida"] == 2
+        assert mock_enviar.call_args.kwargs["stream"] is True
+    
+    @patch("src.services.deepseek_service.DeepSeekService._enviar", new_callable=AsyncMock)
+    def test_procesar_texto_stream_error_servicio(self, mock_enviar, client):
+        """Un error antes del primer fragmento se devuelve como error HTTP."""
+        mock_enviar.return_value = httpx.Response(429, text="Demasiadas solicitudes")
+        
+        headers = {"X-API-Key": "test_default_api_key"}
+        response = client.post("/api/v1/ia/procesar/stream", json={"texto": "Texto de prueba"}, headers=headers)
+        
+        assert response.status_code == 500
+        assert "429" in response.json()["detail"]["detalle"]
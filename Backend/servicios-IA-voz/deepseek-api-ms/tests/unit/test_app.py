@@ -0,0 +1,38 @@
+"""
+Tests para el ciclo de vida de la aplicación.
+"""
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from src.api.app import app
+from src.api.dependencies import obtener_servicio
+from src.services.deepseek_service import DeepSeekService
+
+class TestCicloVida:
+    """
+    Clase para probar la gestión del servicio DeepSeek en el ciclo de vida.
+    """
+
+    def test_servicio_unico_durante_la_aplicacion(self):
+        """Todas las solicitudes reciben la misma instancia, que se cierra al detener la app."""
+        instancias = []
+
+        def registrar(request: Request):
+            servicio = obtener_servicio(request)
+            instancias.append(servicio)
+            return servicio
+
+        app.dependency_overrides[obtener_servicio] = registrar
+        try:
+            with TestClient(app) as cliente:
+                headers = {"X-API-Key": "test_default_api_key"}
+                for _ in range(3):
+                    assert cliente.get("/api/v1/ia/estado", headers=headers).status_code == 200
+                servicio = app.state.servicio_deepseek
+        finally:
+            app.dependency_overrides.clear()
+
+        assert isinstance(servicio, DeepSeekService)
+        assert all(instancia is servicio for instancia in instancias)
+        assert len(instancias) == 3
+        assert servicio.cliente.is_closed
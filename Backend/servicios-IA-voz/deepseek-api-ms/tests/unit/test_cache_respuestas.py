@@ -0,0 +1,98 @@
+"""
+Tests para la caché de respuestas.
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+
+from src.services.cache_respuestas import CacheRespuestas
+
+class TestCacheRespuestas:
+    """
+    Clase para probar la caché de respuestas de DeepSeek.
+    """
+
+    def test_clave_depende_de_todos_los_parametros(self):
+        """La clave cambia con el modelo, el texto, la temperatura o el máximo de tokens."""
+        base = CacheRespuestas.calcular_clave("modelo", "Hola", 0, 100)
+        assert base == CacheRespuestas.calcular_clave("modelo", "Hola", 0.0, 100)
+        assert base != CacheRespuestas.calcular_clave("otro", "Hola", 0, 100)
+        assert base != CacheRespuestas.calcular_clave("modelo", "Adiós", 0, 100)
+        assert base != CacheRespuestas.calcular_clave("modelo", "Hola", 0.5, 100)
+        assert base != CacheRespuestas.calcular_clave("modelo", "Hola", 0, 50)
+
+    def test_lru_expulsa_la_menos_usada(self):
+        """Al superar la capacidad se expulsa la entrada usada hace más tiempo."""
+        cache = CacheRespuestas(capacidad=2, ttl=60)
+        asyncio.run(cache.guardar("a", "uno", 1, 2))
+        asyncio.run(cache.guardar("b", "dos", 1, 2))
+        assert asyncio.run(cache.obtener("a"))["texto_procesado"] == "uno"
+        asyncio.run(cache.guardar("c", "tres", 1, 2))
+
+        assert asyncio.run(cache.obtener("b")) is None
+        assert asyncio.run(cache.obtener("c"))["texto_procesado"] == "tres"
+        metricas = cache.obtener_metricas()
+        assert metricas["expulsiones"] == 1
+        assert metricas["aciertos_memoria"] == 2
+        assert metricas["fallos"] == 1
+        assert metricas["tasa_aciertos"] == 2 / 3
+
+    def test_tokens_ahorrados(self):
+        """Cada acierto suma los tokens de entrada y salida de la respuesta guardada."""
+        cache = CacheRespuestas(capacidad=10, ttl=60)
+        asyncio.run(cache.guardar("a", "uno", 10, 30))
+        asyncio.run(cache.obtener("a"))
+        asyncio.run(cache.obtener("a"))
+        assert cache.obtener_metricas()["tokens_ahorrados"] == 80
+
+    def test_entradas_expiradas(self):
+        """Las entradas dejan de devolverse al expirar su TTL."""
+        cache = CacheRespuestas(capacidad=10, ttl=0.05)
+        asyncio.run(cache.guardar("a", "uno", 1, 2))
+        time.sleep(0.1)
+        assert asyncio.run(cache.obtener("a")) is None
+
+    def test_cache_desactivada(self):
+        """Con capacidad 0 la caché no guarda nada."""
+        cache = CacheRespuestas(capacidad=0, ttl=60)
+        asyncio.run(cache.guardar("a", "uno", 1, 2))
+        assert asyncio.run(cache.obtener("a")) is None
+
+    def test_nivel_disco_sobrevive_a_reinicio(self, tmp_path):
+        """Las entradas guardadas en disco se recuperan desde una nueva instancia."""
+        ruta = str(tmp_path / "cache.db")
+        cache = CacheRespuestas(capacidad=10, ttl=60, ruta_disco=ruta)
+        asyncio.run(cache.guardar("a", "uno", 3, 4))
+        cache.cerrar()
+
+        reiniciada = CacheRespuestas(capacidad=10, ttl=60, ruta_disco=ruta)
+        assert asyncio.run(reiniciada.obtener("a")) == {"texto_procesado": "uno", "tokens_entrada": 3, "tokens_salida": 4}
+        assert reiniciada.obtener_metricas()["aciertos_disco"] == 1
+        reiniciada.cerrar()
+
+    def test_nivel_disco_fuera_del_bucle_y_sin_commit_en_lecturas(self, tmp_path, monkeypatch):
+        """SQLite se consulta en otro hilo y un acierto en disco no abre una transacción."""
+        ruta = str(tmp_path / "cache.db")
+        cache = CacheRespuestas(capacidad=10, ttl=60, ruta_disco=ruta)
+        asyncio.run(cache.guardar("a", "uno", 3, 4))
+        cache.cerrar()
+
+        reiniciada = CacheRespuestas(capacidad=10, ttl=60, ruta_disco=ruta)
+        hilos = []
+        leer_disco = reiniciada._leer_disco
+        def registrar(*args):
+            hilos.append(threading.current_thread())
+            return leer_disco(*args)
+        monkeypatch.setattr(reiniciada, "_leer_disco", registrar)
+
+        assert asyncio.run(reiniciada.obtener("a"))["texto_procesado"] == "uno"
+        assert hilos and threading.current_thread() not in hilos
+        assert not reiniciada._conexion.in_transaction
+
+        # El acceso anotado se escribe al cerrar
+        reiniciada.cerrar()
+        conexion = sqlite3.connect(ruta)
+        acceso, = conexion.execute("SELECT acceso FROM respuestas WHERE clave = 'a'").fetchone()
+        conexion.close()
+        assert acceso >= time.time() - 5
@@ -1,148 +1,337 @@
 """
 Tests para el servicio DeepSeek.
 """
+import asyncio
+import json
+
+import httpx
 import pytest
-import requests
-import time
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
+from tenacity import wait_none
+
+from src.services.cache_respuestas import CacheRespuestas
 from src.services.deepseek_service import DeepSeekService, DeepSeekException
 
+RESPUESTA_EXITOSA = {
+    "choices": [
+        {
+            "message": {
+                "content": "Texto procesado de prueba"
+            }
+        }
+    ],
+    "usage": {
+        "prompt_tokens": 5,
+        "completion_tokens": 10
+    }
+}
+
+def crear_flujo(*fragmentos, uso=None):
+    """Crea el cuerpo SSE que envía DeepSeek con stream: true."""
+    eventos = [{"choices": [{"delta": {"content": fragmento}}]} for fragmento in fragmentos]
+    if uso is not None:
+        eventos.append({"choices": [], "usage": uso})
+    lineas = [f"data: {json.dumps(evento)}\n\n" for evento in eventos]
+    return ("".join(lineas) + "data: [DONE]\n\n").encode()
+
+def crear_servicio(manejador, cache=None):
+    """Crea un servicio cuyo cliente HTTP responde con el manejador indicado."""
+    cliente = httpx.AsyncClient(transport=httpx.MockTransport(manejador))
+    return DeepSeekService(cliente=cliente, cache=cache)
+
+@pytest.fixture(autouse=True)
+def sin_espera_entre_reintentos():
+    """Elimina la espera entre reintentos para acelerar los tests."""
+    with patch.object(DeepSeekService._enviar.retry, "wait", wait_none()):
+        yield
+
 class TestDeepSeekService:
     """
     Clase para probar el servicio DeepSeek.
     """
-    
-    @patch("src.services.deepseek_service.requests.post")
-    def test_procesar_texto_exitoso(self, mock_post):
+
+    def test_procesar_texto_exitoso(self):
         """Test para el método procesar_texto cuando es exitoso."""
-        # Configurar el mock de respuesta
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "choices": [
-                {
-                    "message": {
-                        "content": "Texto procesado de prueba"
-                    }
-                }
-            ],
-            "usage": {
-                "prompt_tokens": 5,
-                "completion_tokens": 10
-            }
-        }
-        mock_post.return_value = mock_response
-        
-        # Crear instancia del servicio
-        servicio = DeepSeekService()
-        
-        # Llamar al método bajo prueba
-        resultado = servicio.procesar_texto("Texto de prueba")
-        
-        # Verificar que se llamó al método post con los parámetros correctos
-        mock_post.assert_called_once()
-        args, kwargs = mock_post.call_args
-        assert f"{servicio.api_url}/v1/chat/completions" == args[0]
-        assert kwargs["headers"]["Authorization"] == f"Bearer {servicio.api_key}"
-        assert kwargs["json"]["messages"][0]["content"] == "Texto de prueba"
-        
+        solicitudes = []
+
+        def manejador(request):
+            solicitudes.append(request)
+            return httpx.Response(200, json=RESPUESTA_EXITOSA)
+
+        servicio = crear_servicio(manejador)
+        resultado = asyncio.run(servicio.procesar_texto("Texto de prueba"))
+
+        # Verificar la solicitud enviada
+        assert len(solicitudes) == 1
+        solicitud = solicitudes[0]
+        assert str(solicitud.url) == f"{servicio.api_url}/v1/chat/completions"
+        assert solicitud.headers["Authorization"] == f"Bearer {servicio.api_key}"
+        assert json.loads(solicitud.content)["messages"][0]["content"] == "Texto de prueba"
+
         # Verificar el resultado
         assert resultado["texto_procesado"] == "Texto procesado de prueba"
         assert resultado["modelo_usado"] == servicio.default_model
         assert resultado["tokens_entrada"] == 5
         assert resultado["tokens_salida"] == 10
         assert "tiempo_proceso" in resultado
-    
-    @patch("src.services.deepseek_service.requests.post")
-    def test_procesar_texto_error_api(self, mock_post):
+
+    def test_procesar_texto_error_api(self):
         """Test para el método procesar_texto cuando la API devuelve un error."""
-        # Configurar el mock para devolver un error
-        mock_response = MagicMock()
-        mock_response.status_code = 400
-        mock_response.json.return_value = {"error": "Error de API"}
-        mock_post.return_value = mock_response
-        
-        # Crear instancia del servicio
-        servicio = DeepSeekService()
-        
-        # Verificar que se lanza la excepción correcta
+        servicio = crear_servicio(lambda request: httpx.Response(400, json={"error": "Error de API"}))
+
         with pytest.raises(DeepSeekException) as excinfo:
-            servicio.procesar_texto("Texto de prueba")
-        
+            asyncio.run(servicio.procesar_texto("Texto de prueba"))
+
         assert "Error en la API de DeepSeek: 400" in str(excinfo.value)
-    
-    @patch("src.services.deepseek_service.requests.post")
-    def test_procesar_texto_parametros_personalizados(self, mock_post):
+
+    def test_procesar_texto_parametros_personalizados(self):
         """Test para el método procesar_texto con parámetros personalizados."""
-        # Configurar el mock de respuesta
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "choices": [
-                {
-                    "message": {
-                        "content": "Texto procesado de prueba"
-                    }
-                }
-            ],
-            "usage": {
-                "prompt_tokens": 5,
-                "completion_tokens": 10
-            }
-        }
-        mock_post.return_value = mock_response
-        
-        # Crear instancia del servicio
-        servicio = DeepSeekService()
-        
-        # Parámetros personalizados
-        temperatura = 0.3
-        max_tokens = 50
-        modelo = "modelo-personalizado"
-        
-        # Llamar al método bajo prueba
-        resultado = servicio.procesar_texto(
+        cuerpos = []
+
+        def manejador(request):
+            cuerpos.append(json.loads(request.content))
+            return httpx.Response(200, json=RESPUESTA_EXITOSA)
+
+        servicio = crear_servicio(manejador)
+        resultado = asyncio.run(servicio.procesar_texto(
             "Texto de prueba",
-            temperatura=temperatura,
-            max_tokens=max_tokens,
-            modelo=modelo
-        )
-        
-        # Verificar que se llamó al método post con los parámetros correctos
-        args, kwargs = mock_post.call_args
-        assert kwargs["json"]["temperature"] == temperatura
-        assert kwargs["json"]["max_tokens"] == max_tokens
-        assert kwargs["json"]["model"] == modelo
-        
-        # Verificar el resultado
-        assert resultado["modelo_usado"] == modelo
-    
-    @patch("src.services.deepseek_service.requests.post")
-    def test_procesar_texto_connection_error(self, mock_post):
-        """Test para manejar errores de conexión."""
-        # Configurar el mock para lanzar un error de conexión
-        mock_post.side_effect = requests.exceptions.ConnectionError("Error de conexión")
-        
-        # Crear instancia del servicio con reintentos mínimos para acelerar el test
-        servicio = DeepSeekService()
-        
-        # Verificar que se lanza la excepción correcta
+            temperatura=0.3,
+            max_tokens=50,
+            modelo="modelo-personalizado"
+        ))
+
+        assert cuerpos[0]["temperature"] == 0.3
+        assert cuerpos[0]["max_tokens"] == 50
+        assert cuerpos[0]["model"] == "modelo-personalizado"
+        assert resultado["modelo_usado"] == "modelo-personalizado"
+
+    def test_procesar_texto_connection_error(self):
+        """Test para manejar errores de conexión tras agotar los reintentos."""
+        intentos = []
+
+        def manejador(request):
+            intentos.append(request)
+            raise httpx.ConnectError("Error de conexión", request=request)
+
+        servicio = crear_servicio(manejador)
+
         with pytest.raises(DeepSeekException) as excinfo:
-            servicio.procesar_texto("Texto de prueba")
-        
+            asyncio.run(servicio.procesar_texto("Texto de prueba"))
+
         assert "Error de conexión con la API de DeepSeek" in str(excinfo.value)
-    
-    @patch("src.services.deepseek_service.requests.post")
-    def test_procesar_texto_timeout(self, mock_post):
+        assert len(intentos) == 3
+
+    def test_procesar_texto_timeout(self):
         """Test para manejar errores de timeout."""
-        # Configurar el mock para lanzar un error de timeout
-        mock_post.side_effect = requests.exceptions.Timeout("Timeout")
-        
-        # Crear instancia del servicio con reintentos mínimos para acelerar el test
-        servicio = DeepSeekService()
-        
-        # Verificar que se lanza la excepción correcta
+        def manejador(request):
+            raise httpx.ReadTimeout("Timeout", request=request)
+
+        servicio = crear_servicio(manejador)
+
         with pytest.raises(DeepSeekException) as excinfo:
-            servicio.procesar_texto("Texto de prueba")
-        
+            asyncio.run(servicio.procesar_texto("Texto de prueba"))
+
         assert "Timeout en la conexión con la API de DeepSeek" in str(excinfo.value)
+
+    def test_reintento_recupera_error_transitorio(self):
+        """Un error de conexión seguido de una respuesta correcta se resuelve con un reintento."""
+        intentos = []
+
+        def manejador(request):
+            intentos.append(request)
+            if len(intentos) == 1:
+                raise httpx.ConnectError("Error de conexión", request=request)
+            return httpx.Response(200, json=RESPUESTA_EXITOSA)
+
+        servicio = crear_servicio(manejador)
+        resultado = asyncio.run(servicio.procesar_texto("Texto de prueba"))
+
+        assert resultado["texto_procesado"] == "Texto procesado de prueba"
+        assert len(intentos) == 2
+
+    def test_solicitudes_concurrentes_comparten_cliente(self):
+        """Las llamadas concurrentes no se serializan: todas esperan a la vez en el cliente."""
+        en_curso = 0
+        maximo = 0
+
+        async def manejador(request):
+            nonlocal en_curso, maximo
+            en_curso += 1
+            maximo = max(maximo, en_curso)
+            await asyncio.sleep(0.05)
+            en_curso -= 1
+            return httpx.Response(200, json=RESPUESTA_EXITOSA)
+
+        async def lanzar():
+            servicio = crear_servicio(manejador)
+            return await asyncio.gather(*(servicio.procesar_texto(f"Texto {i}") for i in range(20)))
+
+        resultados = asyncio.run(lanzar())
+
+        assert len(resultados) == 20
+        assert maximo == 20
+
+    def test_metricas_acumulan_solicitudes_y_tokens(self):
+        """El servicio cuenta solicitudes, errores y tokens consumidos."""
+        respuestas = iter([
+            httpx.Response(200, json=RESPUESTA_EXITOSA),
+            httpx.Response(500, text="Error")
+        ])
+        servicio = crear_servicio(lambda request: next(respuestas))
+
+        asyncio.run(servicio.procesar_texto("Texto de prueba"))
+        with pytest.raises(DeepSeekException):
+            asyncio.run(servicio.procesar_texto("Texto de prueba"))
+
+        metricas = servicio.obtener_metricas()
+        assert metricas["solicitudes"] == 2
+        assert metricas["errores"] == 1
+        assert (metricas["tokens_entrada"], metricas["tokens_salida"]) == (5, 10)
+
+    def test_calentar_abre_la_conexion(self):
+        """El calentamiento hace una consulta ligera al listado de modelos."""
+        solicitudes = []
+
+        def manejador(request):
+            solicitudes.append(request)
+            return httpx.Response(200, json={"data": []})
+
+        servicio = crear_servicio(manejador)
+        asyncio.run(servicio.calentar())
+
+        assert len(solicitudes) == 1
+        assert solicitudes[0].method == "GET"
+        assert str(solicitudes[0].url) == f"{servicio.api_url}/v1/models"
+
+    def test_calentar_no_falla_sin_conexion(self):
+        """Si DeepSeek no responde, el calentamiento solo lo registra."""
+        def manejador(request):
+            raise httpx.ConnectError("Sin conexión", request=request)
+
+        servicio = crear_servicio(manejador)
+        asyncio.run(servicio.calentar())
+
+        assert servicio.obtener_metricas()["errores"] == 0
+
+    def test_procesar_texto_stream(self):
+        """Los fragmentos se devuelven según llegan y el evento final lleva el consumo."""
+        cuerpos = []
+
+        def manejador(request):
+            cuerpos.append(json.loads(request.content))
+            cuerpo = crear_flujo("Hola", " mundo", uso={"prompt_tokens": 4, "completion_tokens": 2})
+            return httpx.Response(200, content=cuerpo, headers={"Content-Type": "text/event-stream"})
+
+        async def consumir():
+            servicio = crear_servicio(manejador)
+            return [evento async for evento in servicio.procesar_texto_stream("Texto de prueba")], servicio
+
+        eventos, servicio = asyncio.run(consumir())
+
+        assert cuerpos[0]["stream"] is True
+        assert eventos[:2] == [{"tipo": "token", "texto": "Hola"}, {"tipo": "token", "texto": " mundo"}]
+        final = eventos[-1]
+        assert final["tipo"] == "fin"
+        assert final["texto_procesado"] == "Hola mundo"
+        assert (final["tokens_entrada"], final["tokens_salida"]) == (4, 2)
+        assert 0 <= final["tiempo_primer_token"] <= final["tiempo_proceso"]
+        assert servicio.obtener_metricas()["tokens_salida"] == 2
+
+    def test_procesar_texto_stream_error_api(self):
+        """Un error de la API se lanza antes del primer fragmento."""
+        servicio = crear_servicio(lambda request: httpx.Response(401, text="No autorizado"))
+
+        async def consumir():
+            return [evento async for evento in servicio.procesar_texto_stream("Texto de prueba")]
+
+        with pytest.raises(DeepSeekException) as excinfo:
+            asyncio.run(consumir())
+
+        assert "Error en la API de DeepSeek: 401" in str(excinfo.value)
+
+    def test_cache_con_temperatura_cero(self):
+        """Con temperatura 0 el mismo prompt se responde desde la caché sin llamar a la API."""
+        solicitudes = []
+
+        def manejador(request):
+            solicitudes.append(request)
+            return httpx.Response(200, json=RESPUESTA_EXITOSA)
+
+        servicio = crear_servicio(manejador, cache=CacheRespuestas(capacidad=10, ttl=60))
+        primera = asyncio.run(servicio.procesar_texto("Texto de prueba", temperatura=0))
+        segunda = asyncio.run(servicio.procesar_texto("Texto de prueba", temperatura=0))
+
+        assert len(solicitudes) == 1
+        assert primera["desde_cache"] is False
+        assert segunda["desde_cache"] is True
+        assert segunda["texto_procesado"] == primera["texto_procesado"]
+        assert servicio.obtener_metricas()["cache"]["tokens_ahorrados"] == 15
+
+    def test_cache_solo_por_defecto_con_temperatura_cero(self):
+        """Con temperatura mayor que 0 solo se usa la caché si se pide explícitamente."""
+        solicitudes = []
+
+        def manejador(request):
+            solicitudes.append(request)
+            return httpx.Response(200, json=RESPUESTA_EXITOSA)
+
+        servicio = crear_servicio(manejador, cache=CacheRespuestas(capacidad=10, ttl=60))
+        for _ in range(2):
+            asyncio.run(servicio.procesar_texto("Texto de prueba", temperatura=0.7))
+        assert len(solicitudes) == 2
+
+        for _ in range(2):
+            asyncio.run(servicio.procesar_texto("Texto de prueba", temperatura=0.7, usar_cache=True))
+        assert len(solicitudes) == 3
+
+        for _ in range(2):
+            asyncio.run(servicio.procesar_texto("Otro texto", temperatura=0, usar_cache=False))
+        assert len(solicitudes) == 5
+
+    def test_stream_usa_la_cache(self):
+        """Una respuesta generada en streaming se guarda y se reenvía completa desde la caché."""
+        solicitudes = []
+
+        def manejador(request):
+            solicitudes.append(request)
+            cuerpo = crear_flujo("Hola", " mundo", uso={"prompt_tokens": 4, "completion_tokens": 2})
+            return httpx.Response(200, content=cuerpo)
+
+        servicio = crear_servicio(manejador, cache=CacheRespuestas(capacidad=10, ttl=60))
+
+        async def consumir():
+            return [evento async for evento in servicio.procesar_texto_stream("Texto de prueba", temperatura=0)]
+
+        asyncio.run(consumir())
+        eventos = asyncio.run(consumir())
+
+        assert len(solicitudes) == 1
+        assert eventos[0] == {"tipo": "token", "texto": "Hola mundo"}
+        assert eventos[-1]["desde_cache"] is True
+        assert eventos[-1]["tokens_salida"] == 2
+
+    def test_solicitudes_identicas_concurrentes_comparten_llamada(self):
+        """Las solicitudes idénticas simultáneas esperan a una única llamada a la API."""
+        solicitudes = []
+
+        async def manejador(request):
+            solicitudes.append(request)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json=RESPUESTA_EXITOSA)
+
+        async def lanzar():
+            # Sin caché, para comprobar solo la agrupación de llamadas en curso
+            servicio = crear_servicio(manejador, cache=CacheRespuestas(capacidad=0, ttl=60))
+            resultados = await asyncio.gather(*(
+                servicio.procesar_texto("Texto de prueba", temperatura=0) for _ in range(10)
+            ))
+            return resultados, servicio
+
+        resultados, servicio = asyncio.run(lanzar())
+
+        assert len(solicitudes) == 1
+        assert all(resultado["texto_procesado"] == "Texto procesado de prueba" for resultado in resultados)
+        assert len({id(resultado) for resultado in resultados}) == 10
+        metricas = servicio.obtener_metricas()
+        assert metricas["coalescencia"]["agrupadas"] == 9
+        assert metricas["tokens_salida"] == 10
@@ -0,0 +1,121 @@
+"""
+Tests para la agrupación de llamadas idénticas concurrentes.
+"""
+import asyncio
+
+import pytest
+
+from src.services.solicitudes_en_vuelo import SolicitudesEnVuelo
+
+def crear_llamada(llamadas, liberar, resultado="respuesta", error=None):
+    """Crea una llamada que se registra y espera al evento `liberar` antes de terminar."""
+    async def llamada():
+        llamadas.append(1)
+        await liberar.wait()
+        if error:
+            raise error
+        return {"texto": resultado}
+    return llamada
+
+class TestSolicitudesEnVuelo:
+    """
+    Clase para probar el agrupador de llamadas en vuelo.
+    """
+
+    def test_llamadas_identicas_comparten_resultado(self):
+        """Las solicitudes concurrentes con la misma clave hacen una sola llamada."""
+        async def escenario():
+            en_vuelo = SolicitudesEnVuelo(max_esperas=10, tiempo_espera=5)
+            llamadas, liberar = [], asyncio.Event()
+            tareas = [
+                asyncio.create_task(en_vuelo.ejecutar("a", crear_llamada(llamadas, liberar)))
+                for _ in range(5)
+            ]
+            await asyncio.sleep(0)
+            liberar.set()
+            return await asyncio.gather(*tareas), llamadas, en_vuelo.obtener_metricas()
+
+        resultados, llamadas, metricas = asyncio.run(escenario())
+
+        assert len(llamadas) == 1
+        assert all(resultado == {"texto": "respuesta"} for resultado in resultados)
+        assert metricas["llamadas"] == 1
+        assert metricas["agrupadas"] == 4
+        assert metricas["en_vuelo"] == 0
+
+    def test_claves_distintas_no_se_agrupan(self):
+        """Cada clave tiene su propia llamada."""
+        async def escenario():
+            en_vuelo = SolicitudesEnVuelo(max_esperas=10, tiempo_espera=5)
+            llamadas, liberar = [], asyncio.Event()
+            liberar.set()
+            await asyncio.gather(*(
+                en_vuelo.ejecutar(clave, crear_llamada(llamadas, liberar)) for clave in ("a", "b", "c")
+            ))
+            return llamadas
+
+        assert len(asyncio.run(escenario())) == 3
+
+    def test_error_se_propaga_a_todas_las_solicitudes(self):
+        """Si la llamada compartida falla, todas las solicitudes reciben la excepción."""
+        async def escenario():
+            en_vuelo = SolicitudesEnVuelo(max_esperas=10, tiempo_espera=5)
+            llamadas, liberar = [], asyncio.Event()
+            llamada = crear_llamada(llamadas, liberar, error=ValueError("fallo"))
+            tareas = [asyncio.create_task(en_vuelo.ejecutar("a", llamada)) for _ in range(3)]
+            await asyncio.sleep(0)
+            liberar.set()
+            return await asyncio.gather(*tareas, return_exceptions=True), llamadas
+
+        resultados, llamadas = asyncio.run(escenario())
+
+        assert len(llamadas) == 1
+        assert all(isinstance(resultado, ValueError) for resultado in resultados)
+
+    def test_esperas_acotadas(self):
+        """Superado el máximo de esperas, las solicitudes hacen su propia llamada."""
+        async def escenario():
+            en_vuelo = SolicitudesEnVuelo(max_esperas=2, tiempo_espera=5)
+            llamadas, liberar = [], asyncio.Event()
+            tareas = [
+                asyncio.create_task(en_vuelo.ejecutar("a", crear_llamada(llamadas, liberar)))
+                for _ in range(5)
+            ]
+            await asyncio.sleep(0)
+            liberar.set()
+            await asyncio.gather(*tareas)
+            return llamadas, en_vuelo.obtener_metricas()
+
+        llamadas, metricas = asyncio.run(escenario())
+
+        assert len(llamadas) == 3
+        assert metricas["agrupadas"] == 2
+        assert metricas["desbordadas"] == 2
+
+    def test_timeout_de_espera_no_cancela_la_llamada(self):
+        """Una espera que supera el tiempo máximo falla sin cancelar la llamada compartida."""
+        async def escenario():
+            en_vuelo = SolicitudesEnVuelo(max_esperas=10, tiempo_espera=0.05)
+            llamadas, liberar = [], asyncio.Event()
+            lider = asyncio.create_task(en_vuelo.ejecutar("a", crear_llamada(llamadas, liberar)))
+            await asyncio.sleep(0)
+            with pytest.raises(asyncio.TimeoutError):
+                await en_vuelo.ejecutar("a", crear_llamada(llamadas, liberar))
+            liberar.set()
+            return await lider, en_vuelo.obtener_metricas()
+
+        resultado, metricas = asyncio.run(escenario())
+
+        assert resultado == {"texto": "respuesta"}
+        assert metricas["timeouts"] == 1
+
+    def test_desactivado(self):
+        """Con max_esperas 0 cada solicitud hace su propia llamada."""
+        async def escenario():
+            en_vuelo = SolicitudesEnVuelo(max_esperas=0, tiempo_espera=5)
+            llamadas, liberar = [], asyncio.Event()
+            liberar.set()
+            await asyncio.gather(*(en_vuelo.ejecutar("a", crear_llamada(llamadas, liberar)) for _ in range(3)))
+            return llamadas
+
+        assert len(asyncio.run(escenario())) == 3
@@ -1,8 +1,10 @@
 """
 Aplicación principal de la API de transcripción de voz a texto.
 """
-import os
 import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -11,27 +13,40 @@ from fastapi.templating import Jinja2Templates
 import uvicorn
 
 from .routes import transcripcion_router, salud_router
+from .limite_tamano import LimiteTamanoCuerpo
 from ..config import configuracion
 from ..utils.audio_config import configurar_ffmpeg
-from ..utils import ErrorBase, crear_respuesta_error
+from ..utils import ErrorBase, crear_respuesta_error, gestor_recursos
+from ..utils.registro import configurar_registro, id_solicitud
+from ..utils.metricas import cabecera_server_timing, iniciar_tiempos_solicitud
+from ..services import servicio_transcripcion, ejecutor_trabajos, cache_transcripciones, gestor_lotes
 
-# Configurar logging
-nivel_log = configuracion.nivel_log.upper()
-logging.basicConfig(
-    level=getattr(logging, nivel_log),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("logs/app.log"),
-        logging.StreamHandler()
-    ]
-)
+# Configurar el registro estructurado (la cola y el hilo escritor se crean una vez)
+configurar_registro(configuracion.nivel_log, configuracion.log_archivo or None, configuracion.log_formato)
 logger = logging.getLogger(__name__)
 
-# Crear directorio para logs si no existe
-os.makedirs("logs", exist_ok=True)
 # Configurar ffmpeg
 configurar_ffmpeg()
 
+@asynccontextmanager
+async def ciclo_vida(app: FastAPI):
+    """
+    Gestiona los recursos compartidos durante la vida de la aplicación.
+    
+    Args:
+        app: Aplicación FastAPI
+    """
+    # Iniciar el recolector de archivos temporales
+    gestor_recursos.iniciar()
+    # Arrancar los trabajadores de los lotes
+    gestor_lotes.iniciar()
+    yield
+    await gestor_lotes.detener()
+    ejecutor_trabajos.cerrar()
+    servicio_transcripcion.cerrar()
+    cache_transcripciones.cerrar()
+    gestor_recursos.detener()
+
 # Crear aplicación FastAPI
 app = FastAPI(
     title="API de Transcripción de Voz a Texto",
@@ -39,6 +54,17 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=ciclo_vida,
+)
+
+# Rechazar las subidas demasiado grandes mientras se reciben, sin almacenarlas enteras.
+# Se registra antes que CORS para que sus respuestas 413 lleven las cabeceras CORS
+app.add_middleware(
+    LimiteTamanoCuerpo,
+    limites={
+        "/api/v1/transcribir": configuracion.tamano_max_archivo * 1024 * 1024,
+        "/api/v1/transcribir/lote": configuracion.lote_tamano_max * 1024 * 1024,
+    },
 )
 
 # Configurar CORS
@@ -50,6 +76,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Asociar cada registro a la solicitud que lo originó
+@app.middleware("http")
+async def asignar_id_solicitud(request: Request, call_next):
+    """Propaga la cabecera X-Request-ID (o genera una) a los registros y a la respuesta."""
+    identificador = request.headers.get("x-request-id") or uuid.uuid4().hex
+    token = id_solicitud.set(identificador)
+    # Las etapas medidas durante la solicitud se devuelven en la cabecera Server-Timing
+    tiempos = iniciar_tiempos_solicitud()
+    inicio = time.perf_counter()
+    try:
+        respuesta = await call_next(request)
+    finally:
+        id_solicitud.reset(token)
+    respuesta.headers["X-Request-ID"] = identificador
+    if tiempos:
+        tiempos["total"] = time.perf_counter() - inicio
+        respuesta.headers["Server-Timing"] = cabecera_server_timing(tiempos)
+    return respuesta
+
 # Manejar excepciones personalizadas
 @app.exception_handler(ErrorBase)
 async def error_base_handler(request: Request, exc: ErrorBase):
@@ -0,0 +1,99 @@
+"""
+Middleware que limita el tamaño del cuerpo de las subidas de audio.
+
+FastAPI recibe el formulario completo antes de ejecutar la ruta, así que un archivo
+demasiado grande se almacenaría entero antes de rechazarse. Este middleware responde
+413 en cuanto la cabecera Content-Length o los bytes recibidos superan el límite de
+la ruta, sin esperar al resto de la subida.
+"""
+import json
+from typing import Dict, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..utils import ErrorTamanoArchivo
+
+# Margen para las cabeceras del formulario multipart y el campo de opciones
+MARGEN_MULTIPART = 64 * 1024
+
+class LimiteTamanoCuerpo:
+    """Rechaza con 413 las solicitudes cuyo cuerpo supera el límite de su ruta."""
+
+    def __init__(self, app: ASGIApp, limites: Dict[str, int]):
+        """
+        Inicializa el middleware.
+
+        Args:
+            app: Aplicación ASGI
+            limites: Tamaño máximo de los archivos en bytes por ruta exacta (se añade un margen
+                para el resto del formulario)
+        """
+        self.app = app
+        self.limites = limites
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limite = self._limite(scope)
+        if limite is None:
+            await self.app(scope, receive, send)
+            return
+
+        for nombre, valor in scope["headers"]:
+            if nombre == b"content-length" and valor.isdigit() and int(valor) > limite + MARGEN_MULTIPART:
+                await self._responder_413(send, limite)
+                return
+
+        recibidos = 0
+        excedido = False
+        respuesta_iniciada = False
+
+        async def recibir_limitado() -> Message:
+            nonlocal recibidos, excedido
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                recibidos += len(mensaje.get("body", b""))
+                if recibidos > limite + MARGEN_MULTIPART:
+                    excedido = True
+                    raise ErrorTamanoArchivo("El cuerpo de la solicitud excede el tamaño máximo permitido")
+            return mensaje
+
+        async def enviar(mensaje: Message) -> None:
+            nonlocal respuesta_iniciada
+            if excedido:
+                # La aplicación convierte el error de lectura en su propia respuesta (p. ej. 400
+                # al analizar el formulario): se sustituye por el 413
+                if mensaje["type"] == "http.response.start" and not respuesta_iniciada:
+                    respuesta_iniciada = True
+                    await self._responder_413(send, limite)
+                return
+            respuesta_iniciada = respuesta_iniciada or mensaje["type"] == "http.response.start"
+            await send(mensaje)
+
+        try:
+            await self.app(scope, recibir_limitado, enviar)
+        except ErrorTamanoArchivo:
+            if respuesta_iniciada:
+                return
+            await self._responder_413(send, limite)
+
+    def _limite(self, scope: Scope) -> Optional[int]:
+        """Límite de la ruta de la solicitud, o None si no se limita."""
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return None
+        return self.limites.get(scope["path"].rstrip("/"))
+
+    @staticmethod
+    async def _responder_413(send: Send, limite: int) -> None:
+        """Envía la respuesta 413 sin leer el resto del cuerpo."""
+        cuerpo = json.dumps({
+            "detail": f"La solicitud excede el tamaño máximo permitido de {limite // (1024 * 1024)} MB"
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(cuerpo)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": cuerpo})
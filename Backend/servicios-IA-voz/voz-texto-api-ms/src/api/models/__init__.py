@@ -1,3 +1,15 @@
-from .schemas import RespuestaTranscripcion, EstadoSalud, OpcionesTranscripcion
+from .schemas import (
+    RespuestaTranscripcion,
+    EstadoSalud,
+    OpcionesTranscripcion,
+    ResultadoArchivoLote,
+    EstadoLote
+)
 
-__all__ = ['RespuestaTranscripcion', 'EstadoSalud', 'OpcionesTranscripcion']
+__all__ = [
+    'RespuestaTranscripcion',
+    'EstadoSalud',
+    'OpcionesTranscripcion',
+    'ResultadoArchivoLote',
+    'EstadoLote'
+]
@@ -2,7 +2,7 @@
 Modelos Pydantic para la API de transcripción de voz a texto.
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 class RespuestaTranscripcion(BaseModel):
     """Modelo para la respuesta de transcripción."""
@@ -10,6 +10,12 @@ class RespuestaTranscripcion(BaseModel):
     confianza: Optional[float] = Field(None, description="Nivel de confianza de la transcripción (0-1)")
     idioma_detectado: Optional[str] = Field(None, description="Idioma detectado en el audio")
     duracion: Optional[float] = Field(None, description="Duración del audio en segundos")
+    audio_recortado_ms: Optional[int] = Field(
+        None, description="Milisegundos de silencio eliminados antes de transcribir"
+    )
+    factor_tiempo_real: Optional[float] = Field(
+        None, description="Segundos de procesamiento por segundo de audio (menor que 1 = más rápido que tiempo real)"
+    )
     
     class Config:
         json_schema_extra = {
@@ -17,7 +23,9 @@ class RespuestaTranscripcion(BaseModel):
                 "texto": "Este es un ejemplo de texto transcrito del audio.",
                 "confianza": 0.95,
                 "idioma_detectado": "es-ES",
-                "duracion": 5.2
+                "duracion": 5.2,
+                "audio_recortado_ms": 1830,
+                "factor_tiempo_real": 0.18
             }
         }
 
@@ -41,12 +49,67 @@ class OpcionesTranscripcion(BaseModel):
     idioma: Optional[str] = Field(None, description="Código de idioma (ej: es-ES, en-US)")
     modelo: Optional[str] = Field(None, description="Modelo específico a utilizar")
     sensibilidad: Optional[float] = Field(None, ge=0, le=1, description="Sensibilidad del reconocimiento (0-1)")
+    segmentacion: Optional[str] = Field(
+        None,
+        pattern="^(silencio|fija)$",
+        description="Segmentación de audios largos: 'silencio' (cortar en pausas) o 'fija' (ventanas con solapamiento)"
+    )
+    ajustar_ruido: Optional[bool] = Field(
+        None,
+        description="Adaptar el umbral de voz al ruido de fondo estimado para detectar y recortar "
+                    "silencios (por defecto, sí). Con 'false' se usa un umbral fijo"
+    )
     
     class Config:
         json_schema_extra = {
             "example": {
                 "idioma": "es-ES",
                 "modelo": "general",
-                "sensibilidad": 0.8
+                "sensibilidad": 0.8,
+                "segmentacion": "silencio",
+                "ajustar_ruido": True
+            }
+        }
+
+class ResultadoArchivoLote(BaseModel):
+    """Modelo para el estado de un archivo dentro de un lote."""
+    indice: int = Field(..., description="Posición del archivo en el lote")
+    nombre: str = Field(..., description="Nombre original del archivo")
+    estado: str = Field(..., description="en_cola, procesando, completado o fallido")
+    texto: Optional[str] = Field(None, description="Texto transcrito")
+    error: Optional[str] = Field(None, description="Motivo del fallo")
+    confianza: Optional[float] = Field(None, description="Nivel de confianza de la transcripción (0-1)")
+    duracion: Optional[float] = Field(None, description="Duración del audio en segundos")
+    audio_recortado_ms: Optional[int] = Field(
+        None, description="Milisegundos de silencio eliminados antes de transcribir"
+    )
+    tiempo_procesamiento: Optional[float] = Field(None, description="Segundos dedicados al archivo")
+    factor_tiempo_real: Optional[float] = Field(None, description="Segundos de procesamiento por segundo de audio")
+
+class EstadoLote(BaseModel):
+    """Modelo para el estado de un lote de transcripción."""
+    id: str = Field(..., description="Identificador del lote")
+    estado: str = Field(..., description="en_cola, procesando o completado")
+    total: int = Field(..., description="Número de archivos del lote")
+    completados: int = Field(..., description="Archivos transcritos correctamente")
+    fallidos: int = Field(..., description="Archivos que no se pudieron transcribir")
+    creado: float = Field(..., description="Marca de tiempo de creación")
+    finalizado: Optional[float] = Field(None, description="Marca de tiempo de finalización")
+    archivos: List[ResultadoArchivoLote] = Field(default_factory=list, description="Estado de cada archivo")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "id": "3f2a9c1e5b7d4e8f9a0b1c2d3e4f5a6b",
+                "estado": "procesando",
+                "total": 2,
+                "completados": 1,
+                "fallidos": 0,
+                "creado": 1718000000.0,
+                "finalizado": None,
+                "archivos": [
+                    {"indice": 0, "nombre": "a.wav", "estado": "completado", "texto": "hola"},
+                    {"indice": 1, "nombre": "b.mp3", "estado": "procesando"}
+                ]
             }
         }
@@ -1,9 +1,14 @@
 """
 Rutas para verificar el estado de salud de la API.
 """
+from typing import Any, Dict
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 from ..models import EstadoSalud
 from ...config import configuracion
+from ...services import ejecutor_trabajos, cache_transcripciones, gestor_lotes, servicio_transcripcion
+from ...utils.metricas import exponer_metricas
+from ...utils.vad import estadisticas_recorte
 
 router = APIRouter(tags=["Salud"])
 
@@ -20,3 +25,31 @@ async def verificar_salud():
         version="1.0.0",
         motor_transcripcion=configuracion.motor_transcripcion
     )
+
+@router.get("/salud/metricas")
+async def obtener_metricas() -> Dict[str, Any]:
+    """
+    Devuelve las métricas internas del servicio.
+    
+    Returns:
+        Ocupación, espera en cola y tiempo de ejecución de los pools de trabajo
+        aciertos/fallos de la caché de transcripciones, audio eliminado por el recorte de silencios
+        ocupación de la cola de lotes y latencia y errores de cada motor de transcripción
+    """
+    return {
+        "ejecutor": ejecutor_trabajos.obtener_metricas(),
+        "cache": cache_transcripciones.obtener_metricas(),
+        "recorte_silencios": estadisticas_recorte.to_dict(),
+        "lotes": gestor_lotes.obtener_metricas(),
+        "motores": servicio_transcripcion.obtener_metricas()
+    }
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metricas_prometheus() -> PlainTextResponse:
+    """
+    Expone los histogramas de latencia por etapa y de duración del audio para Prometheus.
+    
+    Returns:
+        Métricas en el formato de texto de Prometheus
+    """
+    return PlainTextResponse(exponer_metricas(), media_type="text/plain; version=0.0.4; charset=utf-8")
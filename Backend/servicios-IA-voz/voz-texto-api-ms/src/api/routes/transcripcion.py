@@ -1,29 +1,47 @@
 """
 Rutas para la API de transcripción de voz a texto.
 """
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, WebSocket, WebSocketDisconnect, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import asyncio
+import json
+import logging
 import os
-import tempfile
 import uuid
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
-from typing import Optional
-import json
-import speech_recognition as sr
-from pydub import AudioSegment
 
-from ...services import servicio_transcripcion
+from ...services import (
+    transcribir_contenido,
+    SesionTranscripcionStream,
+    DecodificadorIncremental,
+    ejecutor_trabajos,
+    gestor_lotes
+)
+from ...services.trabajos_lote import extraer_zip
 from ...utils import (
     validar_archivo_audio, 
-    guardar_archivo_temporal, 
-    eliminar_archivo_temporal,
-    normalizar_audio,
+    guardar_archivo_temporal,
     ErrorFormatoAudio,
     ErrorTamanoArchivo,
-    ErrorTranscripcion
+    ErrorTranscripcion,
+    ErrorColaLlena,
+    ErrorTiempoEsperaCola,
+    FORMATO_PCM_OBJETIVO
 )
-from ..models import RespuestaTranscripcion, OpcionesTranscripcion
+from ..models import RespuestaTranscripcion, OpcionesTranscripcion, EstadoLote
+from ...config import configuracion
+from ...utils.metricas import medir_etapa
+from ...utils.registro import id_solicitud
 
 router = APIRouter(prefix="/api/v1", tags=["Transcripción"])
 
+logger = logging.getLogger(__name__)
+
+# Tipos de contenido con los que los navegadores envían un zip
+TIPOS_ZIP = ("application/zip", "application/x-zip-compressed", "multipart/x-zip")
+# Segundos entre comentarios de mantenimiento del flujo de eventos de un lote
+INTERVALO_LATIDO_EVENTOS = 15.0
+
 @router.post("/transcribir", response_model=RespuestaTranscripcion)
 async def transcribir_audio(
     archivo: UploadFile = File(...),
@@ -54,153 +72,293 @@ async def transcribir_audio(
     
     try:  
         # Validar archivo
+        with medir_etapa("validacion"):
+            validar_archivo_audio(archivo)
+        
+        with medir_etapa("lectura"):
+            contenido = await archivo.read()
+        try:
+            resultado = await transcribir_contenido(contenido, opciones_dict)
+        finally:
+            del contenido
+        logger.info(
+            "Transcripción completada",
+            extra={
+                "caracteres": len(resultado.texto),
+                "audio_recortado_ms": resultado.audio_recortado_ms,
+                "duracion": resultado.duracion,
+                "factor_tiempo_real": resultado.factor_tiempo_real
+            }
+        )
+        
+        # Crear respuesta
+        respuesta = RespuestaTranscripcion(
+            texto=resultado.texto,
+            confianza=resultado.confianza,
+            idioma_detectado=opciones_dict.get("idioma"),
+            duracion=round(resultado.duracion, 3),
+            audio_recortado_ms=resultado.audio_recortado_ms,
+            factor_tiempo_real=(
+                round(resultado.factor_tiempo_real, 4) if resultado.factor_tiempo_real is not None else None
+            )
+        )
+        
+        return respuesta
+    
+    except ErrorFormatoAudio as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ErrorTamanoArchivo as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ErrorColaLlena as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except ErrorTiempoEsperaCola as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ErrorTranscripcion as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        logger.exception("Error inesperado en la transcripción")
+        raise HTTPException(status_code=500, detail=f"Error inesperado: {str(e)}")
+
+def _es_zip(archivo: UploadFile) -> bool:
+    """Indica si el archivo subido es un zip con varios audios."""
+    return (archivo.filename or "").lower().endswith(".zip") or archivo.content_type in TIPOS_ZIP
+
+def _guardar_en_lote(trabajo, archivos: List[UploadFile]) -> None:
+    """
+    Valida los archivos subidos y los guarda en el directorio de trabajo del lote.
+    
+    Raises:
+        ErrorFormatoAudio: Si un archivo no es un audio soportado o un zip válido
+        ErrorTamanoArchivo: Si un archivo excede el tamaño máximo permitido
+    """
+    tamano_max = configuracion.tamano_max_archivo * 1024 * 1024
+    for archivo in archivos:
+        if _es_zip(archivo):
+            ruta_zip = guardar_archivo_temporal(archivo, trabajo.directorio)
+            try:
+                restantes = gestor_lotes.max_archivos - len(trabajo.archivos)
+                for nombre, ruta in extraer_zip(ruta_zip, trabajo.directorio, restantes, tamano_max):
+                    trabajo.agregar_archivo(nombre, ruta)
+            finally:
+                os.remove(ruta_zip)
+            continue
+        
         validar_archivo_audio(archivo)
+        if len(trabajo.archivos) >= gestor_lotes.max_archivos:
+            raise ErrorFormatoAudio(f"El lote admite como máximo {gestor_lotes.max_archivos} archivos")
+        trabajo.agregar_archivo(archivo.filename or "", guardar_archivo_temporal(archivo, trabajo.directorio))
     
-        # Variables para seguimiento de archivos
-        ruta_temporal = None
-        ruta_procesada = None
-        archivo_convertido = False
+    if not trabajo.archivos:
+        raise ErrorFormatoAudio("El lote no contiene archivos de audio")
+
+@router.post("/transcribir/lote", response_model=EstadoLote, status_code=202)
+async def crear_lote(
+    archivos: List[UploadFile] = File(...),
+    opciones: Optional[str] = Form(None)
+):
+    """
+    Encola varios archivos de audio (o un zip con ellos) para transcribirlos en segundo plano.
     
-        try:            # Guardar temporalmente el archivo
-            ruta_temporal = guardar_archivo_temporal(archivo)
-            print(f"Archivo guardado temporalmente en: {ruta_temporal}")
-            
-            # Verificar el formato original del archivo
-            extension = os.path.splitext(ruta_temporal)[1][1:].lower()
-            ruta_procesada = ruta_temporal
-            
-            # Forzar la conversión a WAV para asegurar compatibilidad
-            print(f"Preparando archivo para transcripción. Formato original: {extension}")
-            
-            # Intentamos con múltiples estrategias de conversión si es necesario
-            convertido_exitosamente = False
-            intentos = 0
-            max_intentos = 3
-            
-            while not convertido_exitosamente and intentos < max_intentos:
-                intentos += 1
-                try:
-                    print(f"Intento {intentos} de {max_intentos} para convertir archivo a WAV PCM...")
-                    # Liberar memoria antes de intentar la conversión
-                    import gc
-                    gc.collect()
-                    
-                    # Diferentes estrategias de conversión según el intento
-                    if intentos == 1:
-                        # Primer intento: conversión estándar a WAV
-                        ruta_procesada, archivo_convertido = normalizar_audio(ruta_temporal, "wav")
-                    elif intentos == 2:
-                        # Segundo intento: forzar parámetros específicos
-                        # Usamos FFmpeg directamente con parámetros específicos
-                        import subprocess
-                        from ...utils.audio_config import configurar_ffmpeg
-                        
-                        ffmpeg_path = AudioSegment.converter
-                        temp_wav = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4()}_temp.wav")
-                        
-                        command = [
-                            ffmpeg_path, "-y", "-i", ruta_temporal,
-                            "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1",
-                            temp_wav
-                        ]
-                        subprocess.run(command, check=True)
-                        ruta_procesada = temp_wav
-                        archivo_convertido = True
-                    else:
-                        # Tercer intento: intentar conversión con SoX si está disponible
-                        try:
-                            import subprocess
-                            temp_wav = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4()}_sox.wav")
-                            # Verificar si sox está instalado
-                            try:
-                                subprocess.run(["sox", "--version"], capture_output=True, check=True)
-                                # Usar SoX para la conversión
-                                command = [
-                                    "sox", ruta_temporal, "-r", "16000", "-b", "16", "-c", "1",
-                                    temp_wav
-                                ]
-                                subprocess.run(command, check=True)
-                                ruta_procesada = temp_wav
-                                archivo_convertido = True
-                            except FileNotFoundError:
-                                # SoX no está instalado, usar FFmpeg con más opciones
-                                ffmpeg_path = AudioSegment.converter
-                                command = [
-                                    ffmpeg_path, "-y", "-i", ruta_temporal, 
-                                    "-f", "wav", "-bitexact", "-acodec", "pcm_s16le", 
-                                    "-ar", "16000", "-ac", "1", temp_wav
-                                ]
-                                subprocess.run(command, check=True)
-                                ruta_procesada = temp_wav
-                                archivo_convertido = True
-                        except Exception as e:
-                            print(f"Error en tercer intento de conversión: {str(e)}")
-                            # Intentaremos con el archivo original como último recurso
-                            ruta_procesada = ruta_temporal
-                            archivo_convertido = False
-                    
-                    # Verificar que el archivo resultante es válido para SpeechRecognition
-                    try:
-                        with sr.AudioFile(ruta_procesada) as fuente:
-                            # Si no lanza excepción, el archivo es válido
-                            print("Archivo convertido correctamente y validado para transcripción")
-                            convertido_exitosamente = True
-                    except Exception as e:
-                        print(f"El archivo convertido no es válido para SpeechRecognition: {str(e)}")
-                        # Intentaremos con otra estrategia en la siguiente iteración
-                except Exception as e:
-                    print(f"Error al convertir archivo (intento {intentos}): {str(e)}")
-                    # Continuar al siguiente intento
-            
-            # Si no pudimos convertir exitosamente después de todos los intentos
-            if not convertido_exitosamente:
-                print(f"No se pudo convertir el archivo a un formato válido después de {max_intentos} intentos.")
-                print("Intentando usar el archivo original como último recurso...")
-                ruta_procesada = ruta_temporal
-                archivo_convertido = False
-            
-            # Transcribir audio con el mejor archivo que tengamos
-            texto = servicio_transcripcion.transcribir(ruta_procesada, opciones_dict)
-            print("Transcripción completada con éxito")
-            
-            # Crear respuesta
-            respuesta = RespuestaTranscripcion(
-                texto=texto,
-                # Los siguientes campos son opcionales y podrían ser
-                # proporcionados por el motor de transcripción en el futuro
-                confianza=None,
-                idioma_detectado=opciones_dict.get("idioma"),
-                duracion=None
+    El progreso se consulta en /transcribir/lote/{id} o se recibe como eventos en
+    /transcribir/lote/{id}/eventos.
+    
+    Args:
+        archivos: Archivos de audio o archivos zip con audios
+        opciones: Opciones de transcripción en formato JSON comunes a todos los archivos (opcional)
+        
+    Returns:
+        Estado inicial del lote
+        
+    Raises:
+        HTTPException: Si algún archivo no es válido o hay demasiados lotes en curso
+    """
+    opciones_dict = {}
+    if opciones:
+        try:
+            opciones_dict = json.loads(opciones)
+        except json.JSONDecodeError:
+            raise HTTPException(
+                status_code=400,
+                detail="Las opciones proporcionadas no son un JSON válido"
             )
-            
-            return respuesta
-
-        finally:
-            # Cerrar explícitamente cualquier referencia a los archivos
-            import gc
-            import time
-            
-            # Dar tiempo a que se liberen los recursos
-            print("Esperando a que se liberen los recursos antes de limpiar...")
-            time.sleep(1)  # Esperar 1 segundo
-            gc.collect()  # Forzar la recolección de basura
-            
-            # SOLO eliminar el archivo convertido temporal, no el original
-            # El archivo original se mantendrá para evitar problemas de acceso
-            if archivo_convertido and ruta_procesada and ruta_procesada != ruta_temporal:
-                print(f"Limpiando archivo convertido: {ruta_procesada}")
-                eliminar_archivo_temporal(ruta_procesada)
-            
-            # Ya no eliminamos el archivo original para evitar errores
-            # Los archivos temporales se eliminarán automáticamente por el sistema
-            if ruta_temporal:
-                print(f"El archivo original {ruta_temporal} se mantendrá para evitar errores de acceso")
     
+    try:
+        trabajo = gestor_lotes.crear_trabajo(opciones_dict)
+    except ErrorColaLlena as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    
+    try:
+        # Copiar los archivos al disco sin bloquear el bucle de eventos
+        await ejecutor_trabajos.ejecutar_en_hilo(_guardar_en_lote, trabajo, archivos)
     except ErrorFormatoAudio as e:
+        gestor_lotes.descartar(trabajo)
         raise HTTPException(status_code=415, detail=str(e))
     except ErrorTamanoArchivo as e:
+        gestor_lotes.descartar(trabajo)
         raise HTTPException(status_code=413, detail=str(e))
-    except ErrorTranscripcion as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    except ErrorColaLlena as e:
+        gestor_lotes.descartar(trabajo)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except ErrorTiempoEsperaCola as e:
+        gestor_lotes.descartar(trabajo)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
+        gestor_lotes.descartar(trabajo)
         raise HTTPException(status_code=500, detail=f"Error inesperado: {str(e)}")
+    
+    gestor_lotes.encolar(trabajo)
+    logger.info("Lote %s encolado con %d archivos", trabajo.id, len(trabajo.archivos))
+    return trabajo.to_dict()
+
+@router.get("/transcribir/lote/{id_lote}", response_model=EstadoLote)
+async def obtener_lote(id_lote: str):
+    """
+    Devuelve el estado de un lote y los resultados de los archivos ya procesados.
+    
+    Args:
+        id_lote: Identificador del lote
+        
+    Raises:
+        HTTPException: Si el lote no existe o ha expirado
+    """
+    trabajo = gestor_lotes.obtener(id_lote)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="Lote no encontrado")
+    return trabajo.to_dict()
+
+@router.get("/transcribir/lote/{id_lote}/eventos")
+async def eventos_lote(id_lote: str, request: Request):
+    """
+    Envía el progreso de un lote como Server-Sent Events.
+    
+    Eventos:
+        - "estado": estado completo del lote al conectarse
+        - "progreso": estado de un archivo cada vez que empieza o termina
+        - "fin": resumen del lote cuando todos los archivos se han procesado
+    
+    Args:
+        id_lote: Identificador del lote
+        request: Solicitud entrante (para detectar la desconexión del cliente)
+        
+    Raises:
+        HTTPException: Si el lote no existe o ha expirado
+    """
+    trabajo = gestor_lotes.obtener(id_lote)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="Lote no encontrado")
+    
+    def formatear(tipo: str, datos: dict) -> str:
+        return f"event: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+    
+    async def generar():
+        # Suscribirse antes de leer el estado para no perder eventos intermedios
+        cola = trabajo.suscribir()
+        try:
+            yield formatear("estado", trabajo.to_dict())
+            if trabajo.terminado:
+                yield formatear("fin", trabajo.resumen())
+                return
+            while not await request.is_disconnected():
+                try:
+                    tipo, datos = await asyncio.wait_for(cola.get(), INTERVALO_LATIDO_EVENTOS)
+                except asyncio.TimeoutError:
+                    yield ": latido\n\n"
+                    continue
+                yield formatear(tipo, datos)
+                if tipo == "fin":
+                    return
+        finally:
+            trabajo.cancelar_suscripcion(cola)
+    
+    return StreamingResponse(
+        generar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/transcribir/stream")
+async def transcribir_stream(websocket: WebSocket):
+    """
+    Transcribe en tiempo real un flujo de audio recibido por WebSocket.
+    
+    Protocolo:
+        - (Opcional) primer mensaje de texto con la configuración en JSON:
+          {"formato": "webm" | "ogg" | "pcm", "opciones": {"idioma": "es-ES", ...}, "dispositivo": "..."}.
+          "pcm" indica PCM de 16 bits, 16 kHz, mono sin contenedor. "dispositivo" identifica
+          el micrófono para reutilizar su ruido de fondo en sesiones posteriores.
+        - Mensajes binarios con los fragmentos de audio a medida que se graban.
+        - Mensaje de texto {"evento": "fin"} para terminar la grabación.
+    
+    El servidor envía mensajes JSON:
+        - {"tipo": "parcial", "indice": n, "texto": ...} mientras el enunciado n sigue abierto
+        - {"tipo": "final", "indice": n, "texto": ..., "duracion": s} cuando el enunciado n se cierra
+        - {"tipo": "error", "mensaje": ...} si ocurre un error
+        - {"tipo": "fin"} cuando se han enviado todos los finales
+    
+    Args:
+        websocket: Conexión WebSocket con el cliente
+    """
+    await websocket.accept()
+    # Los WebSocket no pasan por el middleware HTTP: asignar aquí el id de los registros
+    id_solicitud.set(websocket.headers.get("x-request-id") or uuid.uuid4().hex)
+    
+    formato = "webm"
+    opciones_dict = {}
+    dispositivo = None
+    sesion = None
+    decodificador = None
+    
+    try:
+        while True:
+            mensaje = await websocket.receive()
+            if mensaje["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(mensaje.get("code", 1000))
+            
+            if mensaje.get("bytes") is not None:
+                if sesion is None:
+                    # El PCM sin contenedor llega en el formato del protocolo; el decodificado,
+                    # directamente en el formato nativo del motor activo
+                    sesion = SesionTranscripcionStream(
+                        websocket.send_json, opciones_dict, dispositivo,
+                        FORMATO_PCM_OBJETIVO if formato == "pcm" else None
+                    )
+                if formato == "pcm":
+                    await sesion.procesar_pcm(mensaje["bytes"])
+                    continue
+                if decodificador is None:
+                    decodificador = DecodificadorIncremental(sesion.procesar_pcm, sesion.formato)
+                    await decodificador.iniciar()
+                await decodificador.escribir(mensaje["bytes"])
+                continue
+            
+            try:
+                datos = json.loads(mensaje.get("text") or "{}")
+            except json.JSONDecodeError:
+                await websocket.send_json({"tipo": "error", "mensaje": "Mensaje de control no es un JSON válido"})
+                continue
+            
+            if datos.get("evento") == "fin":
+                break
+            if sesion is None:
+                formato = str(datos.get("formato", formato)).lower()
+                opciones_dict = datos.get("opciones") or {}
+                dispositivo = datos.get("dispositivo") or dispositivo
+        
+        if decodificador:
+            await decodificador.cerrar()
+        if sesion:
+            await sesion.finalizar()
+        await websocket.send_json({"tipo": "fin"})
+        await websocket.close()
+    
+    except WebSocketDisconnect:
+        logger.info("Cliente desconectado durante la transcripción en tiempo real")
+    except (BrokenPipeError, ConnectionResetError):
+        # ffmpeg terminó porque el flujo recibido no es un audio válido
+        await websocket.send_json({"tipo": "error", "mensaje": f"No se pudo decodificar el flujo de audio ({formato})"})
+        await websocket.close()
+    finally:
+        if decodificador:
+            decodificador.abortar()
+        if sesion:
+            sesion.cancelar()
@@ -2,6 +2,7 @@
 Módulo de configuración para la aplicación.
 Todas las configuraciones se obtienen de variables de entorno.
 """
+import logging
 import os
 from pydantic_settings import BaseSettings
 from typing import List, Set
@@ -18,12 +19,74 @@ class Configuracion(BaseSettings):
     
     # Configuración de logging
     nivel_log: str
+    log_formato: str = "json"  # Formato de los registros: json (una línea JSON por registro) o texto
+    log_archivo: str = "logs/app.log"  # Archivo donde se copian los registros (vacío = solo salida estándar)
     
     # Configuración de archivos de audio
     tamano_max_archivo: int  # En MB
     formatos_permitidos: str
     tiempo_espera: int  # En segundos
     
+    # Directorio base para archivos temporales (vacío = directorio temporal del sistema)
+    directorio_temporal: str = ""
+    
+    # Configuración del ejecutor de trabajos
+    hilos_motor: int = 8  # Hilos para las llamadas a los motores de transcripción
+    procesos_decodificacion: int = 2  # Procesos para decodificación (0 = usar hilos)
+    cola_max_solicitudes: int = 32  # Tareas en espera por pool antes de responder 429
+    tiempo_max_cola: float = 10.0  # Segundos de espera en cola antes de responder 503
+    
+    # Cliente HTTP del motor de Google
+    google_max_conexiones: int = 20  # Conexiones simultáneas reutilizables
+    google_keepalive: float = 30.0  # Segundos que se mantiene abierta una conexión inactiva
+    google_tiempo_conexion: float = 5.0  # Segundos máximos para establecer una conexión
+    google_http2: bool = True  # Usar HTTP/2 si el paquete h2 está instalado
+    
+    # Enrutamiento entre varios motores
+    motores_transcripcion: str = ""  # Motores separados por comas entre los que elegir (vacío = solo motor_transcripcion)
+    enrutador_cobertura: bool = False  # Lanzar un segundo motor si el primero tarda más de lo habitual
+    enrutador_percentil_cobertura: float = 95.0  # Percentil de latencia a partir del cual se lanza la cobertura
+    enrutador_ventana: int = 100  # Latencias recientes conservadas por motor
+    enrutador_errores_max: int = 3  # Fallos seguidos tras los que un motor se aparta temporalmente
+    enrutador_enfriamiento: float = 30.0  # Segundos que un motor permanece apartado
+    
+    # Motor sin conexión (MOTOR_TRANSCRIPCION=whisper)
+    whisper_modelo: str = "small"  # Tamaño del modelo o ruta a un modelo CTranslate2
+    whisper_tipo_calculo: str = "int8"  # Cuantización en CPU
+    whisper_hilos_cpu: int = 0  # Hilos de inferencia (0 = automático)
+    whisper_directorio_modelos: str = ""  # Directorio de descarga de modelos (vacío = caché por defecto)
+    whisper_tamano_lote: int = 8  # Enunciados transcritos en una misma pasada del modelo
+    whisper_espera_lote: float = 0.05  # Segundos de espera para completar un lote
+    
+    # Recorte de silencios antes de transcribir
+    vad_recorte: bool = True  # Eliminar el silencio inicial/final y acortar las pausas largas
+    vad_relleno: float = 0.3  # Segundos de audio conservados alrededor de la voz
+    vad_silencio_maximo: float = 1.0  # Duración máxima en segundos de una pausa interna
+    
+    # Transcripción de audios largos por segmentos
+    umbral_audio_largo: float = 60.0  # Segundos a partir de los cuales se segmenta el audio
+    duracion_segmento: float = 30.0  # Duración máxima de cada segmento en segundos
+    solapamiento_segmento: float = 1.0  # Solapamiento entre segmentos sin pausa en segundos
+    segmentos_concurrentes: int = 4  # Segmentos transcritos simultáneamente por solicitud
+    
+    # Caché de transcripciones
+    cache_capacidad: int = 1024  # Entradas en memoria (0 = caché desactivada)
+    cache_ttl: float = 3600  # Segundos de validez de cada entrada
+    cache_ruta_disco: str = ""  # Archivo SQLite del nivel en disco (vacío = solo memoria)
+    cache_capacidad_disco: int = 100000  # Entradas máximas en disco
+    
+    # Transcripción por lotes
+    lote_trabajadores: int = 4  # Archivos de lotes transcritos simultáneamente
+    lote_max_archivos: int = 500  # Archivos máximos por lote (incluidos los de un zip)
+    lote_retencion: float = 3600  # Segundos que se conservan los resultados de un lote terminado
+    lote_max_activos: int = 32  # Lotes sin terminar admitidos a la vez (los siguientes reciben 429)
+    lote_tamano_max: int = 200  # Tamaño máximo en MB de todos los archivos de un lote
+    
+    # Transcripción en tiempo real por WebSocket
+    stream_intervalo_parcial: float = 1.0  # Segundos de voz entre transcripciones parciales (0 = desactivadas)
+    stream_silencio_cierre: float = 0.7  # Segundos de silencio que cierran un enunciado
+    stream_duracion_max_enunciado: float = 15.0  # Duración máxima de un enunciado en segundos
+    
     @property
     def formatos_permitidos_lista(self) -> List[str]:
         """Devuelve la lista de formatos permitidos como lista."""
@@ -44,8 +107,9 @@ try:
     configuracion = Configuracion()
 except Exception as e:
     # Proporcionar valores predeterminados si la carga de variables de entorno falla
-    print(f"Error al cargar la configuración: {e}")
-    print("Utilizando valores predeterminados...")
+    logging.getLogger(__name__).warning(
+        "Error al cargar la configuración: %s. Utilizando valores predeterminados", e
+    )
     configuracion = Configuracion(
         motor_transcripcion=os.getenv("MOTOR_TRANSCRIPCION", "local"),
         api_clave=os.getenv("API_CLAVE", ""),
@@ -54,5 +118,6 @@ except Exception as e:
         nivel_log=os.getenv("NIVEL_LOG", "INFO"),
         tamano_max_archivo=int(os.getenv("TAMANO_MAX_ARCHIVO", "10")),
         formatos_permitidos=os.getenv("FORMATOS_PERMITIDOS", "wav,mp3,ogg,webm"),
-        tiempo_espera=int(os.getenv("TIEMPO_ESPERA", "30"))
+        tiempo_espera=int(os.getenv("TIEMPO_ESPERA", "30")),
+        directorio_temporal=os.getenv("DIRECTORIO_TEMPORAL", "")
     )
@@ -1,3 +1,23 @@
 from .transcripcion_service import servicio_transcripcion
+from .enrutador_motores import EnrutadorMotores
+from .ejecutor import ejecutor_trabajos
+from .cache_transcripcion import CacheTranscripcion, cache_transcripciones
+from .transcripcion_paralela import transcribir_en_paralelo
+from .transcripcion_stream import SesionTranscripcionStream, DecodificadorIncremental
+from .pipeline_transcripcion import ResultadoTranscripcion, transcribir_contenido
+from .trabajos_lote import GestorLotes, gestor_lotes
 
-__all__ = ['servicio_transcripcion']
+__all__ = [
+    'servicio_transcripcion',
+    'EnrutadorMotores',
+    'ejecutor_trabajos',
+    'CacheTranscripcion',
+    'cache_transcripciones',
+    'transcribir_en_paralelo',
+    'SesionTranscripcionStream',
+    'DecodificadorIncremental',
+    'ResultadoTranscripcion',
+    'transcribir_contenido',
+    'GestorLotes',
+    'gestor_lotes'
+]
@@ -0,0 +1,132 @@
+"""
+Agrupación de solicitudes concurrentes en lotes de inferencia.
+
+Los hilos del ejecutor que llaman a un motor local entregan su audio a un hilo
+agrupador, que espera unos milisegundos a que lleguen más solicitudes compatibles y
+las procesa todas en una sola pasada del modelo.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+class AgrupadorLotes:
+    """Reúne llamadas concurrentes y las resuelve con una única función por lote."""
+
+    def __init__(
+        self,
+        procesar_lote: Callable[[Hashable, List[Any]], List[Any]],
+        tamano_maximo: int = 8,
+        espera_maxima: float = 0.05,
+        nombre: str = "agrupador-lotes"
+    ):
+        """
+        Inicializa el agrupador.
+
+        Args:
+            procesar_lote: Función que recibe la clave del lote y la lista de entradas
+                y devuelve un resultado por entrada, en el mismo orden. Un resultado que
+                sea una excepción se lanza solo en la llamada correspondiente
+            tamano_maximo: Número máximo de entradas por lote
+            espera_maxima: Segundos que se espera a completar un lote tras la primera entrada
+            nombre: Nombre del hilo agrupador
+        """
+        self.procesar_lote = procesar_lote
+        self.tamano_maximo = max(tamano_maximo, 1)
+        self.espera_maxima = espera_maxima
+        self.nombre = nombre
+
+        self._cola: "queue.Queue[Optional[Tuple[Hashable, Any, Future]]]" = queue.Queue()
+        # Entradas recibidas con otra clave mientras se formaba un lote
+        self._aplazadas: List[Tuple[Hashable, Any, Future]] = []
+        self._hilo: Optional[threading.Thread] = None
+        self._bloqueo = threading.Lock()
+
+    def enviar(self, entrada: Any, clave: Hashable = None, tiempo_espera: Optional[float] = None) -> Any:
+        """
+        Encola una entrada y espera su resultado.
+
+        Args:
+            entrada: Entrada para la función de lote
+            clave: Solo se agrupan entradas con la misma clave (p. ej. el idioma)
+            tiempo_espera: Segundos máximos de espera del resultado
+
+        Returns:
+            Resultado correspondiente a la entrada
+
+        Raises:
+            Exception: La excepción lanzada por la función de lote
+        """
+        self._iniciar()
+        futuro: Future = Future()
+        self._cola.put((clave, entrada, futuro))
+        return futuro.result(timeout=tiempo_espera)
+
+    def detener(self, tiempo_espera: float = 5.0) -> None:
+        """Detiene el hilo agrupador tras procesar las entradas ya encoladas."""
+        with self._bloqueo:
+            hilo = self._hilo
+            self._hilo = None
+        if hilo and hilo.is_alive():
+            self._cola.put(None)
+            hilo.join(tiempo_espera)
+
+    def _iniciar(self) -> None:
+        """Inicia el hilo agrupador si no está en ejecución."""
+        with self._bloqueo:
+            if self._hilo and self._hilo.is_alive():
+                return
+            self._hilo = threading.Thread(target=self._ejecutar, name=self.nombre, daemon=True)
+            self._hilo.start()
+
+    def _ejecutar(self) -> None:
+        """Bucle principal: forma lotes y los procesa."""
+        while True:
+            # Las entradas aplazadas tienen prioridad sobre las nuevas
+            primera = self._aplazadas.pop(0) if self._aplazadas else self._cola.get()
+            if primera is None:
+                return
+
+            clave = primera[0]
+            lote = [primera]
+            otras = []
+            for elemento in self._aplazadas:
+                (lote if elemento[0] == clave and len(lote) < self.tamano_maximo else otras).append(elemento)
+            self._aplazadas = []
+            limite = time.monotonic() + self.espera_maxima
+            detener = False
+            while len(lote) < self.tamano_maximo:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    elemento = self._cola.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if elemento is None:
+                    detener = True
+                    break
+                (lote if elemento[0] == clave else otras).append(elemento)
+            self._aplazadas.extend(otras)
+
+            self._procesar(clave, lote)
+            if detener:
+                while self._aplazadas:
+                    pendiente = self._aplazadas.pop(0)
+                    self._procesar(pendiente[0], [pendiente])
+                return
+
+    def _procesar(self, clave: Hashable, lote: List[Tuple[Hashable, Any, Future]]) -> None:
+        """Ejecuta la función de lote y entrega cada resultado a su solicitante."""
+        try:
+            resultados = self.procesar_lote(clave, [entrada for _, entrada, _ in lote])
+        except Exception as e:
+            for _, _, futuro in lote:
+                futuro.set_exception(e)
+            return
+        for (_, _, futuro), resultado in zip(lote, resultados):
+            if isinstance(resultado, Exception):
+                futuro.set_exception(resultado)
+            else:
+                futuro.set_result(resultado)
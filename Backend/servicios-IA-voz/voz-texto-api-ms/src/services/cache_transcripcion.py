@@ -0,0 +1,223 @@
+"""
+Caché de transcripciones direccionada por contenido.
+
+La clave es un hash del PCM decodificado junto con el motor y las opciones de
+transcripción, de modo que el mismo audio reenviado (reintentos del frontend, el mismo
+clip reproducido varias veces) no vuelve a pagar la llamada al motor aunque el
+contenedor original sea distinto. Tiene un nivel en memoria (LRU con TTL) y un nivel
+opcional en disco (SQLite) que sobrevive a los reinicios.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import speech_recognition as sr
+
+from ..config import configuracion
+from .motores_transcripcion import ResultadoMotor
+
+# Número de escrituras en disco entre purgas de entradas expiradas o excedentes
+INTERVALO_PURGA_DISCO = 100
+
+class CacheTranscripcion:
+    """Caché LRU con TTL en memoria y nivel opcional en SQLite."""
+
+    def __init__(self, capacidad: int, ttl: float, ruta_disco: str = "", capacidad_disco: int = 100000):
+        """
+        Inicializa la caché.
+
+        Args:
+            capacidad: Número máximo de entradas en memoria (0 = caché desactivada)
+            ttl: Segundos de validez de cada entrada
+            ruta_disco: Ruta al archivo SQLite del nivel en disco (vacío = sin nivel en disco)
+            capacidad_disco: Número máximo de entradas en disco
+        """
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self.ruta_disco = ruta_disco
+        self.capacidad_disco = capacidad_disco
+
+        self._memoria: "OrderedDict[str, Tuple[str, Optional[float], float]]" = OrderedDict()
+        self._bloqueo = threading.Lock()
+        self._conexion: Optional[sqlite3.Connection] = None
+        self._escrituras_disco = 0
+        self._contadores = {
+            "aciertos_memoria": 0,
+            "aciertos_disco": 0,
+            "fallos": 0,
+            "expulsiones": 0,
+        }
+
+    @property
+    def activa(self) -> bool:
+        """Indica si la caché está habilitada."""
+        return self.capacidad > 0
+
+    @staticmethod
+    def calcular_clave(audio: sr.AudioData, motor: str, opciones: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Calcula la clave de un audio decodificado.
+
+        Args:
+            audio: Audio PCM decodificado
+            motor: Nombre del motor de transcripción
+            opciones: Opciones de transcripción
+
+        Returns:
+            Clave hexadecimal
+        """
+        resumen = hashlib.blake2b(digest_size=32)
+        resumen.update(f"{audio.sample_rate}:{audio.sample_width}:{motor}:".encode())
+        resumen.update(json.dumps(opciones or {}, sort_keys=True, default=str).encode())
+        resumen.update(audio.frame_data)
+        return resumen.hexdigest()
+
+    def obtener(self, clave: str) -> Optional[ResultadoMotor]:
+        """
+        Busca una transcripción en la caché.
+
+        Args:
+            clave: Clave calculada con calcular_clave
+
+        Returns:
+            Texto transcrito y confianza, o None si no está en caché o ha expirado
+        """
+        if not self.activa:
+            return None
+
+        ahora = time.time()
+        with self._bloqueo:
+            entrada = self._memoria.get(clave)
+            if entrada and entrada[2] > ahora:
+                self._memoria.move_to_end(clave)
+                self._contadores["aciertos_memoria"] += 1
+                return ResultadoMotor(entrada[0], entrada[1])
+            if entrada:
+                del self._memoria[clave]
+
+            entrada = self._leer_disco(clave, ahora)
+            if entrada:
+                self._guardar_memoria(clave, *entrada)
+                self._contadores["aciertos_disco"] += 1
+                return ResultadoMotor(entrada[0], entrada[1])
+
+            self._contadores["fallos"] += 1
+            return None
+
+    def guardar(self, clave: str, texto: str, confianza: Optional[float] = None) -> None:
+        """
+        Guarda una transcripción en la caché.
+
+        Args:
+            clave: Clave calculada con calcular_clave
+            texto: Texto transcrito
+            confianza: Confianza que informó el motor
+        """
+        if not self.activa:
+            return
+
+        expira = time.time() + self.ttl
+        with self._bloqueo:
+            self._guardar_memoria(clave, texto, confianza, expira)
+            self._escribir_disco(clave, texto, confianza, expira)
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """
+        Devuelve los contadores de aciertos y fallos de la caché.
+
+        Returns:
+            Diccionario con los contadores y la ocupación
+        """
+        with self._bloqueo:
+            consultas = sum(self._contadores[c] for c in ("aciertos_memoria", "aciertos_disco", "fallos"))
+            aciertos = self._contadores["aciertos_memoria"] + self._contadores["aciertos_disco"]
+            return {
+                **self._contadores,
+                "entradas_memoria": len(self._memoria),
+                "tasa_aciertos": aciertos / consultas if consultas else 0.0,
+                "nivel_disco": bool(self.ruta_disco),
+            }
+
+    def cerrar(self) -> None:
+        """Cierra la conexión con el nivel en disco."""
+        with self._bloqueo:
+            if self._conexion:
+                self._conexion.close()
+                self._conexion = None
+
+    def _guardar_memoria(self, clave: str, texto: str, confianza: Optional[float], expira: float) -> None:
+        """Inserta una entrada en memoria expulsando la menos usada si es necesario."""
+        self._memoria[clave] = (texto, confianza, expira)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.capacidad:
+            self._memoria.popitem(last=False)
+            self._contadores["expulsiones"] += 1
+
+    def _obtener_conexion(self) -> Optional[sqlite3.Connection]:
+        """Abre la base de datos del nivel en disco la primera vez que se necesita."""
+        if not self.ruta_disco:
+            return None
+        if self._conexion is None:
+            self._conexion = sqlite3.connect(self.ruta_disco, check_same_thread=False)
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute(
+                "CREATE TABLE IF NOT EXISTS transcripciones ("
+                "clave TEXT PRIMARY KEY, texto TEXT NOT NULL, confianza REAL, "
+                "expira REAL NOT NULL, acceso REAL NOT NULL)"
+            )
+            # Las bases creadas antes de guardar la confianza no tienen la columna
+            columnas = {fila[1] for fila in self._conexion.execute("PRAGMA table_info(transcripciones)")}
+            if "confianza" not in columnas:
+                self._conexion.execute("ALTER TABLE transcripciones ADD COLUMN confianza REAL")
+            self._conexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_transcripciones_acceso ON transcripciones (acceso)"
+            )
+        return self._conexion
+
+    def _leer_disco(self, clave: str, ahora: float) -> Optional[Tuple[str, Optional[float], float]]:
+        """Lee una entrada vigente del nivel en disco."""
+        conexion = self._obtener_conexion()
+        if conexion is None:
+            return None
+        fila = conexion.execute(
+            "SELECT texto, confianza, expira FROM transcripciones WHERE clave = ? AND expira > ?",
+            (clave, ahora)
+        ).fetchone()
+        if fila:
+            conexion.execute("UPDATE transcripciones SET acceso = ? WHERE clave = ?", (ahora, clave))
+            conexion.commit()
+        return fila
+
+    def _escribir_disco(self, clave: str, texto: str, confianza: Optional[float], expira: float) -> None:
+        """Escribe una entrada en disco y purga periódicamente las expiradas y las menos usadas."""
+        conexion = self._obtener_conexion()
+        if conexion is None:
+            return
+        ahora = time.time()
+        conexion.execute(
+            "INSERT OR REPLACE INTO transcripciones (clave, texto, confianza, expira, acceso) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (clave, texto, confianza, expira, ahora)
+        )
+        # La purga recorre la tabla, así que se hace cada cierto número de escrituras
+        self._escrituras_disco += 1
+        if self._escrituras_disco % INTERVALO_PURGA_DISCO == 0:
+            conexion.execute("DELETE FROM transcripciones WHERE expira <= ?", (ahora,))
+            conexion.execute(
+                "DELETE FROM transcripciones WHERE clave IN ("
+                "SELECT clave FROM transcripciones ORDER BY acceso DESC LIMIT -1 OFFSET ?)",
+                (self.capacidad_disco,)
+            )
+        conexion.commit()
+
+# Instancia global de la caché
+cache_transcripciones = CacheTranscripcion(
+    capacidad=configuracion.cache_capacidad,
+    ttl=configuracion.cache_ttl,
+    ruta_disco=configuracion.cache_ruta_disco,
+    capacidad_disco=configuracion.cache_capacidad_disco
+)
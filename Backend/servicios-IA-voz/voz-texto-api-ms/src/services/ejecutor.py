@@ -0,0 +1,220 @@
+"""
+Ejecutor acotado para el trabajo bloqueante de la transcripción.
+
+Las llamadas de red a los motores se ejecutan en un pool de hilos y la decodificación
+y el remuestreo en un pool de procesos, de modo que el bucle de eventos de uvicorn
+queda libre (por ejemplo, para responder a /salud durante una transcripción larga).
+Cada pool tiene una cola acotada: cuando se llena, las solicitudes se rechazan de
+inmediato (429) y si una tarea espera demasiado para empezar se abandona (503).
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+from ..config import configuracion
+from ..utils import ErrorColaLlena, ErrorTiempoEsperaCola
+from ..utils.audio_config import configurar_ffmpeg
+
+POOL_HILOS = "hilos"
+POOL_PROCESOS = "procesos"
+
+def _ejecutar_medido(funcion: Callable, *args: Any) -> Tuple[Any, float, float]:
+    """
+    Ejecuta una función registrando el instante de inicio y fin.
+
+    Se define a nivel de módulo para poder enviarse a un pool de procesos.
+
+    Returns:
+        Tupla con el resultado, el instante de inicio y el instante de fin
+    """
+    inicio = time.time()
+    resultado = funcion(*args)
+    return resultado, inicio, time.time()
+
+class EstadisticasPool:
+    """Contadores de ocupación y latencia de un pool."""
+
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        self.pendientes = 0
+        self.completadas = 0
+        self.fallidas = 0
+        self.rechazadas = 0
+        self.expiradas = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.ejecucion_total = 0.0
+        self.ejecucion_max = 0.0
+
+    def registrar(self, espera: float, ejecucion: float) -> None:
+        """Registra los tiempos de una tarea completada."""
+        self.completadas += 1
+        self.espera_total += espera
+        self.espera_max = max(self.espera_max, espera)
+        self.ejecucion_total += ejecucion
+        self.ejecucion_max = max(self.ejecucion_max, ejecucion)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte las estadísticas a un diccionario."""
+        completadas = self.completadas or 1
+        return {
+            "capacidad": self.capacidad,
+            "en_curso": min(self.pendientes, self.capacidad),
+            "en_cola": max(self.pendientes - self.capacidad, 0),
+            "completadas": self.completadas,
+            "fallidas": self.fallidas,
+            "rechazadas": self.rechazadas,
+            "expiradas": self.expiradas,
+            "espera_media": self.espera_total / completadas,
+            "espera_max": self.espera_max,
+            "ejecucion_media": self.ejecucion_total / completadas,
+            "ejecucion_max": self.ejecucion_max,
+        }
+
+class EjecutorTrabajos:
+    """Pools de hilos y procesos con cola acotada y métricas."""
+
+    def __init__(
+        self,
+        hilos: int,
+        procesos: int,
+        cola_max: int,
+        tiempo_max_cola: float
+    ):
+        """
+        Inicializa el ejecutor. Los pools se crean de forma diferida.
+
+        Args:
+            hilos: Número de hilos para las llamadas a los motores
+            procesos: Número de procesos para decodificación y remuestreo
+                (0 = usar el pool de hilos)
+            cola_max: Número máximo de tareas en espera por pool
+            tiempo_max_cola: Segundos máximos que una tarea puede esperar para empezar
+        """
+        self.hilos = max(hilos, 1)
+        self.procesos = max(procesos, 0)
+        self.cola_max = cola_max
+        self.tiempo_max_cola = tiempo_max_cola
+
+        self._pools: Dict[str, Executor] = {}
+        self._bloqueo = threading.Lock()
+        self._estadisticas = {
+            POOL_HILOS: EstadisticasPool(self.hilos),
+            POOL_PROCESOS: EstadisticasPool(self.procesos or self.hilos),
+        }
+
+    def _obtener_pool(self, tipo: str) -> Executor:
+        """Devuelve el pool solicitado, creándolo si es necesario."""
+        if tipo == POOL_PROCESOS and not self.procesos:
+            tipo = POOL_HILOS
+
+        with self._bloqueo:
+            pool = self._pools.get(tipo)
+            if pool is None:
+                if tipo == POOL_PROCESOS:
+                    pool = ProcessPoolExecutor(
+                        max_workers=self.procesos,
+                        initializer=configurar_ffmpeg
+                    )
+                else:
+                    pool = ThreadPoolExecutor(
+                        max_workers=self.hilos,
+                        thread_name_prefix="transcripcion"
+                    )
+                self._pools[tipo] = pool
+            return pool
+
+    async def ejecutar_en_hilo(self, funcion: Callable, *args: Any) -> Any:
+        """
+        Ejecuta una función bloqueante de E/S (p. ej. una llamada de red) en el pool de hilos.
+
+        Raises:
+            ErrorColaLlena: Si la cola del pool está llena
+            ErrorTiempoEsperaCola: Si la tarea no empezó dentro del tiempo máximo de cola
+        """
+        return await self._ejecutar(POOL_HILOS, funcion, *args)
+
+    async def ejecutar_en_proceso(self, funcion: Callable, *args: Any) -> Any:
+        """
+        Ejecuta una función intensiva en CPU o subprocesos en el pool de procesos.
+
+        La función y sus argumentos deben poder serializarse con pickle.
+
+        Raises:
+            ErrorColaLlena: Si la cola del pool está llena
+            ErrorTiempoEsperaCola: Si la tarea no empezó dentro del tiempo máximo de cola
+        """
+        return await self._ejecutar(POOL_PROCESOS, funcion, *args)
+
+    async def _ejecutar(self, tipo: str, funcion: Callable, *args: Any) -> Any:
+        """Envía una función al pool indicado aplicando la contrapresión."""
+        estadisticas = self._estadisticas[tipo]
+        with self._bloqueo:
+            if estadisticas.pendientes >= estadisticas.capacidad + self.cola_max:
+                estadisticas.rechazadas += 1
+                raise ErrorColaLlena(
+                    "El servicio está procesando demasiadas solicitudes. Inténtelo más tarde"
+                )
+            estadisticas.pendientes += 1
+
+        try:
+            encolado = time.time()
+            pool = self._obtener_pool(tipo)
+            if isinstance(pool, ThreadPoolExecutor):
+                # Propagar las variables de contexto (id de solicitud de los registros) al hilo
+                futuro = pool.submit(contextvars.copy_context().run, _ejecutar_medido, funcion, *args)
+            else:
+                futuro = pool.submit(_ejecutar_medido, funcion, *args)
+            futuro_async = asyncio.wrap_future(futuro)
+
+            # Abandonar la tarea si no ha empezado dentro del tiempo máximo de cola
+            terminados, _ = await asyncio.wait({futuro_async}, timeout=self.tiempo_max_cola)
+            if not terminados and futuro.cancel():
+                with self._bloqueo:
+                    estadisticas.expiradas += 1
+                raise ErrorTiempoEsperaCola(
+                    f"La solicitud esperó más de {self.tiempo_max_cola} segundos en cola"
+                )
+
+            try:
+                resultado, inicio, fin = await futuro_async
+            except Exception:
+                with self._bloqueo:
+                    estadisticas.fallidas += 1
+                raise
+
+            with self._bloqueo:
+                estadisticas.registrar(espera=max(inicio - encolado, 0.0), ejecucion=fin - inicio)
+            return resultado
+        finally:
+            with self._bloqueo:
+                estadisticas.pendientes -= 1
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """
+        Devuelve las métricas de ocupación, espera en cola y tiempo de ejecución.
+
+        Returns:
+            Diccionario con las métricas de cada pool
+        """
+        with self._bloqueo:
+            return {tipo: estadisticas.to_dict() for tipo, estadisticas in self._estadisticas.items()}
+
+    def cerrar(self) -> None:
+        """Cierra los pools esperando a que terminen las tareas en curso."""
+        with self._bloqueo:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+# Instancia global del ejecutor
+ejecutor_trabajos = EjecutorTrabajos(
+    hilos=configuracion.hilos_motor,
+    procesos=configuracion.procesos_decodificacion,
+    cola_max=configuracion.cola_max_solicitudes,
+    tiempo_max_cola=configuracion.tiempo_max_cola
+)
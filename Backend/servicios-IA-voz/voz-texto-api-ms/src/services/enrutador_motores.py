@@ -0,0 +1,259 @@
+"""
+Enrutamiento de las transcripciones entre varios motores según su latencia.
+
+Cada motor lleva una ventana deslizante con sus latencias recientes y sus errores.
+Cada solicitud va al motor sano más rápido; si falla, se reintenta con el siguiente.
+Con la cobertura activada, si el motor elegido no responde dentro de su percentil de
+latencia configurado se lanza la misma solicitud en el siguiente motor y se usa la
+primera respuesta.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import speech_recognition as sr
+
+from ..utils import ErrorAudioSinVoz, ErrorTranscripcion, FormatoPCM, FORMATO_PCM_OBJETIVO
+from .motores_transcripcion import MotorTranscripcionBase, ResultadoMotor
+
+class EstadisticasMotor:
+    """Latencias recientes y errores de un motor."""
+
+    def __init__(self, ventana: int):
+        self.latencias: "deque[float]" = deque(maxlen=max(ventana, 1))
+        self.exitos = 0
+        self.errores = 0
+        self.coberturas = 0
+        self.errores_consecutivos = 0
+        self.excluido_hasta = 0.0
+
+    def registrar_exito(self, latencia: float) -> None:
+        """Registra una transcripción terminada en el tiempo indicado."""
+        self.latencias.append(latencia)
+        self.exitos += 1
+        self.errores_consecutivos = 0
+
+    def registrar_error(self, errores_max: int, enfriamiento: float) -> None:
+        """Registra un fallo y aparta el motor tras varios fallos seguidos."""
+        self.errores += 1
+        self.errores_consecutivos += 1
+        if self.errores_consecutivos >= errores_max:
+            self.excluido_hasta = time.monotonic() + enfriamiento
+
+    def percentil(self, percentil: float) -> Optional[float]:
+        """Latencia del percentil indicado, o None si todavía no hay muestras."""
+        if not self.latencias:
+            return None
+        return float(np.percentile(np.fromiter(self.latencias, dtype=np.float64), percentil))
+
+    def saludable(self) -> bool:
+        """Indica si el motor no está apartado por errores recientes."""
+        return time.monotonic() >= self.excluido_hasta
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte las estadísticas a un diccionario."""
+        return {
+            "exitos": self.exitos,
+            "errores": self.errores,
+            "coberturas": self.coberturas,
+            "saludable": self.saludable(),
+            "latencia_p50": self.percentil(50),
+            "latencia_p95": self.percentil(95),
+        }
+
+class EnrutadorMotores:
+    """Elige el motor más rápido entre varios y recurre a los demás si falla."""
+
+    def __init__(
+        self,
+        motores: Dict[str, MotorTranscripcionBase],
+        cobertura: bool = False,
+        percentil_cobertura: float = 95.0,
+        ventana: int = 100,
+        errores_max: int = 3,
+        enfriamiento: float = 30.0,
+        hilos: int = 8
+    ):
+        """
+        Inicializa el enrutador.
+
+        Args:
+            motores: Motores por nombre, en orden de preferencia mientras no hay latencias medidas
+            cobertura: Lanzar la solicitud en un segundo motor si el primero tarda más de lo habitual
+            percentil_cobertura: Percentil de latencia del motor a partir del cual se lanza la cobertura
+            ventana: Número de latencias recientes que se conservan por motor
+            errores_max: Fallos seguidos tras los que un motor se aparta temporalmente
+            enfriamiento: Segundos que un motor permanece apartado
+            hilos: Hilos para ejecutar las llamadas a los motores
+        """
+        if not motores:
+            raise ValueError("El enrutador necesita al menos un motor")
+        self.motores = motores
+        self.cobertura = cobertura
+        self.percentil_cobertura = percentil_cobertura
+        self.errores_max = errores_max
+        self.enfriamiento = enfriamiento
+
+        self._estadisticas = {nombre: EstadisticasMotor(ventana) for nombre in motores}
+        self._orden_inicial = list(motores)
+        self._bloqueo = threading.Lock()
+        # Las llamadas se ejecutan en un pool propio para poder esperar a dos motores a la vez;
+        # el hilo del ejecutor que llama al enrutador sigue ocupado mientras tanto
+        self._pool = ThreadPoolExecutor(max_workers=max(hilos, 2), thread_name_prefix="motor")
+
+    @property
+    def formato_nativo(self) -> FormatoPCM:
+        """Formato común de los motores, o el formato por defecto si difieren."""
+        formatos = {motor.formato_nativo for motor in self.motores.values()}
+        return formatos.pop() if len(formatos) == 1 else FORMATO_PCM_OBJETIVO
+
+    def ordenar(self) -> List[str]:
+        """
+        Ordena los motores para la siguiente solicitud.
+
+        Los motores sanos van primero, de menor a mayor latencia mediana. Un motor sin
+        latencias medidas se prueba antes que los medidos para conocer su velocidad.
+        Los motores apartados por errores quedan al final como último recurso.
+
+        Returns:
+            Nombres de los motores en el orden en que se intentarán
+        """
+        with self._bloqueo:
+            def prioridad(nombre: str):
+                estadisticas = self._estadisticas[nombre]
+                mediana = estadisticas.percentil(50)
+                return (
+                    not estadisticas.saludable(),
+                    -1.0 if mediana is None else mediana,
+                    self._orden_inicial.index(nombre),
+                )
+            return sorted(self.motores, key=prioridad)
+
+    def transcribir(self, audio: sr.AudioData, opciones: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Transcribe audio con el motor más rápido disponible.
+
+        Args:
+            audio: Audio PCM decodificado
+            opciones: Opciones adicionales para la transcripción
+
+        Returns:
+            Texto transcrito
+        """
+        return self.transcribir_detallado(audio, opciones).texto
+
+    def transcribir_detallado(
+        self,
+        audio: sr.AudioData,
+        opciones: Optional[Dict[str, Any]] = None
+    ) -> ResultadoMotor:
+        """
+        Transcribe audio con el motor más rápido disponible y devuelve su confianza.
+
+        Args:
+            audio: Audio PCM decodificado
+            opciones: Opciones adicionales para la transcripción
+
+        Returns:
+            Texto transcrito y confianza del motor que respondió
+
+        Raises:
+            ErrorAudioSinVoz: Si el motor no reconoce voz en el audio (no se reintenta con otro)
+            ErrorTranscripcion: Si fallan todos los motores
+        """
+        pendientes = self.ordenar()
+        # Llamadas en curso con su motor y su instante de inicio
+        en_curso: Dict[Future, Tuple[str, float]] = {}
+        ultimo_error: Optional[Exception] = None
+
+        self._lanzar(en_curso, pendientes.pop(0), audio, opciones)
+        while en_curso:
+            limite = self._limite_cobertura(en_curso) if pendientes else None
+            terminados, _ = wait(list(en_curso), timeout=limite, return_when=FIRST_COMPLETED)
+
+            if not terminados:
+                # El motor en curso tarda más que su percentil: cubrir con el siguiente
+                nombre = pendientes.pop(0)
+                with self._bloqueo:
+                    self._estadisticas[nombre].coberturas += 1
+                self._lanzar(en_curso, nombre, audio, opciones)
+                continue
+
+            for futuro in terminados:
+                del en_curso[futuro]
+                try:
+                    return futuro.result()
+                except ErrorAudioSinVoz:
+                    raise
+                except Exception as e:
+                    ultimo_error = e
+            # Sin respuesta válida: pasar al siguiente motor si no queda ninguno en curso
+            if not en_curso and pendientes:
+                self._lanzar(en_curso, pendientes.pop(0), audio, opciones)
+
+        if isinstance(ultimo_error, ErrorTranscripcion):
+            raise ultimo_error
+        raise ErrorTranscripcion(f"Error al transcribir audio: {str(ultimo_error)}")
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """
+        Devuelve las latencias y errores de cada motor.
+
+        Returns:
+            Diccionario con las estadísticas por motor y el orden actual
+        """
+        orden = self.ordenar()
+        with self._bloqueo:
+            return {
+                "orden": orden,
+                "cobertura": self.cobertura,
+                "motores": {nombre: e.to_dict() for nombre, e in self._estadisticas.items()},
+            }
+
+    def cerrar(self) -> None:
+        """Cierra el pool de llamadas y libera los recursos de los motores."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        for motor in self.motores.values():
+            motor.cerrar()
+
+    def _limite_cobertura(self, en_curso: Dict[Future, Tuple[str, float]]) -> Optional[float]:
+        """Segundos que se espera al motor en curso antes de lanzar la cobertura."""
+        if not self.cobertura or len(en_curso) > 1:
+            return None
+        nombre, inicio = next(iter(en_curso.values()))
+        with self._bloqueo:
+            percentil = self._estadisticas[nombre].percentil(self.percentil_cobertura)
+        if percentil is None:
+            return None
+        return max(percentil - (time.monotonic() - inicio), 0.0)
+
+    def _lanzar(
+        self,
+        en_curso: Dict[Future, Tuple[str, float]],
+        nombre: str,
+        audio: sr.AudioData,
+        opciones: Optional[Dict[str, Any]]
+    ) -> None:
+        """Envía la transcripción a un motor y anota su resultado al terminar."""
+        inicio = time.monotonic()
+        futuro = self._pool.submit(self.motores[nombre].transcribir_detallado, audio, opciones)
+        en_curso[futuro] = (nombre, inicio)
+        futuro.add_done_callback(partial(self._registrar, nombre, inicio))
+
+    def _registrar(self, nombre: str, inicio: float, futuro: Future) -> None:
+        """Actualiza las estadísticas del motor que resolvió el futuro."""
+        if futuro.cancelled():
+            return
+        latencia = time.monotonic() - inicio
+        error = futuro.exception()
+        with self._bloqueo:
+            estadisticas = self._estadisticas[nombre]
+            # No reconocer voz es una respuesta válida del motor, no un fallo
+            if error is None or isinstance(error, ErrorAudioSinVoz):
+                estadisticas.registrar_exito(latencia)
+            else:
+                estadisticas.registrar_error(self.errores_max, self.enfriamiento)
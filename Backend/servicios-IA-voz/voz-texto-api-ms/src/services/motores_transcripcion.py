@@ -1,86 +1,157 @@
 """
 Implementación de diferentes motores de transcripción de voz a texto.
 """
-import os
+import base64
+import importlib.util
+import json
+import logging
+import math
 import time
 import speech_recognition as sr
-import requests
+import httpx
+import numpy as np
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, List, NamedTuple
 
 from src.config import configuracion
-from src.utils import ErrorMotorTranscripcion, ErrorTranscripcion
+from src.utils import (
+    ErrorMotorTranscripcion,
+    ErrorTranscripcion,
+    ErrorAudioSinVoz,
+    FormatoPCM,
+    FORMATO_PCM_OBJETIVO
+)
+from .agrupador_lotes import AgrupadorLotes
+
+logger = logging.getLogger(__name__)
+
+class ResultadoMotor(NamedTuple):
+    """Texto transcrito por un motor y su confianza (0-1), si el motor la informa."""
+    texto: str
+    confianza: Optional[float] = None
 
 class MotorTranscripcionBase(ABC):
     """Clase base para motores de transcripción."""
     
+    # Formato PCM que el motor consume sin conversiones adicionales. La decodificación
+    # entrega el audio directamente en este formato para no remuestrear dos veces
+    formato_nativo: FormatoPCM = FORMATO_PCM_OBJETIVO
+    
     @abstractmethod
-    def transcribir(self, ruta_archivo: str, opciones: Optional[Dict[str, Any]] = None) -> str:
+    def transcribir(self, audio: sr.AudioData, opciones: Optional[Dict[str, Any]] = None) -> str:
         """
-        Transcribe un archivo de audio a texto.
+        Transcribe audio decodificado en memoria a texto.
         
         Args:
-            ruta_archivo: Ruta al archivo de audio
+            audio: Audio PCM decodificado
             opciones: Opciones adicionales para la transcripción
             
         Returns:
             Texto transcrito
         """
         pass
+    
+    def transcribir_detallado(
+        self,
+        audio: sr.AudioData,
+        opciones: Optional[Dict[str, Any]] = None
+    ) -> ResultadoMotor:
+        """
+        Transcribe audio y devuelve también la confianza del motor.
+        
+        Los motores que no informan la confianza usan esta implementación, que la deja en None.
+        
+        Args:
+            audio: Audio PCM decodificado
+            opciones: Opciones adicionales para la transcripción
+            
+        Returns:
+            Texto transcrito y confianza
+        """
+        return ResultadoMotor(self.transcribir(audio, opciones))
+    
+    def cerrar(self) -> None:
+        """Libera los recursos del motor (conexiones, modelos cargados...)."""
+        pass
 
 class MotorTranscripcionLocal(MotorTranscripcionBase):
-    """Motor de transcripción local utilizando SpeechRecognition."""
+    """
+    Motor de transcripción "local" utilizando SpeechRecognition.
+    
+    A pesar del nombre, envía el audio al servicio web gratuito de Google, por lo que
+    cada transcripción es una llamada de red. Para transcribir sin conexión, use el
+    motor "whisper".
+    """
+    
+    # El servicio web de Google comprime a FLAC a la frecuencia recibida; 16 kHz mono es suficiente
+    formato_nativo = FormatoPCM(16000, 1, 2)
     
     def __init__(self):
         """Inicializa el motor de transcripción local."""
         self.recognizer = sr.Recognizer()
     
-    def transcribir(self, ruta_archivo: str, opciones: Optional[Dict[str, Any]] = None) -> str:
+    def transcribir(self, audio: sr.AudioData, opciones: Optional[Dict[str, Any]] = None) -> str:
         """
-        Transcribe un archivo de audio a texto utilizando el reconocimiento local.
+        Transcribe audio a texto utilizando el reconocimiento local.
         
         Args:
-            ruta_archivo: Ruta al archivo de audio
+            audio: Audio PCM decodificado
             opciones: Opciones adicionales para la transcripción
                 - idioma: Código de idioma (por defecto, "es-ES")
             
         Returns:
             Texto transcrito
         """
+        return self.transcribir_detallado(audio, opciones).texto
+    
+    def transcribir_detallado(
+        self,
+        audio: sr.AudioData,
+        opciones: Optional[Dict[str, Any]] = None
+    ) -> ResultadoMotor:
+        """
+        Transcribe audio y devuelve la confianza de la mejor alternativa.
+        
+        Args:
+            audio: Audio PCM decodificado
+            opciones: Opciones adicionales para la transcripción
+                - idioma: Código de idioma (por defecto, "es-ES")
+            
+        Returns:
+            Texto transcrito y confianza (None si el servicio no la informa)
+        """
         opciones = opciones or {}
         idioma = opciones.get("idioma", "es-ES")
         
         try:
-            # Cargar el archivo de audio
-            with sr.AudioFile(ruta_archivo) as fuente:
-                # Ajustar el reconocedor para el ruido ambiental
-                self.recognizer.adjust_for_ambient_noise(fuente)
-                
-                # Grabar el audio
-                audio = self.recognizer.record(fuente)
-                
-                # Establecer tiempo de espera
-                tiempo_inicio = time.time()
-                
-                # Utilizar el reconocedor de Google (gratuito)
-                texto = self.recognizer.recognize_google(
-                    audio, 
-                    language=idioma,
-                    show_all=False
+            # El audio ya está decodificado en memoria: se envía completo, sin volver a leerlo
+            # con AudioFile ni calibrar el ruido con adjust_for_ambient_noise, que consumía el
+            # primer segundo (y solo afecta a listen(), no a la transcripción de un audio grabado)
+            tiempo_inicio = time.time()
+            
+            # Utilizar el reconocedor de Google (gratuito). Con show_all se obtiene la
+            # respuesta completa, que incluye la confianza de la mejor alternativa
+            respuesta = self.recognizer.recognize_google(
+                audio, 
+                language=idioma,
+                show_all=True
+            )
+            alternativas = respuesta.get("alternative") if isinstance(respuesta, dict) else None
+            if not alternativas or "transcript" not in alternativas[0]:
+                raise sr.UnknownValueError()
+            
+            # Verificar tiempo de ejecución
+            tiempo_transcurrido = time.time() - tiempo_inicio
+            if tiempo_transcurrido > configuracion.tiempo_espera:
+                raise ErrorTranscripcion(
+                    f"La transcripción excedió el tiempo máximo de espera "
+                    f"({configuracion.tiempo_espera} segundos)"
                 )
-                
-                # Verificar tiempo de ejecución
-                tiempo_transcurrido = time.time() - tiempo_inicio
-                if tiempo_transcurrido > configuracion.tiempo_espera:
-                    raise ErrorTranscripcion(
-                        f"La transcripción excedió el tiempo máximo de espera "
-                        f"({configuracion.tiempo_espera} segundos)"
-                    )
-                
-                return texto
-                
+            
+            return ResultadoMotor(alternativas[0]["transcript"], alternativas[0].get("confidence"))
+            
         except sr.UnknownValueError:
-            raise ErrorTranscripcion("No se pudo reconocer el audio")
+            raise ErrorAudioSinVoz("No se pudo reconocer el audio")
         except sr.RequestError as e:
             raise ErrorTranscripcion(f"Error en la solicitud al servicio de reconocimiento: {str(e)}")
         except Exception as e:
@@ -89,6 +160,9 @@ class MotorTranscripcionLocal(MotorTranscripcionBase):
 class MotorTranscripcionGoogle(MotorTranscripcionBase):
     """Motor de transcripción utilizando Google Speech-to-Text API."""
     
+    # LINEAR16 mono; Google recomienda 16 kHz y no mejora con frecuencias mayores
+    formato_nativo = FormatoPCM(16000, 1, 2)
+    
     def __init__(self, api_clave: str):
         """
         Inicializa el motor de transcripción de Google.
@@ -102,13 +176,65 @@ class MotorTranscripcionGoogle(MotorTranscripcionBase):
             )
         self.api_clave = api_clave
         self.base_url = "https://speech.googleapis.com/v1/speech:recognize"
+        
+        # Cliente compartido por todos los hilos del ejecutor: reutiliza las conexiones
+        # (keep-alive) para que el handshake TCP/TLS no se pague en cada solicitud
+        self.cliente = httpx.Client(
+            http2=self._http2_disponible(),
+            limits=httpx.Limits(
+                max_connections=configuracion.google_max_conexiones,
+                max_keepalive_connections=configuracion.google_max_conexiones,
+                keepalive_expiry=configuracion.google_keepalive
+            ),
+            timeout=httpx.Timeout(
+                configuracion.tiempo_espera,
+                connect=configuracion.google_tiempo_conexion
+            ),
+            headers={"X-Goog-Api-Key": self.api_clave}
+        )
+    
+    @staticmethod
+    def _http2_disponible() -> bool:
+        """Indica si se puede usar HTTP/2 (requiere el paquete opcional h2)."""
+        if not configuracion.google_http2:
+            return False
+        if importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 no disponible (instale httpx[http2]); se usará HTTP/1.1")
+            return False
+        return True
+    
+    @staticmethod
+    def _cuerpo_solicitud(config: Dict[str, Any], pcm: bytes) -> Iterator[bytes]:
+        """
+        Genera el cuerpo JSON de la solicitud codificando el audio en base64 por bloques.
+        
+        Evita construir en memoria la cadena base64 completa y su copia serializada en JSON.
+        
+        Args:
+            config: Sección "config" de la solicitud
+            pcm: Muestras PCM LINEAR16
+            
+        Yields:
+            Fragmentos del cuerpo de la solicitud
+        """
+        yield b'{"config": ' + json.dumps(config).encode("utf-8") + b', "audio": {"content": "'
+        # Bloques múltiplos de 3 bytes para que la concatenación sea base64 válido
+        tamano_bloque = 3 * 64 * 1024
+        vista = memoryview(pcm)
+        for inicio in range(0, len(vista), tamano_bloque):
+            yield base64.b64encode(vista[inicio:inicio + tamano_bloque])
+        yield b'"}}'
     
-    def transcribir(self, ruta_archivo: str, opciones: Optional[Dict[str, Any]] = None) -> str:
+    def cerrar(self) -> None:
+        """Cierra las conexiones del cliente HTTP."""
+        self.cliente.close()
+    
+    def transcribir(self, audio: sr.AudioData, opciones: Optional[Dict[str, Any]] = None) -> str:
         """
-        Transcribe un archivo de audio a texto utilizando Google Speech-to-Text API.
+        Transcribe audio a texto utilizando Google Speech-to-Text API.
         
         Args:
-            ruta_archivo: Ruta al archivo de audio
+            audio: Audio PCM decodificado
             opciones: Opciones adicionales para la transcripción
                 - idioma: Código de idioma (por defecto, "es-ES")
                 - modelo: Modelo específico a utilizar (por defecto, "default")
@@ -116,45 +242,45 @@ class MotorTranscripcionGoogle(MotorTranscripcionBase):
         Returns:
             Texto transcrito
         """
+        return self.transcribir_detallado(audio, opciones).texto
+    
+    def transcribir_detallado(
+        self,
+        audio: sr.AudioData,
+        opciones: Optional[Dict[str, Any]] = None
+    ) -> ResultadoMotor:
+        """
+        Transcribe audio y devuelve la confianza media de los resultados.
+        
+        Args:
+            audio: Audio PCM decodificado
+            opciones: Opciones adicionales para la transcripción (ver transcribir)
+            
+        Returns:
+            Texto transcrito y confianza (None si la API no la informa)
+        """
         opciones = opciones or {}
         idioma = opciones.get("idioma", "es-ES")
         modelo = opciones.get("modelo", "default")
         
         try:
-            # Leer el archivo de audio
-            with open(ruta_archivo, "rb") as archivo_audio:
-                contenido_audio = archivo_audio.read()
-            
-            # Codificar el contenido en base64
-            import base64
-            audio_codificado = base64.b64encode(contenido_audio).decode("utf-8")
-            
-            # Preparar la solicitud
-            headers = {
-                "Content-Type": "application/json",
-                "X-Goog-Api-Key": self.api_clave
-            }
+            # Obtener las muestras PCM de 16 bits (LINEAR16)
+            contenido_audio = audio.get_raw_data(convert_width=self.formato_nativo.ancho_muestra)
             
-            data = {
-                "config": {
-                    "encoding": "LINEAR16",
-                    "sampleRateHertz": 16000,
-                    "languageCode": idioma,
-                    "model": modelo,
-                    "enableAutomaticPunctuation": True
-                },
-                "audio": {
-                    "content": audio_codificado
-                }
+            config = {
+                "encoding": "LINEAR16",
+                "sampleRateHertz": audio.sample_rate,
+                "languageCode": idioma,
+                "model": modelo,
+                "enableAutomaticPunctuation": True
             }
             
-            # Realizar la solicitud con tiempo de espera
+            # Realizar la solicitud con tiempo de espera; el cuerpo se envía por bloques
             tiempo_inicio = time.time()
-            respuesta = requests.post(
+            respuesta = self.cliente.post(
                 self.base_url,
-                headers=headers,
-                json=data,
-                timeout=configuracion.tiempo_espera
+                headers={"Content-Type": "application/json"},
+                content=self._cuerpo_solicitud(config, contenido_audio)
             )
             
             # Verificar tiempo de ejecución
@@ -176,21 +302,198 @@ class MotorTranscripcionGoogle(MotorTranscripcionBase):
             
             # Verificar si hay resultados
             if not datos_respuesta.get("results"):
-                return ""
+                return ResultadoMotor("")
             
-            # Concatenar las alternativas de transcripción
+            # Concatenar las alternativas de transcripción y promediar su confianza
             texto = ""
+            confianzas = []
             for resultado in datos_respuesta["results"]:
                 alternativas = resultado.get("alternatives", [])
                 if alternativas:
                     texto += alternativas[0].get("transcript", "")
+                    if "confidence" in alternativas[0]:
+                        confianzas.append(alternativas[0]["confidence"])
             
-            return texto
+            return ResultadoMotor(texto, sum(confianzas) / len(confianzas) if confianzas else None)
             
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             raise ErrorTranscripcion(f"Error en la solicitud a Google Speech-to-Text: {str(e)}")
         except Exception as e:
             raise ErrorTranscripcion(f"Error durante la transcripción: {str(e)}")
 
+class MotorTranscripcionWhisper(MotorTranscripcionBase):
+    """
+    Motor de transcripción sin conexión con faster-whisper (CTranslate2) en CPU.
+    
+    El modelo se carga una sola vez al crear el motor y lo comparten todos los hilos
+    del ejecutor. Las solicitudes concurrentes del mismo idioma se agrupan en lotes
+    que se resuelven en una única pasada del modelo.
+    """
+    
+    # Whisper trabaja internamente a 16 kHz mono
+    formato_nativo = FormatoPCM(16000, 1, 2)
+    
+    # Duración máxima de cada fragmento que procesa el modelo en segundos
+    DURACION_FRAGMENTO = 30.0
+    
+    def __init__(self):
+        """
+        Carga el modelo configurado.
+        
+        Raises:
+            ErrorMotorTranscripcion: Si faster-whisper no está instalado o el modelo no se puede cargar
+        """
+        try:
+            from faster_whisper import WhisperModel, BatchedInferencePipeline
+        except ImportError:
+            raise ErrorMotorTranscripcion(
+                "El motor de transcripción whisper requiere el paquete faster-whisper "
+                "(pip install faster-whisper)"
+            )
+        
+        try:
+            modelo = WhisperModel(
+                configuracion.whisper_modelo,
+                device="cpu",
+                compute_type=configuracion.whisper_tipo_calculo,
+                cpu_threads=configuracion.whisper_hilos_cpu,
+                download_root=configuracion.whisper_directorio_modelos or None
+            )
+        except Exception as e:
+            raise ErrorMotorTranscripcion(
+                f"No se pudo cargar el modelo whisper '{configuracion.whisper_modelo}': {str(e)}"
+            )
+        
+        self.modelo = modelo
+        self.canalizacion = BatchedInferencePipeline(model=modelo)
+        self.agrupador = AgrupadorLotes(
+            self._transcribir_lote,
+            tamano_maximo=configuracion.whisper_tamano_lote,
+            espera_maxima=configuracion.whisper_espera_lote,
+            nombre="whisper-lotes"
+        )
+    
+    def transcribir(self, audio: sr.AudioData, opciones: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Transcribe audio a texto sin conexión.
+        
+        Args:
+            audio: Audio PCM decodificado
+            opciones: Opciones adicionales para la transcripción
+                - idioma: Código de idioma (por defecto, "es-ES"); Whisper solo usa la parte del idioma
+            
+        Returns:
+            Texto transcrito
+            
+        Raises:
+            ErrorAudioSinVoz: Si no se reconoce ninguna palabra
+        """
+        return self.transcribir_detallado(audio, opciones).texto
+    
+    def transcribir_detallado(
+        self,
+        audio: sr.AudioData,
+        opciones: Optional[Dict[str, Any]] = None
+    ) -> ResultadoMotor:
+        """
+        Transcribe audio y devuelve la probabilidad media de los segmentos como confianza.
+        
+        Args:
+            audio: Audio PCM decodificado
+            opciones: Opciones adicionales para la transcripción (ver transcribir)
+            
+        Returns:
+            Texto transcrito y confianza
+            
+        Raises:
+            ErrorAudioSinVoz: Si no se reconoce ninguna palabra
+        """
+        opciones = opciones or {}
+        idioma = opciones.get("idioma", "es-ES").split("-")[0].lower()
+        
+        frecuencia = self.formato_nativo.frecuencia_muestreo
+        pcm = audio.get_raw_data(convert_rate=frecuencia, convert_width=self.formato_nativo.ancho_muestra)
+        muestras = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+        
+        try:
+            resultado = self.agrupador.enviar(muestras, clave=idioma, tiempo_espera=configuracion.tiempo_espera)
+        except TimeoutError:
+            raise ErrorTranscripcion(
+                f"La transcripción excedió el tiempo máximo de espera "
+                f"({configuracion.tiempo_espera} segundos)"
+            )
+        except ErrorTranscripcion:
+            raise
+        except Exception as e:
+            raise ErrorTranscripcion(f"Error durante la transcripción: {str(e)}")
+        
+        if not resultado.texto:
+            raise ErrorAudioSinVoz("No se pudo reconocer el audio")
+        return resultado
+    
+    def _transcribir_lote(self, idioma: str, audios: List[np.ndarray]) -> List[ResultadoMotor]:
+        """
+        Transcribe varios audios del mismo idioma en una sola pasada por lotes.
+        
+        Los audios se concatenan y cada uno se delimita con clip_timestamps, de modo que
+        el modelo procesa todos sus fragmentos (de hasta 30 s) en el mismo lote.
+        
+        Args:
+            idioma: Código de idioma de Whisper (p. ej. "es")
+            audios: Muestras en coma flotante a 16 kHz de cada solicitud
+            
+        Returns:
+            Texto y confianza de cada audio, en el mismo orden. La confianza es
+            exp(avg_logprob) de cada segmento, ponderada por su duración
+        """
+        frecuencia = self.formato_nativo.frecuencia_muestreo
+        fragmentos = []
+        propietarios = []
+        desplazamiento = 0.0
+        for indice, muestras in enumerate(audios):
+            duracion = len(muestras) / frecuencia
+            inicio = 0.0
+            while inicio < duracion:
+                fin = min(inicio + self.DURACION_FRAGMENTO, duracion)
+                fragmentos.append({"start": desplazamiento + inicio, "end": desplazamiento + fin})
+                propietarios.append(indice)
+                inicio = fin
+            desplazamiento += duracion
+        
+        textos: List[List[str]] = [[] for _ in audios]
+        # Suma de probabilidad × duración y duración total de los segmentos de cada audio
+        probabilidades = [[0.0, 0.0] for _ in audios]
+        if not fragmentos:
+            return [ResultadoMotor("") for _ in audios]
+        
+        segmentos, _ = self.canalizacion.transcribe(
+            np.concatenate(audios),
+            language=idioma,
+            clip_timestamps=fragmentos,
+            batch_size=len(fragmentos),
+            without_timestamps=True
+        )
+        for segmento in segmentos:
+            # Asignar cada segmento al fragmento que contiene su punto medio
+            centro = (segmento.start + segmento.end) / 2
+            for fragmento, indice in zip(fragmentos, propietarios):
+                if fragmento["start"] <= centro < fragmento["end"]:
+                    textos[indice].append(segmento.text.strip())
+                    avg_logprob = getattr(segmento, "avg_logprob", None)
+                    if avg_logprob is not None:
+                        duracion = max(segmento.end - segmento.start, 1e-3)
+                        probabilidades[indice][0] += math.exp(avg_logprob) * duracion
+                        probabilidades[indice][1] += duracion
+                    break
+        
+        return [
+            ResultadoMotor(" ".join(t for t in partes if t), suma / total if total else None)
+            for partes, (suma, total) in zip(textos, probabilidades)
+        ]
+    
+    def cerrar(self) -> None:
+        """Detiene el agrupador de lotes."""
+        self.agrupador.detener()
+
 # Añadir más implementaciones de motores según sea necesario
 # Por ejemplo, AWS Transcribe, IBM Watson, etc.
@@ -0,0 +1,138 @@
+"""
+Flujo completo de transcripción de un archivo de audio ya recibido.
+
+Lo comparten la ruta síncrona /transcribir y los trabajadores de los lotes:
+sondeo del formato, decodificación al formato nativo del motor, recorte de
+silencios, caché y transcripción (en paralelo por segmentos si el audio es largo).
+"""
+import logging
+import time
+from functools import partial
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import speech_recognition as sr
+
+from ..config import configuracion
+from ..utils import (
+    sondear_formato,
+    decodificar_audio,
+    AudioDecodificado,
+    ESTRATEGIA_DIRECTA,
+    ErrorColaLlena,
+    ErrorTiempoEsperaCola
+)
+from ..utils.metricas import duracion_audio, factor_tiempo_real, medir_etapa
+from ..utils.vad import estadisticas_recorte
+from .cache_transcripcion import cache_transcripciones
+from .ejecutor import ejecutor_trabajos
+from .motores_transcripcion import ResultadoMotor
+from .transcripcion_paralela import transcribir_en_paralelo
+from .transcripcion_service import servicio_transcripcion
+
+logger = logging.getLogger(__name__)
+
+class ResultadoTranscripcion(NamedTuple):
+    """Resultado de transcribir un archivo de audio."""
+    texto: str
+    audio_recortado_ms: int = 0
+    # Duración del audio decodificado en segundos, antes del recorte de silencios
+    duracion: float = 0.0
+    # Confianza que informó el motor (0-1), None si no la informa
+    confianza: Optional[float] = None
+    # Segundos de procesamiento por segundo de audio
+    factor_tiempo_real: Optional[float] = None
+
+async def transcribir_contenido(
+    contenido: bytes,
+    opciones: Optional[Dict[str, Any]] = None
+) -> ResultadoTranscripcion:
+    """
+    Transcribe el contenido de un archivo de audio.
+
+    Args:
+        contenido: Bytes del archivo de audio en su formato original
+        opciones: Opciones de transcripción
+
+    Returns:
+        Texto transcrito, milisegundos de silencio eliminados, duración del audio,
+        confianza y factor de tiempo real
+
+    Raises:
+        ErrorFormatoAudio: Si el audio no se puede decodificar
+        ErrorColaLlena: Si el ejecutor no admite más trabajo
+        ErrorTiempoEsperaCola: Si el trabajo esperó demasiado en cola
+        ErrorTranscripcion: Si falla el motor de transcripción
+    """
+    opciones = opciones or {}
+    inicio = time.perf_counter()
+
+    # Sondear la cabecera una sola vez para elegir una única estrategia de decodificación
+    # que entregue el audio directamente en el formato nativo del motor
+    destino = servicio_transcripcion.formato_nativo
+    formato = sondear_formato(contenido, destino)
+    logger.debug("Formato detectado: %s (estrategia: %s)", formato.contenedor, formato.estrategia)
+    with medir_etapa("decodificacion"):
+        if formato.estrategia == ESTRATEGIA_DIRECTA:
+            # WAV PCM ya en el formato del motor: se usa tal cual, sin subprocesos ni conversión
+            pcm = decodificar_audio(contenido, formato, destino)
+        else:
+            # El trabajo bloqueante se delega al ejecutor para no detener el bucle de eventos
+            pcm = await ejecutor_trabajos.ejecutar_en_proceso(decodificar_audio, contenido, formato, destino)
+    # Todas las etapas siguientes comparten este objeto: el audio no se vuelve a decodificar
+    # y la duración sale de la longitud del PCM
+    audio = AudioDecodificado(pcm, destino)
+    del pcm
+    duracion = audio.duracion
+    duracion_audio.observar(duracion)
+
+    # Eliminar el silencio inicial y final y acortar las pausas largas antes de enviar
+    # el audio al motor
+    audio_recortado_ms = 0
+    if configuracion.vad_recorte and destino.canales == 1:
+        total_ms = audio.duracion_ms
+        with medir_etapa("recorte"):
+            audio, audio_recortado_ms = await ejecutor_trabajos.ejecutar_en_hilo(partial(
+                audio.recortar_silencios,
+                relleno=int(configuracion.vad_relleno * 1000),
+                silencio_maximo=int(configuracion.vad_silencio_maximo * 1000),
+                ajustar_ruido=opciones.get("ajustar_ruido", True) is not False
+            ))
+        estadisticas_recorte.registrar(total_ms, audio_recortado_ms)
+
+    # Reutilizar la transcripción si el mismo audio ya se transcribió con las mismas opciones
+    # y los mismos motores (con enrutador, la respuesta puede venir de cualquiera de ellos).
+    # El hash del PCM y el nivel en SQLite son bloqueantes: se ejecutan fuera del bucle
+    clave_cache, resultado = None, None
+    if cache_transcripciones.activa:
+        clave_cache, resultado = await ejecutor_trabajos.ejecutar_en_hilo(
+            _buscar_en_cache, audio.audio_data, servicio_transcripcion.nombre_motores, opciones
+        )
+    desde_cache = resultado is not None
+
+    if resultado is None:
+        # Transcribir audio (los audios largos se segmentan y transcriben en paralelo)
+        resultado = await transcribir_en_paralelo(audio, opciones)
+        if clave_cache:
+            try:
+                await ejecutor_trabajos.ejecutar_en_hilo(
+                    cache_transcripciones.guardar, clave_cache, resultado.texto, resultado.confianza
+                )
+            except (ErrorColaLlena, ErrorTiempoEsperaCola):
+                # La transcripción ya está hecha: no fallar la solicitud por no poder cachearla
+                logger.debug("Ejecutor saturado: no se guarda la transcripción en caché")
+
+    factor = (time.perf_counter() - inicio) / duracion if duracion > 0 else None
+    if factor is not None and not desde_cache:
+        # Los aciertos de caché no miden el rendimiento del motor
+        factor_tiempo_real.observar(factor)
+
+    return ResultadoTranscripcion(resultado.texto, audio_recortado_ms, duracion, resultado.confianza, factor)
+
+def _buscar_en_cache(
+    audio_data: sr.AudioData,
+    motores: str,
+    opciones: Dict[str, Any]
+) -> Tuple[str, Optional[ResultadoMotor]]:
+    """Calcula la clave del audio y busca su transcripción en la caché."""
+    clave = cache_transcripciones.calcular_clave(audio_data, motores, opciones)
+    return clave, cache_transcripciones.obtener(clave)
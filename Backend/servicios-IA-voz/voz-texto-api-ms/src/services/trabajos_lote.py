@@ -0,0 +1,383 @@
+"""
+Transcripción por lotes con una cola de trabajos y un número fijo de trabajadores.
+
+Cada lote recibe un identificador y sus archivos se guardan en un directorio de
+trabajo propio. Un conjunto acotado de trabajadores los transcribe uno a uno, de
+modo que el rendimiento depende del número de trabajadores y no del número de
+conexiones abiertas por los clientes. El progreso de cada archivo se puede consultar
+por sondeo o recibir como eventos.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import uuid
+import zipfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import configuracion
+from ..utils import (
+    ErrorBase,
+    ErrorColaLlena,
+    ErrorFormatoAudio,
+    ErrorTiempoEsperaCola,
+    gestor_recursos,
+    identificar_contenedor
+)
+from .ejecutor import ejecutor_trabajos
+from ..utils.registro import id_solicitud
+from .pipeline_transcripcion import transcribir_contenido
+
+logger = logging.getLogger(__name__)
+
+ESTADO_EN_COLA = "en_cola"
+ESTADO_PROCESANDO = "procesando"
+ESTADO_COMPLETADO = "completado"
+ESTADO_FALLIDO = "fallido"
+
+# Reintentos de un archivo cuando el ejecutor está saturado por otras solicitudes
+MAX_REINTENTOS_SATURACION = 5
+# Segundos de espera entre esos reintentos
+ESPERA_REINTENTO = 1.0
+
+def extraer_zip(ruta_zip: str, directorio: str, max_archivos: int, tamano_max: int) -> List[Tuple[str, str]]:
+    """
+    Extrae los archivos de un zip en el directorio de trabajo de un lote.
+
+    Se ignoran los directorios, los metadatos de macOS y las entradas cuyo contenido
+    no es un contenedor de audio reconocido. Cada archivo se copia por bloques con un
+    límite de tamaño, sin fiarse del tamaño declarado en el zip.
+
+    Args:
+        ruta_zip: Ruta al archivo zip
+        directorio: Directorio donde escribir los archivos extraídos
+        max_archivos: Número máximo de archivos admitidos
+        tamano_max: Tamaño máximo de cada archivo en bytes
+
+    Returns:
+        Lista de tuplas (nombre original, ruta extraída)
+
+    Raises:
+        ErrorFormatoAudio: Si el zip no es válido, tiene demasiados archivos o alguno excede el tamaño
+    """
+    extraidos = []
+    try:
+        with zipfile.ZipFile(ruta_zip) as archivo_zip:
+            for entrada in archivo_zip.infolist():
+                nombre = os.path.basename(entrada.filename)
+                if entrada.is_dir() or not nombre or nombre.startswith(".") or "__MACOSX" in entrada.filename:
+                    continue
+                if len(extraidos) >= max_archivos:
+                    raise ErrorFormatoAudio(f"El zip contiene más de {max_archivos} archivos")
+
+                with archivo_zip.open(entrada) as origen:
+                    primer_bloque = origen.read(1024 * 1024)
+                    # Se comprueba el contenido, no la extensión, antes de escribir nada en disco
+                    if identificar_contenedor(primer_bloque[:12]) == "desconocido":
+                        logger.info("Se omite %s del zip: no es un archivo de audio", entrada.filename)
+                        continue
+                    ruta = os.path.join(directorio, f"{uuid.uuid4()}{os.path.splitext(nombre)[1].lower()}")
+                    _copiar_limitado(origen, primer_bloque, ruta, nombre, tamano_max)
+                extraidos.append((nombre, ruta))
+    except zipfile.BadZipFile as e:
+        raise ErrorFormatoAudio(f"El archivo zip no es válido: {str(e)}")
+    return extraidos
+
+def _copiar_limitado(origen, primer_bloque: bytes, ruta: str, nombre: str, tamano_max: int) -> None:
+    """
+    Copia una entrada del zip a disco por bloques sin superar el tamaño máximo.
+
+    Raises:
+        ErrorFormatoAudio: Si la entrada excede el tamaño máximo permitido
+    """
+    escritos = 0
+    with open(ruta, "wb") as destino:
+        bloque = primer_bloque
+        while bloque:
+            escritos += len(bloque)
+            if escritos > tamano_max:
+                raise ErrorFormatoAudio(
+                    f"El archivo {nombre} del zip excede el tamaño máximo permitido"
+                )
+            destino.write(bloque)
+            bloque = origen.read(1024 * 1024)
+
+class ArchivoLote:
+    """Estado de un archivo dentro de un lote."""
+
+    def __init__(self, indice: int, nombre: str, ruta: str):
+        self.indice = indice
+        self.nombre = nombre
+        self.ruta = ruta
+        self.estado = ESTADO_EN_COLA
+        self.texto: Optional[str] = None
+        self.error: Optional[str] = None
+        self.confianza: Optional[float] = None
+        self.duracion: Optional[float] = None
+        self.audio_recortado_ms: Optional[int] = None
+        self.tiempo_procesamiento: Optional[float] = None
+        self.factor_tiempo_real: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte el estado del archivo a un diccionario."""
+        return {
+            "indice": self.indice,
+            "nombre": self.nombre,
+            "estado": self.estado,
+            "texto": self.texto,
+            "error": self.error,
+            "confianza": self.confianza,
+            "duracion": self.duracion,
+            "audio_recortado_ms": self.audio_recortado_ms,
+            "tiempo_procesamiento": self.tiempo_procesamiento,
+            "factor_tiempo_real": self.factor_tiempo_real,
+        }
+
+class TrabajoLote:
+    """Lote de archivos a transcribir con las mismas opciones."""
+
+    def __init__(self, opciones: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex
+        self.opciones = opciones or {}
+        self.archivos: List[ArchivoLote] = []
+        self.creado = time.time()
+        self.finalizado: Optional[float] = None
+        os.makedirs(gestor_recursos.directorio_base, exist_ok=True)
+        self.directorio = tempfile.mkdtemp(prefix="lote_", dir=gestor_recursos.directorio_base)
+        # El lote puede pasar más tiempo en cola que la antigüedad máxima de los temporales:
+        # su directorio solo se libera al descartarlo o al expirar sus resultados
+        gestor_recursos.proteger(self.directorio)
+        self._suscriptores: List[asyncio.Queue] = []
+
+    @property
+    def completados(self) -> int:
+        """Número de archivos transcritos correctamente."""
+        return sum(1 for archivo in self.archivos if archivo.estado == ESTADO_COMPLETADO)
+
+    @property
+    def fallidos(self) -> int:
+        """Número de archivos que no se pudieron transcribir."""
+        return sum(1 for archivo in self.archivos if archivo.estado == ESTADO_FALLIDO)
+
+    @property
+    def terminado(self) -> bool:
+        """Indica si todos los archivos se han procesado."""
+        return self.completados + self.fallidos == len(self.archivos)
+
+    @property
+    def estado(self) -> str:
+        """Estado global del lote."""
+        if self.terminado:
+            return ESTADO_COMPLETADO
+        if any(archivo.estado != ESTADO_EN_COLA for archivo in self.archivos):
+            return ESTADO_PROCESANDO
+        return ESTADO_EN_COLA
+
+    def agregar_archivo(self, nombre: str, ruta: str) -> ArchivoLote:
+        """Añade un archivo ya guardado en el directorio del lote."""
+        archivo = ArchivoLote(len(self.archivos), nombre, ruta)
+        self.archivos.append(archivo)
+        return archivo
+
+    def resumen(self) -> Dict[str, Any]:
+        """Estado global del lote sin el detalle de los archivos."""
+        return {
+            "id": self.id,
+            "estado": self.estado,
+            "total": len(self.archivos),
+            "completados": self.completados,
+            "fallidos": self.fallidos,
+            "creado": self.creado,
+            "finalizado": self.finalizado,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte el lote completo a un diccionario."""
+        return {**self.resumen(), "archivos": [archivo.to_dict() for archivo in self.archivos]}
+
+    def suscribir(self) -> asyncio.Queue:
+        """Devuelve una cola que recibe un evento por cada cambio en el lote."""
+        cola: asyncio.Queue = asyncio.Queue()
+        self._suscriptores.append(cola)
+        return cola
+
+    def cancelar_suscripcion(self, cola: asyncio.Queue) -> None:
+        """Deja de enviar eventos a una cola."""
+        if cola in self._suscriptores:
+            self._suscriptores.remove(cola)
+
+    def notificar(self, tipo: str, datos: Dict[str, Any]) -> None:
+        """Envía un evento a todos los suscriptores."""
+        for cola in self._suscriptores:
+            cola.put_nowait((tipo, datos))
+
+class GestorLotes:
+    """Cola de archivos de los lotes y trabajadores que los transcriben."""
+
+    def __init__(self, trabajadores: int, max_archivos: int, retencion: float, max_activos: int):
+        """
+        Inicializa el gestor.
+
+        Args:
+            trabajadores: Número de archivos que se transcriben simultáneamente
+            max_archivos: Número máximo de archivos por lote
+            retencion: Segundos que se conservan los resultados de un lote terminado
+            max_activos: Número máximo de lotes sin terminar (en cola o en proceso)
+        """
+        self.trabajadores = max(trabajadores, 1)
+        self.max_archivos = max_archivos
+        self.retencion = retencion
+        self.max_activos = max(max_activos, 1)
+
+        self._trabajos: Dict[str, TrabajoLote] = {}
+        self._cola: Optional[asyncio.Queue] = None
+        self._tareas: List[asyncio.Task] = []
+        self._bucle: Optional[asyncio.AbstractEventLoop] = None
+
+    def iniciar(self) -> None:
+        """Arranca los trabajadores en el bucle de eventos actual si no están en ejecución."""
+        bucle = asyncio.get_running_loop()
+        if self._bucle is bucle and self._tareas and not all(tarea.done() for tarea in self._tareas):
+            return
+        self._bucle = bucle
+        self._cola = asyncio.Queue()
+        self._tareas = [
+            asyncio.create_task(self._trabajador(), name=f"lote-{i}")
+            for i in range(self.trabajadores)
+        ]
+        # Reencolar los archivos pendientes de lotes anteriores a un reinicio del bucle
+        for trabajo in self._trabajos.values():
+            for archivo in trabajo.archivos:
+                if archivo.estado in (ESTADO_EN_COLA, ESTADO_PROCESANDO):
+                    archivo.estado = ESTADO_EN_COLA
+                    self._cola.put_nowait((trabajo, archivo))
+
+    async def detener(self) -> None:
+        """Detiene los trabajadores. Los archivos pendientes se quedan en cola."""
+        tareas, self._tareas = self._tareas, []
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+    def crear_trabajo(self, opciones: Optional[Dict[str, Any]] = None) -> TrabajoLote:
+        """
+        Crea un lote vacío.
+
+        Args:
+            opciones: Opciones de transcripción comunes a todos los archivos
+
+        Returns:
+            Lote creado
+
+        Raises:
+            ErrorColaLlena: Si ya hay el máximo de lotes sin terminar
+        """
+        self.purgar_expirados()
+        activos = sum(1 for trabajo in self._trabajos.values() if trabajo.finalizado is None)
+        if activos >= self.max_activos:
+            raise ErrorColaLlena(
+                f"Hay {activos} lotes en curso, el máximo es {self.max_activos}"
+            )
+        trabajo = TrabajoLote(opciones)
+        self._trabajos[trabajo.id] = trabajo
+        return trabajo
+
+    def descartar(self, trabajo: TrabajoLote) -> None:
+        """Elimina un lote que no llegó a encolarse."""
+        self._trabajos.pop(trabajo.id, None)
+        gestor_recursos.liberar(trabajo.directorio)
+
+    def encolar(self, trabajo: TrabajoLote) -> None:
+        """Encola todos los archivos de un lote."""
+        self.iniciar()
+        for archivo in trabajo.archivos:
+            self._cola.put_nowait((trabajo, archivo))
+
+    def obtener(self, id_trabajo: str) -> Optional[TrabajoLote]:
+        """Devuelve un lote por su identificador."""
+        return self._trabajos.get(id_trabajo)
+
+    def purgar_expirados(self) -> None:
+        """Olvida los lotes terminados hace más tiempo que la retención y libera sus directorios."""
+        limite = time.time() - self.retencion
+        for id_trabajo, trabajo in list(self._trabajos.items()):
+            if trabajo.finalizado and trabajo.finalizado < limite:
+                del self._trabajos[id_trabajo]
+                gestor_recursos.liberar(trabajo.directorio)
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """
+        Devuelve la ocupación de la cola de lotes.
+
+        Returns:
+            Diccionario con los lotes activos y los archivos en cola
+        """
+        return {
+            "trabajadores": self.trabajadores,
+            "lotes_activos": sum(1 for trabajo in self._trabajos.values() if not trabajo.terminado),
+            "archivos_en_cola": self._cola.qsize() if self._cola else 0,
+        }
+
+    async def _trabajador(self) -> None:
+        """Transcribe archivos de la cola hasta que se cancela."""
+        while True:
+            trabajo, archivo = await self._cola.get()
+            try:
+                await self._procesar(trabajo, archivo)
+            finally:
+                self._cola.task_done()
+
+    async def _procesar(self, trabajo: TrabajoLote, archivo: ArchivoLote) -> None:
+        """Transcribe un archivo de un lote y notifica su resultado."""
+        # Los registros del archivo llevan el id del lote
+        id_solicitud.set(trabajo.id)
+        archivo.estado = ESTADO_PROCESANDO
+        trabajo.notificar("progreso", archivo.to_dict())
+        inicio = time.time()
+
+        try:
+            contenido = await ejecutor_trabajos.ejecutar_en_hilo(_leer_archivo, archivo.ruta)
+            for intento in range(MAX_REINTENTOS_SATURACION + 1):
+                try:
+                    resultado = await transcribir_contenido(contenido, trabajo.opciones)
+                    break
+                except (ErrorColaLlena, ErrorTiempoEsperaCola):
+                    # El ejecutor está saturado por solicitudes síncronas: esperar en lugar de fallar
+                    if intento == MAX_REINTENTOS_SATURACION:
+                        raise
+                    await asyncio.sleep(ESPERA_REINTENTO)
+            archivo.texto = resultado.texto
+            archivo.confianza = resultado.confianza
+            archivo.duracion = resultado.duracion
+            archivo.audio_recortado_ms = resultado.audio_recortado_ms
+            archivo.factor_tiempo_real = resultado.factor_tiempo_real
+            archivo.estado = ESTADO_COMPLETADO
+        except ErrorBase as e:
+            archivo.error = str(e)
+            archivo.estado = ESTADO_FALLIDO
+        except Exception as e:
+            logger.exception("Error inesperado al transcribir el archivo %s del lote", archivo.nombre)
+            archivo.error = f"Error inesperado: {str(e)}"
+            archivo.estado = ESTADO_FALLIDO
+        finally:
+            archivo.tiempo_procesamiento = time.time() - inicio
+            gestor_recursos.liberar(archivo.ruta)
+
+        trabajo.notificar("progreso", archivo.to_dict())
+        if trabajo.terminado:
+            trabajo.finalizado = time.time()
+            trabajo.notificar("fin", trabajo.resumen())
+
+def _leer_archivo(ruta: str) -> bytes:
+    """Lee un archivo completo."""
+    with open(ruta, "rb") as f:
+        return f.read()
+
+# Instancia global del gestor de lotes
+gestor_lotes = GestorLotes(
+    trabajadores=configuracion.lote_trabajadores,
+    max_archivos=configuracion.lote_max_archivos,
+    retencion=configuracion.lote_retencion,
+    max_activos=configuracion.lote_max_activos
+)
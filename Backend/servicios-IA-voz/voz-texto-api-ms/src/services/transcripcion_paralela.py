@@ -0,0 +1,120 @@
+"""
+Transcripción de audios largos en segmentos procesados en paralelo.
+"""
+import asyncio
+import re
+from typing import Any, Dict, List, Optional
+
+from ..config import configuracion
+from ..utils import AudioDecodificado, ErrorAudioSinVoz
+from .ejecutor import ejecutor_trabajos
+from .motores_transcripcion import ResultadoMotor
+from .transcripcion_service import servicio_transcripcion
+
+# Número máximo de palabras que se comparan al eliminar el texto repetido por el solapamiento
+MAX_PALABRAS_SOLAPAMIENTO = 12
+
+def _normalizar_palabra(palabra: str) -> str:
+    """Normaliza una palabra para compararla ignorando mayúsculas y puntuación."""
+    return re.sub(r"[^\w]", "", palabra.lower())
+
+def combinar_confianzas(confianzas: List[Optional[float]], pesos: List[int]) -> Optional[float]:
+    """
+    Calcula la confianza media de los segmentos ponderada por su duración.
+
+    Args:
+        confianzas: Confianza de cada segmento (None si el motor no la informa)
+        pesos: Duración de cada segmento en muestras
+
+    Returns:
+        Confianza media o None si ningún segmento la informa
+    """
+    suma = total = 0
+    for confianza, peso in zip(confianzas, pesos):
+        if confianza is not None:
+            suma += confianza * peso
+            total += peso
+    return suma / total if total else None
+
+def unir_transcripciones(textos: List[str], solapados: List[bool]) -> str:
+    """
+    Une las transcripciones de los segmentos eliminando el texto duplicado por el solapamiento.
+
+    Args:
+        textos: Transcripción de cada segmento, en orden
+        solapados: Indica para cada segmento si su inicio se solapa con el segmento anterior
+
+    Returns:
+        Texto completo
+    """
+    palabras: List[str] = []
+    for texto, solapado in zip(textos, solapados):
+        nuevas = texto.split()
+        if solapado and palabras and nuevas:
+            # Buscar el mayor sufijo del texto acumulado que coincide con el prefijo del nuevo
+            maximo = min(MAX_PALABRAS_SOLAPAMIENTO, len(palabras), len(nuevas))
+            anteriores = [_normalizar_palabra(p) for p in palabras[-maximo:]]
+            siguientes = [_normalizar_palabra(p) for p in nuevas[:maximo]]
+            for k in range(maximo, 0, -1):
+                if anteriores[-k:] == siguientes[:k]:
+                    nuevas = nuevas[k:]
+                    break
+        palabras.extend(nuevas)
+    return " ".join(palabras)
+
+async def transcribir_en_paralelo(
+    audio: AudioDecodificado,
+    opciones: Optional[Dict[str, Any]] = None
+) -> ResultadoMotor:
+    """
+    Transcribe un audio, dividiéndolo en segmentos concurrentes si es largo.
+
+    Los audios más cortos que el umbral configurado se transcriben con una sola llamada.
+    Los largos se segmentan (en pausas o en ventanas fijas con solapamiento), se
+    transcriben con un máximo de `segmentos_concurrentes` llamadas simultáneas y los
+    resultados se unen en orden.
+
+    Args:
+        audio: Audio decodificado de la solicitud (PCM de 16 bits mono)
+        opciones: Opciones de transcripción
+            - segmentacion: "silencio" (por defecto) o "fija"
+
+    Returns:
+        Texto transcrito y confianza media de los segmentos
+    """
+    opciones = opciones or {}
+
+    if audio.duracion <= configuracion.umbral_audio_largo:
+        return await ejecutor_trabajos.ejecutar_en_hilo(
+            servicio_transcripcion.transcribir_detallado, audio.audio_data, opciones
+        )
+
+    limites = await ejecutor_trabajos.ejecutar_en_hilo(
+        audio.segmentar,
+        int(configuracion.duracion_segmento * 1000),
+        int(configuracion.solapamiento_segmento * 1000),
+        opciones.get("segmentacion", "silencio")
+    )
+
+    limite_concurrencia = asyncio.Semaphore(max(configuracion.segmentos_concurrentes, 1))
+
+    async def transcribir_segmento(inicio: int, fin: int) -> ResultadoMotor:
+        segmento = audio.segmento(inicio, fin)
+        async with limite_concurrencia:
+            try:
+                return await ejecutor_trabajos.ejecutar_en_hilo(
+                    servicio_transcripcion.transcribir_detallado, segmento.audio_data, opciones
+                )
+            except ErrorAudioSinVoz:
+                # Un segmento sin voz (p. ej. una pausa larga) no invalida el resto
+                return ResultadoMotor("")
+
+    resultados = await asyncio.gather(*(transcribir_segmento(inicio, fin) for inicio, fin in limites))
+
+    solapados = [False] + [
+        limites[i][0] < limites[i - 1][1] for i in range(1, len(limites))
+    ]
+    return ResultadoMotor(
+        unir_transcripciones([r.texto for r in resultados], solapados),
+        combinar_confianzas([r.confianza for r in resultados], [fin - inicio for inicio, fin in limites])
+    )
@@ -2,14 +2,19 @@
 Servicio principal para la transcripción de voz a texto.
 """
 from typing import Dict, Any, Optional
+import speech_recognition as sr
 
 from ..config import configuracion
-from ..utils import ErrorTranscripcion, ErrorMotorTranscripcion
+from ..utils import ErrorTranscripcion, ErrorMotorTranscripcion, FormatoPCM
+from ..utils.metricas import medir_etapa
 from .motores_transcripcion import (
     MotorTranscripcionBase,
     MotorTranscripcionLocal,
-    MotorTranscripcionGoogle
+    MotorTranscripcionGoogle,
+    MotorTranscripcionWhisper,
+    ResultadoMotor
 )
+from .enrutador_motores import EnrutadorMotores
 
 class ServicioTranscripcion:
     """Servicio para transcribir audio a texto."""
@@ -23,11 +28,15 @@ class ServicioTranscripcion:
                 Si no se proporciona, se utilizará la configuración global
         """
         self.configuracion = configuracion_servicio or configuracion
-        self.motor = self._inicializar_motor()
+        self.motor = self._inicializar_motor(self.configuracion.motor_transcripcion)
+        self.enrutador = self._inicializar_enrutador()
     
-    def _inicializar_motor(self) -> MotorTranscripcionBase:
+    def _inicializar_motor(self, motor_nombre: str) -> MotorTranscripcionBase:
         """
-        Inicializa el motor de transcripción según la configuración.
+        Inicializa un motor de transcripción por su nombre.
+        
+        Args:
+            motor_nombre: Nombre del motor (local, google o whisper)
         
         Returns:
             Motor de transcripción inicializado
@@ -35,39 +44,133 @@ class ServicioTranscripcion:
         Raises:
             ErrorMotorTranscripcion: Si el motor de transcripción no es soportado
         """
-        motor_nombre = self.configuracion.motor_transcripcion.lower()
+        motor_nombre = motor_nombre.strip().lower()
         
         if motor_nombre == "local":
             return MotorTranscripcionLocal()
         elif motor_nombre == "google":
             return MotorTranscripcionGoogle(self.configuracion.api_clave)
+        elif motor_nombre == "whisper":
+            return MotorTranscripcionWhisper()
         # Añadir más motores según sea necesario
         else:
             raise ErrorMotorTranscripcion(
                 f"Motor de transcripción no soportado: {motor_nombre}"
             )
     
-    def transcribir(self, ruta_archivo: str, opciones: Optional[Dict[str, Any]] = None) -> str:
+    def _inicializar_enrutador(self) -> Optional[EnrutadorMotores]:
+        """
+        Crea el enrutador si se han configurado varios motores.
+        
+        El motor principal (motor_transcripcion) es el preferido mientras no hay
+        latencias medidas.
+        
+        Returns:
+            Enrutador de motores, o None si solo hay un motor
+        """
+        principal = self.configuracion.motor_transcripcion.strip().lower()
+        nombres = [principal]
+        for nombre in self.configuracion.motores_transcripcion.split(","):
+            nombre = nombre.strip().lower()
+            if nombre and nombre not in nombres:
+                nombres.append(nombre)
+        if len(nombres) == 1:
+            return None
+        
+        motores = {principal: self.motor}
+        for nombre in nombres[1:]:
+            motores[nombre] = self._inicializar_motor(nombre)
+        return EnrutadorMotores(
+            motores,
+            cobertura=self.configuracion.enrutador_cobertura,
+            percentil_cobertura=self.configuracion.enrutador_percentil_cobertura,
+            ventana=self.configuracion.enrutador_ventana,
+            errores_max=self.configuracion.enrutador_errores_max,
+            enfriamiento=self.configuracion.enrutador_enfriamiento,
+            hilos=self.configuracion.hilos_motor * 2
+        )
+    
+    @property
+    def nombre_motores(self) -> str:
+        """
+        Identifica los motores que pueden atender una solicitud.
+        
+        Con enrutador, cualquiera de sus motores puede responder, así que el nombre
+        incluye todos (ordenados, para que no dependa de la prioridad del momento).
+        """
+        if self.enrutador:
+            return ",".join(sorted(self.enrutador.motores))
+        return self.configuracion.motor_transcripcion.strip().lower()
+    
+    @property
+    def formato_nativo(self) -> FormatoPCM:
+        """Formato PCM en el que el motor configurado espera el audio."""
+        if self.enrutador:
+            return self.enrutador.formato_nativo
+        return self.motor.formato_nativo
+    
+    def transcribir(self, audio: sr.AudioData, opciones: Optional[Dict[str, Any]] = None) -> str:
         """
-        Transcribe un archivo de audio a texto.
+        Transcribe audio decodificado en memoria a texto.
         
         Args:
-            ruta_archivo: Ruta al archivo de audio
+            audio: Audio PCM decodificado
             opciones: Opciones adicionales para la transcripción
             
         Returns:
             Texto transcrito
             
+        Raises:
+            ErrorTranscripcion: Si ocurre un error durante la transcripción
+        """
+        return self.transcribir_detallado(audio, opciones).texto
+    
+    def transcribir_detallado(
+        self,
+        audio: sr.AudioData,
+        opciones: Optional[Dict[str, Any]] = None
+    ) -> ResultadoMotor:
+        """
+        Transcribe audio y devuelve también la confianza que informa el motor.
+        
+        Args:
+            audio: Audio PCM decodificado
+            opciones: Opciones adicionales para la transcripción
+            
+        Returns:
+            Texto transcrito y confianza (None si el motor no la informa)
+            
         Raises:
             ErrorTranscripcion: Si ocurre un error durante la transcripción
         """
         try:
-            return self.motor.transcribir(ruta_archivo, opciones)
+            with medir_etapa("motor"):
+                if self.enrutador:
+                    return self.enrutador.transcribir_detallado(audio, opciones)
+                return self.motor.transcribir_detallado(audio, opciones)
         except Exception as e:
             if isinstance(e, ErrorTranscripcion):
                 raise e
             else:
                 raise ErrorTranscripcion(f"Error al transcribir audio: {str(e)}")
 
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """
+        Devuelve la latencia y los errores de cada motor cuando hay varios.
+        
+        Returns:
+            Diccionario con las métricas del enrutador o el nombre del único motor
+        """
+        if self.enrutador:
+            return self.enrutador.obtener_metricas()
+        return {"orden": [self.configuracion.motor_transcripcion]}
+
+    def cerrar(self) -> None:
+        """Libera los recursos de los motores de transcripción."""
+        if self.enrutador:
+            self.enrutador.cerrar()
+        else:
+            self.motor.cerrar()
+
 # Instancia global del servicio
 servicio_transcripcion = ServicioTranscripcion(configuracion)
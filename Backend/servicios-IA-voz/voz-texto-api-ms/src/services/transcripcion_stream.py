@@ -0,0 +1,233 @@
+"""
+Transcripción en tiempo real de un flujo de audio (por ejemplo, el micrófono del navegador).
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pydub import AudioSegment
+
+from ..config import configuracion
+from ..utils import (
+    crear_audio_data,
+    ErrorAudioSinVoz,
+    ErrorBase,
+    ANCHO_MUESTRA_OBJETIVO,
+    FormatoPCM
+)
+from ..utils.vad import DetectorActividadVoz
+from .ejecutor import ejecutor_trabajos
+from .transcripcion_service import servicio_transcripcion
+
+# Tamaño de lectura de la salida de ffmpeg (~128 ms de PCM 16 kHz mono)
+TAMANO_LECTURA = 4096
+
+# Número máximo de dispositivos cuyo ruido de fondo se recuerda entre sesiones
+MAX_DISPOSITIVOS_RECORDADOS = 1024
+
+# Último ruido de fondo estimado por dispositivo: una nueva sesión del mismo micrófono
+# empieza con el umbral ya calibrado en lugar de recalibrarlo desde cero
+_pisos_ruido: "OrderedDict[str, float]" = OrderedDict()
+
+class DecodificadorIncremental:
+    """
+    Proceso de ffmpeg de larga duración que decodifica fragmentos a medida que llegan.
+
+    Los fragmentos del contenedor (webm, ogg...) se escriben por stdin y el PCM de
+    16 bits, con la frecuencia y los canales del motor activo, se lee por stdout sin
+    esperar a que termine la grabación.
+    """
+
+    def __init__(
+        self,
+        al_recibir_pcm: Callable[[bytes], Awaitable[None]],
+        formato: Optional[FormatoPCM] = None
+    ):
+        """
+        Args:
+            al_recibir_pcm: Corrutina que recibe cada bloque PCM decodificado
+            formato: Formato PCM de salida (por defecto, el nativo del motor activo)
+        """
+        self._al_recibir_pcm = al_recibir_pcm
+        self.formato = formato or servicio_transcripcion.formato_nativo
+        self._proceso: Optional[asyncio.subprocess.Process] = None
+        self._lector: Optional[asyncio.Task] = None
+
+    async def iniciar(self) -> None:
+        """Lanza ffmpeg con el sondeo de entrada reducido al mínimo para no añadir latencia."""
+        self._proceso = await asyncio.create_subprocess_exec(
+            AudioSegment.converter, "-hide_banner", "-loglevel", "error",
+            "-probesize", "32", "-analyzeduration", "0", "-fflags", "nobuffer",
+            "-i", "pipe:0",
+            "-f", "s16le", "-acodec", "pcm_s16le",
+            "-ar", str(self.formato.frecuencia_muestreo), "-ac", str(self.formato.canales),
+            "-flush_packets", "1",
+            "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        self._lector = asyncio.create_task(self._leer())
+
+    async def escribir(self, datos: bytes) -> None:
+        """Envía un fragmento del contenedor a ffmpeg."""
+        self._proceso.stdin.write(datos)
+        await self._proceso.stdin.drain()
+
+    async def cerrar(self) -> None:
+        """Cierra la entrada y espera a que se lea todo el PCM pendiente."""
+        if not self._proceso:
+            return
+        if not self._proceso.stdin.is_closing():
+            self._proceso.stdin.close()
+        await self._lector
+        await self._proceso.wait()
+
+    def abortar(self) -> None:
+        """Termina ffmpeg sin esperar la salida pendiente."""
+        if self._proceso and self._proceso.returncode is None:
+            self._proceso.kill()
+        if self._lector:
+            self._lector.cancel()
+
+    async def _leer(self) -> None:
+        """Lee el PCM de stdout hasta que ffmpeg cierra la salida."""
+        while True:
+            bloque = await self._proceso.stdout.read(TAMANO_LECTURA)
+            if not bloque:
+                return
+            await self._al_recibir_pcm(bloque)
+
+class SesionTranscripcionStream:
+    """
+    Sesión de transcripción de un flujo de audio.
+
+    El PCM se segmenta en enunciados con un detector de actividad de voz. Mientras un
+    enunciado está abierto se emiten transcripciones parciales periódicas y, cuando se
+    cierra, su transcripción final. Los finales se envían en orden.
+    """
+
+    def __init__(
+        self,
+        enviar: Callable[[Dict[str, Any]], Awaitable[None]],
+        opciones: Optional[Dict[str, Any]] = None,
+        dispositivo: Optional[str] = None,
+        formato: Optional[FormatoPCM] = None
+    ):
+        """
+        Args:
+            enviar: Corrutina que envía un mensaje JSON al cliente
+            opciones: Opciones de transcripción
+                - ajustar_ruido: Adaptar el umbral de voz al ruido de fondo (por defecto, True)
+            dispositivo: Identificador del micrófono del cliente para recordar su ruido de fondo
+            formato: Formato del PCM recibido (por defecto, el nativo del motor activo)
+        """
+        self._enviar = enviar
+        self.opciones = opciones or {}
+        self.dispositivo = dispositivo
+        self.formato = formato or servicio_transcripcion.formato_nativo
+        # Bytes de PCM por segundo de audio; las muestras de varios canales van intercaladas
+        self._bytes_segundo = self.formato.frecuencia_muestreo * self.formato.canales * ANCHO_MUESTRA_OBJETIVO
+        self.detector = DetectorActividadVoz(
+            frecuencia_muestreo=self.formato.frecuencia_muestreo * self.formato.canales,
+            silencio_cierre=int(configuracion.stream_silencio_cierre * 1000),
+            duracion_maxima=int(configuracion.stream_duracion_max_enunciado * 1000),
+            piso_ruido=_pisos_ruido.get(dispositivo) if dispositivo else None,
+            adaptativo=self.opciones.get("ajustar_ruido", True) is not False
+        )
+        self._bytes_parcial = int(configuracion.stream_intervalo_parcial * self._bytes_segundo)
+        self._bytes_desde_parcial = 0
+        self._parcial: Optional[asyncio.Task] = None
+        self._indice = 0
+        self._cola: "asyncio.Queue[Optional[tuple]]" = asyncio.Queue()
+        self._trabajador = asyncio.create_task(self._transcribir_finales())
+
+    async def procesar_pcm(self, pcm: bytes) -> None:
+        """
+        Procesa un bloque de PCM en el formato de la sesión.
+
+        Args:
+            pcm: Muestras PCM de 16 bits
+        """
+        for enunciado in self.detector.procesar(pcm):
+            await self._cola.put((self._indice, enunciado))
+            self._indice += 1
+            self._bytes_desde_parcial = 0
+
+        if not self._bytes_parcial or not self.detector.en_voz:
+            return
+
+        self._bytes_desde_parcial += len(pcm)
+        if self._bytes_desde_parcial >= self._bytes_parcial and (self._parcial is None or self._parcial.done()):
+            self._bytes_desde_parcial = 0
+            self._parcial = asyncio.create_task(
+                self._transcribir_parcial(self._indice, self.detector.enunciado_actual)
+            )
+
+    async def finalizar(self) -> None:
+        """Cierra el último enunciado y espera a que se envíen todos los finales."""
+        ultimo = self.detector.finalizar()
+        if ultimo:
+            await self._cola.put((self._indice, ultimo))
+            self._indice += 1
+        await self._cola.put(None)
+        await self._trabajador
+        if self._parcial:
+            self._parcial.cancel()
+        self._recordar_piso_ruido()
+
+    def cancelar(self) -> None:
+        """Cancela las transcripciones pendientes (p. ej. si el cliente se desconecta)."""
+        self._trabajador.cancel()
+        if self._parcial:
+            self._parcial.cancel()
+        self._recordar_piso_ruido()
+
+    def _recordar_piso_ruido(self) -> None:
+        """Guarda el ruido de fondo estimado para la próxima sesión del mismo dispositivo."""
+        if not self.dispositivo or self.detector.piso_ruido is None:
+            return
+        _pisos_ruido[self.dispositivo] = self.detector.piso_ruido
+        _pisos_ruido.move_to_end(self.dispositivo)
+        while len(_pisos_ruido) > MAX_DISPOSITIVOS_RECORDADOS:
+            _pisos_ruido.popitem(last=False)
+
+    async def _transcribir(self, pcm: bytes) -> str:
+        """Transcribe un enunciado en el pool de hilos del ejecutor."""
+        return await ejecutor_trabajos.ejecutar_en_hilo(
+            servicio_transcripcion.transcribir,
+            crear_audio_data(pcm, self.formato.frecuencia_muestreo),
+            self.opciones
+        )
+
+    async def _transcribir_parcial(self, indice: int, pcm: bytes) -> None:
+        """Envía la transcripción parcial del enunciado en curso."""
+        try:
+            texto = await self._transcribir(pcm)
+        except ErrorBase:
+            # Los parciales son orientativos; los errores se notifican con el final
+            return
+        # Descartar el parcial si el enunciado ya se cerró mientras se transcribía
+        if indice == self._indice:
+            await self._enviar({"tipo": "parcial", "indice": indice, "texto": texto})
+
+    async def _transcribir_finales(self) -> None:
+        """Transcribe los enunciados cerrados en orden y envía sus finales."""
+        while True:
+            elemento = await self._cola.get()
+            if elemento is None:
+                return
+            indice, pcm = elemento
+            try:
+                texto = await self._transcribir(pcm)
+            except ErrorAudioSinVoz:
+                texto = ""
+            except ErrorBase as e:
+                await self._enviar({"tipo": "error", "indice": indice, "mensaje": str(e)})
+                continue
+            await self._enviar({
+                "tipo": "final",
+                "indice": indice,
+                "texto": texto,
+                "duracion": len(pcm) / self._bytes_segundo
+            })
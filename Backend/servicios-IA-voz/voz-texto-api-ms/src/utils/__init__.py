@@ -3,30 +3,72 @@ from .error_utils import (
     ErrorFormatoAudio, 
     ErrorTamanoArchivo, 
     ErrorTranscripcion, 
+    ErrorAudioSinVoz,
     ErrorMotorTranscripcion,
     ErrorProcesamiento,
+    ErrorColaLlena,
+    ErrorTiempoEsperaCola,
     crear_respuesta_error
 )
 
 from .audio_utils import (
     validar_archivo_audio,
+    identificar_contenedor,
     guardar_archivo_temporal,
-    eliminar_archivo_temporal,
-    normalizar_audio,
-    segmentar_audio
+    segmentar_pcm,
+    sondear_formato,
+    decodificar_audio,
+    decodificar_audio_en_memoria,
+    decodificar_audio_en_disco,
+    crear_audio_data,
+    FRECUENCIA_MUESTREO_OBJETIVO,
+    CANALES_OBJETIVO,
+    ANCHO_MUESTRA_OBJETIVO,
+    FormatoAudio,
+    FormatoPCM,
+    FORMATO_PCM_OBJETIVO,
+    ESTRATEGIA_DIRECTA,
+    ESTRATEGIA_REMUESTREO,
+    ESTRATEGIA_TUBERIA,
+    ESTRATEGIA_DISCO
 )
 
+from .audio_decodificado import AudioDecodificado
+from .recursos_temporales import GestorRecursosTemporales, gestor_recursos
+from .remuestreo import remuestrear_pcm
+
 __all__ = [
     'ErrorBase', 
     'ErrorFormatoAudio', 
     'ErrorTamanoArchivo', 
     'ErrorTranscripcion',
+    'ErrorAudioSinVoz',
     'ErrorMotorTranscripcion',
     'ErrorProcesamiento',
+    'ErrorColaLlena',
+    'ErrorTiempoEsperaCola',
     'crear_respuesta_error',
     'validar_archivo_audio',
+    'identificar_contenedor',
     'guardar_archivo_temporal',
-    'eliminar_archivo_temporal',
-    'normalizar_audio',
-    'segmentar_audio'
+    'segmentar_pcm',
+    'sondear_formato',
+    'decodificar_audio',
+    'decodificar_audio_en_memoria',
+    'decodificar_audio_en_disco',
+    'crear_audio_data',
+    'FRECUENCIA_MUESTREO_OBJETIVO',
+    'CANALES_OBJETIVO',
+    'ANCHO_MUESTRA_OBJETIVO',
+    'FormatoAudio',
+    'FormatoPCM',
+    'FORMATO_PCM_OBJETIVO',
+    'ESTRATEGIA_DIRECTA',
+    'ESTRATEGIA_REMUESTREO',
+    'ESTRATEGIA_TUBERIA',
+    'ESTRATEGIA_DISCO',
+    'AudioDecodificado',
+    'remuestrear_pcm',
+    'GestorRecursosTemporales',
+    'gestor_recursos'
 ]
@@ -1,7 +1,10 @@
+import logging
 import imageio_ffmpeg
 from pydub import AudioSegment
 import os
 
+logger = logging.getLogger(__name__)
+
 def configurar_ffmpeg():
     """Configura pydub para usar la versión de FFmpeg incluida con imageio-ffmpeg."""
     # Obtener la ruta al ejecutable de ffmpeg incluido en imageio-ffmpeg
@@ -20,16 +23,15 @@ def configurar_ffmpeg():
     if ffmpeg_dir not in os.environ.get('PATH', ''):
         os.environ['PATH'] = ffmpeg_dir + os.pathsep + os.environ.get('PATH', '')
     
-    # Imprimir información para depuración
-    print(f"FFmpeg configurado en: {ffmpeg_path}")
-    print(f"Directorio añadido al PATH: {ffmpeg_dir}")
+    logger.debug("FFmpeg configurado en: %s (directorio añadido al PATH)", ffmpeg_path)
     
     # Verificar la configuración
     try:
         # Intentar crear un segmento de audio vacío para verificar que ffmpeg funciona
         AudioSegment.silent(duration=1)
-        print("Configuración de FFmpeg validada correctamente")
+        logger.debug("Configuración de FFmpeg validada correctamente")
     except Exception as e:
-        print(f"Error al configurar FFmpeg: {e}")
-        print("Es posible que necesites instalar ffmpeg manualmente en tu sistema")
-        print("O revisar si imageio-ffmpeg está correctamente instalado")
\ No newline at end of file
+        logger.error(
+            "Error al configurar FFmpeg: %s. Es posible que necesites instalar ffmpeg manualmente "
+            "en tu sistema o revisar si imageio-ffmpeg está correctamente instalado", e
+        )
\ No newline at end of file
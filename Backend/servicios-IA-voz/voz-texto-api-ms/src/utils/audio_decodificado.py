@@ -0,0 +1,134 @@
+"""
+Audio decodificado de una solicitud, compartido por todas las etapas.
+
+El archivo subido se decodifica una sola vez al formato nativo del motor. A partir de
+ahí, el recorte de silencios, la clave de la caché, la segmentación y los motores
+trabajan sobre el mismo buffer PCM: las muestras, la duración, la energía por tramas y
+el AudioData de SpeechRecognition se calculan la primera vez que se piden y se
+reutilizan en el resto de etapas.
+"""
+from functools import cached_property
+from typing import Dict, List, Tuple
+
+import numpy as np
+import speech_recognition as sr
+
+from .audio_utils import FormatoPCM, FORMATO_PCM_OBJETIVO, segmentar_pcm
+from .vad import energia_tramas, recortar_silencios
+
+# Duración de las tramas de análisis de energía en milisegundos (VAD y segmentación)
+DURACION_TRAMA_MS = 30
+
+class AudioDecodificado:
+    """Buffer PCM decodificado con sus metadatos calculados bajo demanda."""
+
+    def __init__(self, pcm: bytes, formato: FormatoPCM = FORMATO_PCM_OBJETIVO):
+        """
+        Inicializa el audio.
+
+        Args:
+            pcm: Muestras PCM intercaladas little-endian
+            formato: Frecuencia, canales y ancho de muestra del PCM
+        """
+        self.pcm = pcm
+        self.formato = formato
+        self._energias: Dict[int, np.ndarray] = {}
+
+    @property
+    def frecuencia_muestreo(self) -> int:
+        """Frecuencia de muestreo en Hz."""
+        return self.formato.frecuencia_muestreo
+
+    @cached_property
+    def num_muestras(self) -> int:
+        """Número de muestras por canal."""
+        return len(self.pcm) // (self.formato.ancho_muestra * self.formato.canales)
+
+    @cached_property
+    def duracion(self) -> float:
+        """Duración en segundos."""
+        return self.num_muestras / self.formato.frecuencia_muestreo
+
+    @cached_property
+    def duracion_ms(self) -> int:
+        """Duración en milisegundos."""
+        return self.num_muestras * 1000 // self.formato.frecuencia_muestreo
+
+    @cached_property
+    def muestras(self) -> np.ndarray:
+        """Vista de solo lectura de las muestras de 16 bits (sin copiar el buffer)."""
+        return np.frombuffer(self.pcm, dtype=np.int16)
+
+    @cached_property
+    def audio_data(self) -> sr.AudioData:
+        """AudioData de SpeechRecognition sobre el mismo buffer, para los motores."""
+        return sr.AudioData(self.pcm, self.formato.frecuencia_muestreo, self.formato.ancho_muestra)
+
+    def energia(self, duracion_trama: int = DURACION_TRAMA_MS) -> np.ndarray:
+        """
+        Energía RMS por tramas, calculada una vez por tamaño de trama.
+
+        Args:
+            duracion_trama: Duración de cada trama en milisegundos
+
+        Returns:
+            Vector con la energía de cada trama completa
+        """
+        tamano_trama = max(int(self.formato.frecuencia_muestreo * duracion_trama / 1000), 1)
+        energias = self._energias.get(tamano_trama)
+        if energias is None:
+            energias = self._energias[tamano_trama] = energia_tramas(self.pcm, tamano_trama)
+        return energias
+
+    def recortar_silencios(self, **opciones) -> Tuple["AudioDecodificado", int]:
+        """
+        Elimina los silencios con la energía ya calculada (ver vad.recortar_silencios).
+
+        Args:
+            **opciones: Parámetros de recortar_silencios (relleno, silencio_maximo...)
+
+        Returns:
+            Tupla con el audio recortado (o el mismo objeto si no se elimina nada) y los
+            milisegundos eliminados
+        """
+        duracion_trama = opciones.get("duracion_trama", DURACION_TRAMA_MS)
+        pcm, recortado_ms = recortar_silencios(
+            self.pcm,
+            self.formato.frecuencia_muestreo,
+            energias=self.energia(duracion_trama),
+            **opciones
+        )
+        if pcm is self.pcm:
+            return self, 0
+        return AudioDecodificado(pcm, self.formato), recortado_ms
+
+    def segmentar(
+        self,
+        duracion_segmento: int = 30000,
+        solapamiento: int = 1000,
+        modo: str = "silencio"
+    ) -> List[Tuple[int, int]]:
+        """
+        Calcula los límites de los segmentos con la energía ya calculada (ver segmentar_pcm).
+
+        Returns:
+            Lista de tuplas (muestra inicial, muestra final) de cada segmento
+        """
+        energias = self.energia() if modo == "silencio" else None
+        return segmentar_pcm(
+            self.pcm, self.formato.frecuencia_muestreo, duracion_segmento, solapamiento, modo, energias
+        )
+
+    def segmento(self, inicio: int, fin: int) -> "AudioDecodificado":
+        """
+        Devuelve las muestras [inicio, fin) como un nuevo audio.
+
+        Args:
+            inicio: Muestra inicial
+            fin: Muestra final (excluida)
+
+        Returns:
+            Audio con el fragmento indicado
+        """
+        ancho = self.formato.ancho_muestra * self.formato.canales
+        return AudioDecodificado(self.pcm[inicio * ancho:fin * ancho], self.formato)
@@ -1,16 +1,88 @@
 """
 Módulo de utilidades para el procesamiento de archivos de audio.
 """
+import logging
 import os
+import struct
+import subprocess
 import tempfile
 import uuid
-from typing import Optional, Tuple
+from typing import List, NamedTuple, Optional, Tuple
+import numpy as np
 from pydub import AudioSegment
 from fastapi import UploadFile
 import speech_recognition as sr
 
 from ..config import configuracion
-from .error_utils import ErrorFormatoAudio, ErrorTamanoArchivo
+from .error_utils import ErrorFormatoAudio, ErrorTamanoArchivo, ErrorProcesamiento
+from .recursos_temporales import gestor_recursos
+from .remuestreo import remuestrear_pcm
+
+logger = logging.getLogger(__name__)
+
+# Formato PCM que consumen los motores de transcripción
+FRECUENCIA_MUESTREO_OBJETIVO = 16000  # Hz
+CANALES_OBJETIVO = 1
+ANCHO_MUESTRA_OBJETIVO = 2  # bytes (16 bits)
+
+# Estrategias de decodificación elegidas por sondear_formato
+ESTRATEGIA_DIRECTA = "directa"
+ESTRATEGIA_REMUESTREO = "remuestreo"
+ESTRATEGIA_TUBERIA = "tuberia"
+ESTRATEGIA_DISCO = "disco"
+
+class FormatoPCM(NamedTuple):
+    """Formato PCM que espera un motor de transcripción."""
+    frecuencia_muestreo: int = FRECUENCIA_MUESTREO_OBJETIVO
+    canales: int = CANALES_OBJETIVO
+    ancho_muestra: int = ANCHO_MUESTRA_OBJETIVO
+
+FORMATO_PCM_OBJETIVO = FormatoPCM()
+
+# Tipos MIME que envían los navegadores y su extensión
+MIME_A_EXTENSION = {
+    'audio/webm': 'webm',
+    'video/webm': 'webm',
+    'audio/mpeg': 'mp3',
+    'audio/mp3': 'mp3',
+    'audio/wav': 'wav',
+    'audio/wave': 'wav',
+    'audio/x-wav': 'wav',
+    'audio/vnd.wave': 'wav',
+    'audio/ogg': 'ogg',
+    'audio/opus': 'ogg',
+    'audio/vorbis': 'ogg',
+    'audio/flac': 'flac',
+    'audio/x-flac': 'flac',
+    'audio/x-aiff': 'aiff',
+    'audio/aiff': 'aiff',
+    'audio/x-m4a': 'm4a',
+    'audio/mp4': 'm4a',
+    'audio/aac': 'aac'
+}
+EXTENSIONES_CONOCIDAS = frozenset(MIME_A_EXTENSION.values())
+
+# Formatos comunes que siempre se permiten además de los de la configuración
+FORMATOS_SIEMPRE_PERMITIDOS = ('wav', 'webm', 'mp3', 'ogg', 'flac', 'aiff', 'aif', 'm4a')
+# Formatos permitidos, calculados una sola vez al arrancar
+FORMATOS_PERMITIDOS = tuple(dict.fromkeys(
+    [formato.strip().lower() for formato in configuracion.formatos_permitidos.split(',') if formato.strip()]
+    + list(FORMATOS_SIEMPRE_PERMITIDOS)
+))
+_FORMATOS_PERMITIDOS_SET = frozenset(FORMATOS_PERMITIDOS)
+# Contenedor identificado por bytes mágicos -> extensiones que lo usan
+_EXTENSIONES_CONTENEDOR = {
+    'wav': ('wav',),
+    'mp4': ('m4a', 'mp4'),
+    'ogg': ('ogg', 'opus'),
+    'flac': ('flac',),
+    'webm': ('webm',),
+    'aiff': ('aiff', 'aif'),
+    'mp3': ('mp3',),
+    'aac': ('aac',),
+}
+# Bytes del inicio del archivo que se leen para identificar el contenedor
+TAMANO_CABECERA = 4096
 
 def obtener_extension(archivo: UploadFile) -> str:
     """
@@ -22,73 +94,77 @@ def obtener_extension(archivo: UploadFile) -> str:
     Returns:
         Extensión del archivo
     """
-    # Diccionario de mapeo de tipos MIME a extensiones
-    mime_to_ext = {
-        'audio/webm': 'webm',
-        'video/webm': 'webm',
-        'audio/mpeg': 'mp3',
-        'audio/mp3': 'mp3',
-        'audio/wav': 'wav',
-        'audio/wave': 'wav',
-        'audio/x-wav': 'wav',
-        'audio/vnd.wave': 'wav',
-        'audio/ogg': 'ogg',
-        'audio/opus': 'ogg',
-        'audio/vorbis': 'ogg',
-        'audio/flac': 'flac',
-        'audio/x-flac': 'flac',
-        'audio/x-aiff': 'aiff',
-        'audio/aiff': 'aiff',
-        'audio/x-m4a': 'm4a',
-        'audio/mp4': 'm4a',
-        'audio/aac': 'aac'
-    }
-    
-    # Obtener el tipo de contenido
-    content_type = archivo.content_type if hasattr(archivo, 'content_type') else None
+    # Extensión según el tipo de contenido, sin parámetros adicionales como ';codecs=...'
+    content_type = getattr(archivo, 'content_type', None)
     content_type_ext = None
-    
-    # Si tenemos un tipo de contenido, intentar mapear a una extensión
     if content_type:
-        # Eliminar parámetros adicionales como ';codecs=...'
-        base_content_type = content_type.split(';')[0].strip().lower()
-        content_type_ext = mime_to_ext.get(base_content_type)
-        
-        if content_type_ext:
-            print(f"Extensión detectada desde tipo MIME {base_content_type}: {content_type_ext}")
+        content_type_ext = MIME_A_EXTENSION.get(content_type.split(';')[0].strip().lower())
     
-    # Si no hay nombre de archivo, usar la extensión del tipo de contenido
-    if not archivo.filename:
+    # Si no hay nombre de archivo o no tiene extensión, usar la del tipo de contenido
+    if not archivo.filename or '.' not in archivo.filename:
         return content_type_ext or ""
     
-    # Comprobar si hay un punto en el nombre del archivo
-    if '.' not in archivo.filename:
-        return content_type_ext or ""
+    extension_filename = archivo.filename.rsplit(".", 1)[-1].lower()
     
-    # Obtener la extensión del nombre del archivo
-    extension_filename = archivo.filename.split(".")[-1].lower()
-    
-    # Si tenemos tanto extensión del nombre como del tipo MIME y son diferentes,
-    # verificar cuál usar
-    if content_type_ext and extension_filename != content_type_ext:
-        print(f"La extensión del archivo ({extension_filename}) no coincide con el tipo de contenido "
-              f"({content_type}, ext={content_type_ext})")
-        
-        # Verificar si la extensión del filename está en nuestro diccionario de MIME,
-        # si no lo está, preferimos la del tipo MIME
-        if any(extension_filename == ext for ext in mime_to_ext.values()):
-            print(f"Usando extensión del nombre de archivo: {extension_filename}")
-            return extension_filename
-        else:
-            print(f"Usando extensión del tipo MIME: {content_type_ext}")
-            return content_type_ext
+    # Si no coinciden, se prefiere la del nombre solo si es una extensión de audio conocida
+    if content_type_ext and extension_filename != content_type_ext and extension_filename not in EXTENSIONES_CONOCIDAS:
+        return content_type_ext
     
     return extension_filename
 
+def identificar_contenedor(cabecera: bytes) -> str:
+    """
+    Identifica el contenedor de audio por sus bytes mágicos.
+    
+    Args:
+        cabecera: Primeros bytes del archivo (bastan 12)
+        
+    Returns:
+        Nombre del contenedor (wav, mp4, ogg, flac, webm, aiff, mp3, aac) o "desconocido"
+    """
+    if cabecera[:4] == b"RIFF" and cabecera[8:12] == b"WAVE":
+        return "wav"
+    if cabecera[4:8] == b"ftyp":
+        return "mp4"
+    if cabecera[:4] == b"OggS":
+        return "ogg"
+    if cabecera[:4] == b"fLaC":
+        return "flac"
+    if cabecera[:4] == b"\x1aE\xdf\xa3":
+        return "webm"
+    if cabecera[:4] == b"FORM" and cabecera[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff"
+    if cabecera[:3] == b"ID3":
+        return "mp3"
+    if len(cabecera) >= 2 and cabecera[0] == 0xFF and cabecera[1] & 0xE0 == 0xE0:
+        # Sincronía de trama MPEG: la capa 0 corresponde a AAC en ADTS
+        return "aac" if cabecera[1] & 0x06 == 0 else "mp3"
+    return "desconocido"
+
+def _tamano_archivo(archivo: UploadFile) -> int:
+    """Tamaño del archivo subido en bytes, sin leer su contenido."""
+    if getattr(archivo, "size", None) is not None:
+        return archivo.size
+    posicion = archivo.file.tell()
+    archivo.file.seek(0, os.SEEK_END)
+    tamano = archivo.file.tell()
+    archivo.file.seek(posicion)
+    return tamano
+
+def _leer_cabecera(archivo: UploadFile) -> bytes:
+    """Lee los primeros bytes del archivo subido y vuelve al inicio."""
+    archivo.file.seek(0)
+    cabecera = archivo.file.read(TAMANO_CABECERA)
+    archivo.file.seek(0)
+    return cabecera
+
 def validar_archivo_audio(archivo: UploadFile) -> None:
     """
     Valida que el archivo sea un archivo de audio válido.
     
+    Solo se leen los primeros KB del archivo: el tamaño se obtiene sin leer el
+    contenido y el formato se comprueba por la extensión y por los bytes mágicos.
+    
     Args:
         archivo: Archivo de audio a validar
         
@@ -96,20 +172,7 @@ def validar_archivo_audio(archivo: UploadFile) -> None:
         ErrorFormatoAudio: Si el formato del archivo no es soportado
         ErrorTamanoArchivo: Si el archivo excede el tamaño máximo permitido
     """
-    # Información de depuración
-    print(f"Validando archivo de audio: {archivo.filename}")
-    print(f"Tipo de contenido: {archivo.content_type if hasattr(archivo, 'content_type') else 'No disponible'}")
-    
-    # Verificar el tamaño del archivo
-    if hasattr(archivo, "size"):
-        tamano_mb = archivo.size / (1024 * 1024)  # Convertir a MB
-    else:
-        # Si no se puede obtener el tamaño directamente, leer el archivo en memoria
-        contenido = archivo.file.read()
-        # Volver a la posición inicial del archivo
-        archivo.file.seek(0)
-        tamano_mb = len(contenido) / (1024 * 1024)  # Convertir a MB
-    
+    tamano_mb = _tamano_archivo(archivo) / (1024 * 1024)
     if tamano_mb > configuracion.tamano_max_archivo:
         raise ErrorTamanoArchivo(
             f"El archivo excede el tamaño máximo permitido de "
@@ -117,266 +180,381 @@ def validar_archivo_audio(archivo: UploadFile) -> None:
             f"Tamaño actual: {tamano_mb:.2f} MB"
         )
     
-    # Obtener la extensión del archivo
     extension = obtener_extension(archivo)
+    contenedor = identificar_contenedor(_leer_cabecera(archivo))
+    
+    if contenedor == "desconocido":
+        # Un contenido que no empieza como ningún contenedor de audio no se envía a ffmpeg
+        if extension in EXTENSIONES_CONOCIDAS or extension in _FORMATOS_PERMITIDOS_SET:
+            raise ErrorFormatoAudio(
+                f"El contenido del archivo no corresponde a un archivo de audio {extension}"
+            )
+    elif any(ext in _FORMATOS_PERMITIDOS_SET for ext in _EXTENSIONES_CONTENEDOR[contenedor]):
+        # Los bytes mágicos mandan aunque la extensión o el tipo MIME falten o no coincidan
+        return
     
-    # Si no se pudo determinar la extensión, intentar obtenerla del tipo de contenido
-    if not extension and hasattr(archivo, 'content_type'):
-        content_type = archivo.content_type
-        if 'audio/' in content_type or 'video/' in content_type:  # webm puede ser video/webm para audio
-            # Extraer la extensión del tipo de contenido
-            extension = content_type.split('/')[-1].split(';')[0]
-            print(f"Determinando extensión desde content_type: {extension}")
-    
-    # Lista de formatos permitidos desde la configuración
-    formatos_permitidos = [
-        formato.strip().lower() for formato in 
-        configuracion.formatos_permitidos.split(',')
-    ]
-    
-    # Añadir algunos formatos comunes que siempre deberían ser permitidos
-    formatos_siempre_permitidos = ['wav', 'webm', 'mp3', 'ogg', 'flac', 'aiff', 'aif', 'm4a']
-    for formato in formatos_siempre_permitidos:
-        if formato not in formatos_permitidos:
-            formatos_permitidos.append(formato)
-
-    print(f"Formatos permitidos: {formatos_permitidos}")
-    print(f"Extensión detectada: {extension}")
-    
-    # Verificar si la extensión está en la lista de formatos permitidos
-    if extension and extension.lower() in formatos_permitidos:
+    if extension and extension in _FORMATOS_PERMITIDOS_SET:
         return
     
-    # Si hemos llegado hasta aquí, el formato no es válido
     raise ErrorFormatoAudio(
         f"Formato de audio no soportado: {extension or 'desconocido'}. "
-        f"Los formatos permitidos son: {', '.join(formatos_permitidos)}"
+        f"Los formatos permitidos son: {', '.join(FORMATOS_PERMITIDOS)}"
     )
 
-def guardar_archivo_temporal(archivo: UploadFile) -> str:
+class FormatoAudio(NamedTuple):
+    """Resultado del sondeo de la cabecera de un archivo de audio."""
+    contenedor: str
+    estrategia: str
+    frecuencia_muestreo: Optional[int] = None
+    canales: Optional[int] = None
+    ancho_muestra: Optional[int] = None
+    inicio_datos: int = 0
+    fin_datos: int = 0
+
+def _sondear_wav(contenido: bytes, destino: FormatoPCM) -> FormatoAudio:
+    """Recorre los chunks RIFF de un WAV hasta encontrar 'fmt ' y 'data'."""
+    frecuencia = canales = ancho = None
+    es_pcm = False
+    posicion = 12
+    while posicion + 8 <= len(contenido):
+        identificador = contenido[posicion:posicion + 4]
+        tamano = struct.unpack("<I", contenido[posicion + 4:posicion + 8])[0]
+        inicio = posicion + 8
+        if identificador == b"fmt " and tamano >= 16:
+            codigo, canales, frecuencia, _, _, bits = struct.unpack("<HHIIHH", contenido[inicio:inicio + 16])
+            # WAVE_FORMAT_EXTENSIBLE guarda el formato real en el subformato
+            if codigo == 0xFFFE and tamano >= 26:
+                codigo = struct.unpack("<H", contenido[inicio + 24:inicio + 26])[0]
+            es_pcm = codigo == 1
+            ancho = bits // 8
+        elif identificador == b"data":
+            # Los WAV generados en streaming pueden declarar un tamaño 0 o máximo
+            fin = len(contenido) if tamano in (0, 0xFFFFFFFF) else min(inicio + tamano, len(contenido))
+            if not es_pcm or not canales or not frecuencia or not 1 <= ancho <= 4:
+                # PCM en coma flotante, ADPCM, mu-law...: se decodifica con ffmpeg
+                return FormatoAudio("wav", ESTRATEGIA_TUBERIA, frecuencia, canales, ancho)
+            if (frecuencia, canales, ancho) == tuple(destino):
+                estrategia = ESTRATEGIA_DIRECTA
+            elif destino.canales == 1 and destino.ancho_muestra == ANCHO_MUESTRA_OBJETIVO:
+                # PCM entero con otra frecuencia o canales: se convierte con NumPy, sin ffmpeg
+                estrategia = ESTRATEGIA_REMUESTREO
+            else:
+                estrategia = ESTRATEGIA_TUBERIA
+            bloque = canales * ancho
+            return FormatoAudio(
+                "wav", estrategia, frecuencia, canales, ancho,
+                inicio, inicio + (fin - inicio) // bloque * bloque
+            )
+        posicion = inicio + tamano + (tamano & 1)
+    return FormatoAudio("wav", ESTRATEGIA_TUBERIA, frecuencia, canales, ancho)
+
+def _sondear_mp4(contenido: bytes) -> FormatoAudio:
     """
-    Guarda el archivo en una ubicación temporal.
+    Recorre las cajas de primer nivel de un MP4/M4A.
+    
+    ffmpeg solo puede leerlo por una tubería si el índice ('moov') precede a los datos ('mdat').
+    """
+    posicion = 0
+    while posicion + 8 <= len(contenido):
+        tamano = struct.unpack(">I", contenido[posicion:posicion + 4])[0]
+        tipo = contenido[posicion + 4:posicion + 8]
+        if tipo == b"moov":
+            return FormatoAudio("mp4", ESTRATEGIA_TUBERIA)
+        if tipo == b"mdat":
+            break
+        if tamano == 1 and posicion + 16 <= len(contenido):
+            tamano = struct.unpack(">Q", contenido[posicion + 8:posicion + 16])[0]
+        if tamano < 8:
+            break
+        posicion += tamano
+    return FormatoAudio("mp4", ESTRATEGIA_DISCO)
+
+def sondear_formato(contenido: bytes, destino: FormatoPCM = FORMATO_PCM_OBJETIVO) -> FormatoAudio:
+    """
+    Identifica el contenedor por sus bytes mágicos y elige una única estrategia de decodificación.
+    
+    Estrategias:
+        - directa: WAV PCM ya en el formato de destino; se usa tal cual
+        - remuestreo: WAV PCM entero en otro formato; se convierte con NumPy
+        - tuberia: ffmpeg leyendo por stdin (formatos que se pueden leer secuencialmente)
+        - disco: ffmpeg leyendo de un archivo temporal (MP4/M4A con el índice al final)
+    
+    Los contenidos no reconocidos se envían a ffmpeg por tubería, que hace su propio sondeo.
     
     Args:
-        archivo: Archivo de audio a guardar
+        contenido: Bytes del archivo de audio en su formato original
+        destino: Formato PCM que espera el motor de transcripción
         
     Returns:
-        Ruta al archivo temporal
+        Formato detectado y estrategia de decodificación
     """
-    # Crear un archivo temporal con un nombre único
-    nombre_temp = f"{uuid.uuid4()}.{obtener_extension(archivo)}"
-    ruta_temp = os.path.join(tempfile.gettempdir(), nombre_temp)
+    contenedor = identificar_contenedor(contenido[:12])
+    if contenedor == "wav":
+        return _sondear_wav(contenido, destino)
+    if contenedor == "mp4":
+        return _sondear_mp4(contenido)
+    return FormatoAudio(contenedor, ESTRATEGIA_TUBERIA)
+
+def _ejecutar_ffmpeg(
+    entrada: str,
+    contenido: Optional[bytes],
+    frecuencia_muestreo: int,
+    canales: int
+) -> bytes:
+    """
+    Ejecuta un único proceso de ffmpeg que escribe PCM crudo por stdout.
     
-    # Guardar el contenido del archivo en el archivo temporal
-    with open(ruta_temp, "wb") as f:
-        # Leer el archivo en chunks para evitar problemas de memoria
-        for chunk in iter(lambda: archivo.file.read(1024 * 1024), b""):
-            f.write(chunk)
+    Args:
+        entrada: Ruta del archivo de entrada o "pipe:0" para leer de stdin
+        contenido: Bytes que se envían por stdin (None si se lee de un archivo)
+        frecuencia_muestreo: Frecuencia de muestreo de salida en Hz
+        canales: Número de canales de salida
+        
+    Returns:
+        Buffer con las muestras PCM de 16 bits
+        
+    Raises:
+        ErrorFormatoAudio: Si ffmpeg no puede decodificar el contenido
+        ErrorProcesamiento: Si la decodificación excede el tiempo máximo de espera
+    """
+    comando = [
+        AudioSegment.converter, "-hide_banner", "-loglevel", "error",
+        "-i", entrada,
+        "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ar", str(frecuencia_muestreo), "-ac", str(canales),
+        "pipe:1"
+    ]
     
-    return ruta_temp
+    try:
+        proceso = subprocess.run(
+            comando,
+            input=contenido,
+            capture_output=True,
+            timeout=configuracion.tiempo_espera
+        )
+    except subprocess.TimeoutExpired:
+        raise ErrorProcesamiento(
+            f"La decodificación del audio excedió el tiempo máximo de espera "
+            f"({configuracion.tiempo_espera} segundos)"
+        )
+    except OSError as e:
+        raise ErrorProcesamiento(f"No se pudo ejecutar ffmpeg: {str(e)}")
+    
+    if proceso.returncode != 0 or not proceso.stdout:
+        error = proceso.stderr.decode("utf-8", errors="replace").strip()
+        raise ErrorFormatoAudio(f"No se pudo decodificar el audio: {error or 'sin datos de audio'}")
+    
+    return proceso.stdout
 
-def eliminar_archivo_temporal(ruta_archivo: str) -> None:
+def decodificar_audio_en_memoria(
+    contenido: bytes,
+    frecuencia_muestreo: int = FRECUENCIA_MUESTREO_OBJETIVO,
+    canales: int = CANALES_OBJETIVO
+) -> bytes:
     """
-    Elimina un archivo temporal.
+    Decodifica un archivo de audio completamente en memoria con un único proceso de ffmpeg.
+    
+    El contenido se envía por stdin y se recibe por stdout como PCM crudo
+    (16 bits little-endian), sin escribir ningún archivo en disco.
     
     Args:
-        ruta_archivo: Ruta al archivo a eliminar
+        contenido: Bytes del archivo de audio en su formato original
+        frecuencia_muestreo: Frecuencia de muestreo de salida en Hz (por defecto 16 kHz)
+        canales: Número de canales de salida (por defecto mono)
+        
+    Returns:
+        Buffer con las muestras PCM de 16 bits
+        
+    Raises:
+        ErrorFormatoAudio: Si ffmpeg no puede decodificar el contenido
+        ErrorProcesamiento: Si la decodificación excede el tiempo máximo de espera
+    """
+    return _ejecutar_ffmpeg("pipe:0", contenido, frecuencia_muestreo, canales)
+
+def decodificar_audio_en_disco(
+    contenido: bytes,
+    frecuencia_muestreo: int = FRECUENCIA_MUESTREO_OBJETIVO,
+    canales: int = CANALES_OBJETIVO
+) -> bytes:
     """
-    import time
+    Decodifica un archivo de audio que ffmpeg necesita leer con acceso aleatorio.
     
-    if not os.path.exists(ruta_archivo):
-        return
+    El contenido se escribe en el directorio de trabajo de la solicitud y se decodifica
+    con un único proceso de ffmpeg; el PCM se recibe por stdout.
     
-    # Intentar eliminar el archivo con reintentos
-    max_intentos = 3
-    intentos = 0
-    while intentos < max_intentos:
-        try:
-            os.close(os.open(ruta_archivo, os.O_RDONLY))  # Cerrar cualquier descriptor abierto
-            os.remove(ruta_archivo)
-            print(f"Archivo temporal eliminado: {ruta_archivo}")
-            break
-        except PermissionError:
-            # Si falla por PermissionError, esperar e intentar de nuevo
-            print(f"No se pudo eliminar el archivo {ruta_archivo}. Reintentando...")
-            intentos += 1
-            time.sleep(1)  # Esperar 1 segundo antes de reintentar
-        except Exception as e:
-            # Para otros errores, registrar y continuar
-            print(f"Error al eliminar archivo temporal {ruta_archivo}: {str(e)}")
-            break
+    Args:
+        contenido: Bytes del archivo de audio en su formato original
+        frecuencia_muestreo: Frecuencia de muestreo de salida en Hz (por defecto 16 kHz)
+        canales: Número de canales de salida (por defecto mono)
+        
+    Returns:
+        Buffer con las muestras PCM de 16 bits
+        
+    Raises:
+        ErrorFormatoAudio: Si ffmpeg no puede decodificar el contenido
+        ErrorProcesamiento: Si la decodificación excede el tiempo máximo de espera
+    """
+    with gestor_recursos.directorio_trabajo() as directorio:
+        ruta = os.path.join(directorio, f"{uuid.uuid4()}.audio")
+        with open(ruta, "wb") as f:
+            f.write(contenido)
+        return _ejecutar_ffmpeg(ruta, None, frecuencia_muestreo, canales)
 
-def normalizar_audio(ruta_archivo: str, formato_salida: Optional[str] = None) -> Tuple[str, bool]:
+def decodificar_audio(
+    contenido: bytes,
+    formato: Optional[FormatoAudio] = None,
+    destino: FormatoPCM = FORMATO_PCM_OBJETIVO
+) -> bytes:
     """
-    Normaliza un archivo de audio y lo convierte a un formato específico si es necesario.
+    Decodifica un archivo de audio a PCM con la estrategia elegida por el sondeo.
     
     Args:
-        ruta_archivo: Ruta al archivo de audio
-        formato_salida: Formato de salida (por defecto, el mismo que el de entrada)
+        contenido: Bytes del archivo de audio en su formato original
+        formato: Resultado de sondear_formato para el mismo destino (se calcula si no se proporciona)
+        destino: Formato PCM que espera el motor de transcripción
         
     Returns:
-        Tupla con la ruta al archivo normalizado y un booleano que indica si se creó un nuevo archivo
+        Buffer con las muestras PCM en el formato de destino
+        
+    Raises:
+        ErrorFormatoAudio: Si el contenido no se puede decodificar
+        ErrorProcesamiento: Si la decodificación excede el tiempo máximo de espera
     """
-    # Obtener la extensión del archivo original
-    extension_original = os.path.splitext(ruta_archivo)[1][1:].lower()
-    
-    # Si no se especifica un formato de salida, usar el mismo que el original
-    if not formato_salida:
-        formato_salida = extension_original
-    
-    # Si el formato de entrada y salida son iguales pero es WAV,
-    # verificamos que sea PCM WAV
-    if formato_salida == extension_original and extension_original == "wav":
-        print("Verificando si el archivo WAV es compatible con PCM")
-        try:
-            # Intentar cargar el archivo para verificar si es compatible
-            sr.AudioFile(ruta_archivo)
-            print("El archivo WAV ya es compatible con PCM")
-            return ruta_archivo, False
-        except Exception as e:
-            print(f"El archivo WAV no es compatible con PCM, se realizará conversión: {str(e)}")
-            # Continuar con la conversión
-    elif formato_salida == extension_original:
-        # Para otros formatos, si son iguales, no hacemos conversión
-        return ruta_archivo, False
-    
-    # Información de depuración
-    print(f"Convirtiendo archivo desde '{extension_original}' a '{formato_salida}'")
-    
-    # Crear un nuevo nombre de archivo para el archivo convertido
-    nombre_base = os.path.basename(ruta_archivo)
-    nombre_sin_extension = os.path.splitext(nombre_base)[0]
-    nuevo_nombre = f"{nombre_sin_extension}_convertido.{formato_salida}"
-    nueva_ruta = os.path.join(tempfile.gettempdir(), nuevo_nombre)
-    
-    # Intentar diferentes métodos de conversión
-    try:
-        # Método 1: Usar pydub para convertir a PCM WAV
-        try:
-            print("Intentando conversión a PCM WAV con pydub...")
-            audio = AudioSegment.from_file(ruta_archivo, format=extension_original)
-            
-            # Asegurarnos de que sea PCM WAV (16 bits, 44100 Hz)
-            if audio.sample_width != 2 or audio.frame_rate != 44100:
-                print(f"Normalizando audio: {audio.sample_width} bits, {audio.frame_rate} Hz")
-                # Convertir a 16 bits y 44100 Hz
-                audio = audio.set_sample_width(2)
-                audio = audio.set_frame_rate(44100)
-            
-            # Exportar como PCM WAV
-            if formato_salida.lower() == "wav":
-                audio.export(nueva_ruta, format="wav", parameters=["-acodec", "pcm_s16le"])
-            else:
-                audio.export(nueva_ruta, format=formato_salida)
-                
-            print("Conversión con pydub exitosa")
-            return nueva_ruta, True
-        except Exception as e:
-            print(f"Error al convertir con pydub: {str(e)}")
-            
-            # Método 2: Usar ffmpeg directamente con parámetros específicos para PCM WAV
-            try:
-                import subprocess
-                print("Intentando conversión directa con ffmpeg a PCM WAV...")
-                ffmpeg_path = AudioSegment.converter
-                
-                if formato_salida.lower() == "wav":
-                    # Parámetros específicos para PCM WAV
-                    command = [
-                        ffmpeg_path, "-y", "-i", ruta_archivo,
-                        "-acodec", "pcm_s16le", "-ar", "44100", "-ac", "1",
-                        nueva_ruta
-                    ]
-                else:
-                    command = [ffmpeg_path, "-y", "-i", ruta_archivo, nueva_ruta]
-                
-                subprocess.run(command, check=True, capture_output=True)
-                print("Conversión directa con ffmpeg exitosa")
-                
-                # Verificar que el archivo resultante es compatible
-                try:
-                    sr.AudioFile(nueva_ruta)
-                    print("Se ha verificado que el archivo convertido es compatible")
-                except Exception as e:
-                    print(f"ADVERTENCIA: El archivo convertido puede no ser compatible: {str(e)}")
-                
-                return nueva_ruta, True
-            except Exception as e:
-                print(f"Error al convertir directamente con ffmpeg: {str(e)}")
-                
-                # Método 3: Último intento - usar ffmpeg con más opciones
-                try:
-                    import subprocess
-                    print("Último intento de conversión con ffmpeg...")
-                    # Usar opciones más específicas para asegurar compatibilidad
-                    temp_wav = os.path.join(tempfile.gettempdir(), f"{nombre_sin_extension}_temp.wav")
-                    command = [
-                        ffmpeg_path, "-y", "-i", ruta_archivo,
-                        "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1", 
-                        "-f", "wav", temp_wav
-                    ]
-                    subprocess.run(command, check=True, capture_output=True)
-                    print("Conversión a WAV temporal exitosa")
-                    
-                    # Ahora convertimos al formato final
-                    command = [ffmpeg_path, "-y", "-i", temp_wav, nueva_ruta]
-                    subprocess.run(command, check=True, capture_output=True)
-                    print("Conversión final exitosa")
-                    
-                    # Limpiar archivo temporal
-                    if os.path.exists(temp_wav):
-                        os.remove(temp_wav)
-                    
-                    return nueva_ruta, True
-                except Exception as e:
-                    print(f"Error en último intento de conversión: {str(e)}")
-                    # Si todos los métodos fallan, lanzar excepción
-                    raise ErrorFormatoAudio(f"No se pudo convertir el archivo a un formato compatible. Error: {str(e)}")
-    finally:
-        # Liberar recursos
-        import gc
-        gc.collect()  # Forzar la recolección de basura
+    formato = formato or sondear_formato(contenido, destino)
+    
+    if formato.estrategia in (ESTRATEGIA_DIRECTA, ESTRATEGIA_REMUESTREO):
+        pcm = contenido[formato.inicio_datos:formato.fin_datos]
+        if not pcm:
+            raise ErrorFormatoAudio("El archivo WAV no contiene muestras de audio")
+        if formato.estrategia == ESTRATEGIA_DIRECTA:
+            return pcm
+        return remuestrear_pcm(
+            pcm,
+            formato.frecuencia_muestreo,
+            destino.frecuencia_muestreo,
+            formato.canales,
+            formato.ancho_muestra
+        )
+    
+    if formato.estrategia == ESTRATEGIA_DISCO:
+        return decodificar_audio_en_disco(contenido, destino.frecuencia_muestreo, destino.canales)
+    
+    return decodificar_audio_en_memoria(contenido, destino.frecuencia_muestreo, destino.canales)
 
-def segmentar_audio(ruta_archivo: str, duracion_segmento: int = 60000) -> list[str]:
+def crear_audio_data(
+    pcm: bytes,
+    frecuencia_muestreo: int = FRECUENCIA_MUESTREO_OBJETIVO
+) -> sr.AudioData:
     """
-    Segmenta un archivo de audio largo en segmentos más pequeños.
+    Envuelve un buffer PCM de 16 bits en un objeto AudioData de SpeechRecognition.
     
     Args:
-        ruta_archivo: Ruta al archivo de audio
-        duracion_segmento: Duración de cada segmento en milisegundos (por defecto 60s)
+        pcm: Muestras PCM de 16 bits
+        frecuencia_muestreo: Frecuencia de muestreo del buffer en Hz
         
     Returns:
-        Lista de rutas a los segmentos de audio
+        Objeto AudioData listo para el motor de transcripción
+    """
+    return sr.AudioData(pcm, frecuencia_muestreo, ANCHO_MUESTRA_OBJETIVO)
+
+def guardar_archivo_temporal(archivo: UploadFile, directorio: Optional[str] = None) -> str:
     """
-    # Obtener la extensión del archivo
-    extension = os.path.splitext(ruta_archivo)[1][1:].lower()
+    Guarda el archivo en una ubicación temporal.
     
-    # Cargar el archivo de audio con pydub
-    try:
-        audio = AudioSegment.from_file(ruta_archivo, format=extension)
-    except Exception as e:
-        raise ErrorFormatoAudio(f"Error al procesar el archivo de audio: {str(e)}")
+    Args:
+        archivo: Archivo de audio a guardar
+        directorio: Directorio de trabajo donde guardarlo (por defecto, el temporal del sistema)
+        
+    Returns:
+        Ruta al archivo temporal
+    """
+    # Crear un archivo temporal con un nombre único
+    nombre_temp = f"{uuid.uuid4()}.{obtener_extension(archivo)}"
+    ruta_temp = os.path.join(directorio or tempfile.gettempdir(), nombre_temp)
     
-    # Si el audio es más corto que la duración del segmento, devolver solo la ruta original
-    if len(audio) <= duracion_segmento:
-        return [ruta_archivo]
+    # Guardar el contenido del archivo en el archivo temporal
+    with open(ruta_temp, "wb") as f:
+        # Leer el archivo en chunks para evitar problemas de memoria
+        for chunk in iter(lambda: archivo.file.read(1024 * 1024), b""):
+            f.write(chunk)
     
-    # Segmentar el audio
-    segmentos = []
-    for i in range(0, len(audio), duracion_segmento):
-        # Extraer el segmento
-        segmento = audio[i:i + duracion_segmento]
+    return ruta_temp
+
+def segmentar_pcm(
+    pcm: bytes,
+    frecuencia_muestreo: int,
+    duracion_segmento: int = 30000,
+    solapamiento: int = 1000,
+    modo: str = "silencio",
+    energia: Optional[np.ndarray] = None
+) -> List[Tuple[int, int]]:
+    """
+    Calcula los límites de segmentación de un buffer PCM de 16 bits mono.
+    
+    En modo "silencio" cada corte se busca en el último 30% de la ventana, en la trama
+    de menor energía; si esa trama es silencio se corta ahí sin solapamiento. Si no hay
+    silencio (o en modo "fija") se corta en el límite de la ventana y el siguiente
+    segmento empieza `solapamiento` milisegundos antes para no partir palabras.
+    
+    Args:
+        pcm: Muestras PCM de 16 bits mono
+        frecuencia_muestreo: Frecuencia de muestreo del buffer en Hz
+        duracion_segmento: Duración máxima de cada segmento en milisegundos
+        solapamiento: Solapamiento entre segmentos cortados sin silencio, en milisegundos
+        modo: "silencio" para cortar en pausas o "fija" para ventanas fijas
+        energia: Energía RMS de las tramas de 30 ms ya calculada (se calcula si es None)
         
-        # Crear un nombre único para el segmento
-        nombre_base = os.path.basename(ruta_archivo)
-        nombre_sin_extension = os.path.splitext(nombre_base)[0]
-        nombre_segmento = f"{nombre_sin_extension}_segmento_{i // duracion_segmento}.{extension}"
-        ruta_segmento = os.path.join(tempfile.gettempdir(), nombre_segmento)
+    Returns:
+        Lista de tuplas (muestra inicial, muestra final) de cada segmento
+    """
+    muestras = np.frombuffer(pcm, dtype=np.int16)
+    total = len(muestras)
+    longitud = max(int(frecuencia_muestreo * duracion_segmento / 1000), 1)
+    solapamiento_muestras = min(int(frecuencia_muestreo * solapamiento / 1000), longitud // 2)
+    
+    if total <= longitud:
+        return [(0, total)]
+    
+    # Energía RMS por tramas de 30 ms para localizar pausas
+    tamano_trama = max(int(frecuencia_muestreo * 0.03), 1)
+    if modo != "silencio":
+        energia = None
+    elif energia is None:
+        num_tramas = total // tamano_trama
+        tramas = muestras[:num_tramas * tamano_trama].reshape(num_tramas, tamano_trama).astype(np.float32)
+        energia = np.sqrt(np.mean(tramas * tramas, axis=1))
+    if energia is not None:
+        # Umbral de silencio adaptativo entre el ruido de fondo y el nivel de la voz
+        piso, techo = np.percentile(energia, [2, 98])
+        if techo > 2 * piso:
+            umbral_silencio = float(piso + 0.1 * (techo - piso))
+        else:
+            # Sin contraste suficiente no hay pausas fiables: usar ventanas fijas
+            energia = None
+    
+    segmentos = []
+    inicio = 0
+    while inicio < total:
+        fin_objetivo = inicio + longitud
+        if fin_objetivo >= total:
+            segmentos.append((inicio, total))
+            break
         
-        # Exportar el segmento
-        segmento.export(ruta_segmento, format=extension)
+        corte = None
+        if energia is not None:
+            primera_trama = (inicio + int(longitud * 0.7)) // tamano_trama
+            ultima_trama = fin_objetivo // tamano_trama
+            ventana = energia[primera_trama:ultima_trama]
+            if len(ventana):
+                indice = int(np.argmin(ventana))
+                if ventana[indice] <= umbral_silencio:
+                    corte = (primera_trama + indice) * tamano_trama + tamano_trama // 2
         
-        # Añadir la ruta del segmento a la lista
-        segmentos.append(ruta_segmento)
+        if corte is not None and corte > inicio:
+            segmentos.append((inicio, corte))
+            inicio = corte
+        else:
+            segmentos.append((inicio, fin_objetivo))
+            inicio = fin_objetivo - solapamiento_muestras
     
     return segmentos
@@ -25,6 +25,10 @@ class ErrorTranscripcion(ErrorBase):
     """Error durante el proceso de transcripción."""
     pass
 
+class ErrorAudioSinVoz(ErrorTranscripcion):
+    """Error cuando el motor no reconoce ninguna voz en el audio."""
+    pass
+
 class ErrorMotorTranscripcion(ErrorBase):
     """Error relacionado con el motor de transcripción."""
     pass
@@ -33,6 +37,14 @@ class ErrorProcesamiento(ErrorBase):
     """Error durante el procesamiento del archivo de audio."""
     pass
 
+class ErrorColaLlena(ErrorBase):
+    """Error cuando la cola de trabajos está llena y no se aceptan más solicitudes."""
+    pass
+
+class ErrorTiempoEsperaCola(ErrorBase):
+    """Error cuando una solicitud espera en cola más del tiempo máximo permitido."""
+    pass
+
 def crear_respuesta_error(
     codigo_estado: int, 
     tipo_error: str, 
@@ -0,0 +1,141 @@
+"""
+Histogramas de latencia por etapa en formato de exposición de Prometheus.
+
+Cada etapa de la transcripción (lectura de la subida, decodificación, recorte de
+silencios, motor) se mide con `medir_etapa`. La duración se acumula en un histograma
+global, que /metrics expone en el formato de texto de Prometheus, y en los tiempos de
+la solicitud en curso, que se devuelven en la cabecera Server-Timing.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Límites de los histogramas de latencia en segundos
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Límites del histograma de duración del audio en segundos
+LIMITES_DURACION = (1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+# Límites del histograma del factor de tiempo real (procesamiento / duración del audio)
+LIMITES_FACTOR = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+
+# Segundos acumulados por etapa de la solicitud en curso
+tiempos_solicitud: ContextVar[Optional[Dict[str, float]]] = ContextVar("tiempos_solicitud", default=None)
+# Protege los tiempos de una solicitud cuyas etapas se ejecutan en varios hilos
+_bloqueo_tiempos = threading.Lock()
+
+class Histograma:
+    """Histograma acumulativo con etiquetas, seguro entre hilos."""
+
+    def __init__(self, nombre: str, descripcion: str, etiqueta: str, limites: Sequence[float]):
+        """
+        Inicializa el histograma.
+
+        Args:
+            nombre: Nombre de la métrica en Prometheus
+            descripcion: Texto de ayuda de la métrica
+            etiqueta: Nombre de la etiqueta que distingue las series (p. ej. "etapa")
+            limites: Límites superiores de los intervalos, en orden creciente
+        """
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.etiqueta = etiqueta
+        self.limites = tuple(limites)
+        self._series: Dict[str, Tuple[List[int], List[float]]] = {}
+        self._bloqueo = threading.Lock()
+
+    def observar(self, valor: float, etiqueta: str = "") -> None:
+        """Registra una observación en la serie de la etiqueta indicada."""
+        indice = bisect_left(self.limites, valor)
+        with self._bloqueo:
+            serie = self._series.get(etiqueta)
+            if serie is None:
+                serie = self._series[etiqueta] = ([0] * (len(self.limites) + 1), [0.0])
+            serie[0][indice] += 1
+            serie[1][0] += valor
+
+    def exponer(self) -> str:
+        """Devuelve las series en el formato de texto de Prometheus."""
+        lineas = [f"# HELP {self.nombre} {self.descripcion}", f"# TYPE {self.nombre} histogram"]
+        with self._bloqueo:
+            series = {etiqueta: (list(conteos), suma[0]) for etiqueta, (conteos, suma) in self._series.items()}
+        for etiqueta, (conteos, suma) in sorted(series.items()):
+            prefijo = f'{self.etiqueta}="{etiqueta}",' if self.etiqueta else ""
+            acumulado = 0
+            for limite, conteo in zip(self.limites, conteos):
+                acumulado += conteo
+                lineas.append(f'{self.nombre}_bucket{{{prefijo}le="{limite}"}} {acumulado}')
+            acumulado += conteos[-1]
+            lineas.append(f'{self.nombre}_bucket{{{prefijo}le="+Inf"}} {acumulado}')
+            etiquetas = f"{{{prefijo.rstrip(',')}}}" if prefijo else ""
+            lineas.append(f"{self.nombre}_sum{etiquetas} {suma}")
+            lineas.append(f"{self.nombre}_count{etiquetas} {acumulado}")
+        return "\n".join(lineas) + "\n"
+
+# Histogramas globales
+latencia_etapas = Histograma(
+    "voz_texto_etapa_segundos",
+    "Duración de cada etapa de la transcripción en segundos",
+    "etapa",
+    LIMITES_LATENCIA
+)
+duracion_audio = Histograma(
+    "voz_texto_duracion_audio_segundos",
+    "Duración del audio recibido antes del recorte de silencios en segundos",
+    "",
+    LIMITES_DURACION
+)
+factor_tiempo_real = Histograma(
+    "voz_texto_factor_tiempo_real",
+    "Tiempo de procesamiento entre duración del audio de las transcripciones no servidas desde la caché",
+    "",
+    LIMITES_FACTOR
+)
+
+def iniciar_tiempos_solicitud() -> Dict[str, float]:
+    """Empieza a acumular los tiempos por etapa de la solicitud actual."""
+    tiempos: Dict[str, float] = {}
+    tiempos_solicitud.set(tiempos)
+    return tiempos
+
+def registrar_etapa(etapa: str, segundos: float) -> None:
+    """
+    Registra la duración de una etapa en el histograma y en la solicitud en curso.
+
+    Args:
+        etapa: Nombre de la etapa
+        segundos: Duración de la etapa
+    """
+    latencia_etapas.observar(segundos, etapa)
+    tiempos = tiempos_solicitud.get()
+    if tiempos is not None:
+        # Las etapas que se repiten (p. ej. el motor con varios segmentos) se acumulan
+        with _bloqueo_tiempos:
+            tiempos[etapa] = tiempos.get(etapa, 0.0) + segundos
+
+@contextmanager
+def medir_etapa(etapa: str) -> Iterator[None]:
+    """Mide la duración del bloque como una etapa de la transcripción."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar_etapa(etapa, time.perf_counter() - inicio)
+
+def cabecera_server_timing(tiempos: Dict[str, float]) -> str:
+    """
+    Construye la cabecera Server-Timing con los tiempos de una solicitud.
+
+    Args:
+        tiempos: Tiempos acumulados por etapa
+
+    Returns:
+        Valor de la cabecera (duraciones en milisegundos)
+    """
+    with _bloqueo_tiempos:
+        return ", ".join(f"{etapa};dur={segundos * 1000:.1f}" for etapa, segundos in tiempos.items())
+
+def exponer_metricas() -> str:
+    """Devuelve todos los histogramas en el formato de texto de Prometheus."""
+    return latencia_etapas.exponer() + duracion_audio.exponer() + factor_tiempo_real.exponer()
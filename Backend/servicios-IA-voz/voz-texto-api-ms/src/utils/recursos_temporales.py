@@ -0,0 +1,207 @@
+"""
+Gestión del ciclo de vida de los archivos temporales del procesamiento de audio.
+
+Cada solicitud que necesita escribir en disco obtiene su propio directorio de trabajo.
+Al terminar, el directorio se entrega a un recolector en segundo plano que lo elimina
+de forma asíncrona, reintentando si algún archivo sigue bloqueado (por ejemplo, en
+Windows mientras ffmpeg libera el descriptor). Así la ruta de la solicitud nunca
+espera ni fuerza la recolección de basura.
+"""
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Set, Tuple
+
+from ..config import configuracion
+
+class GestorRecursosTemporales:
+    """Crea directorios de trabajo por solicitud y los elimina en segundo plano."""
+
+    def __init__(
+        self,
+        directorio_base: Optional[str] = None,
+        intervalo_reintento: float = 1.0,
+        max_reintentos: int = 10,
+        antiguedad_maxima: int = 3600
+    ):
+        """
+        Inicializa el gestor.
+
+        Args:
+            directorio_base: Directorio donde se crean los directorios de trabajo
+                (por defecto, un subdirectorio del directorio temporal del sistema)
+            intervalo_reintento: Segundos entre reintentos de eliminación
+            max_reintentos: Número máximo de reintentos antes de abandonar una ruta
+            antiguedad_maxima: Antigüedad en segundos a partir de la cual se purgan
+                restos de ejecuciones anteriores
+        """
+        self.directorio_base = directorio_base or os.path.join(tempfile.gettempdir(), "voz-texto")
+        self.intervalo_reintento = intervalo_reintento
+        self.max_reintentos = max_reintentos
+        self.antiguedad_maxima = antiguedad_maxima
+
+        self._cola: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._pendientes: List[Tuple[str, int, float]] = []
+        self._hilo: Optional[threading.Thread] = None
+        self._bloqueo = threading.Lock()
+        # Directorios de trabajos en curso que la purga de restos no debe tocar
+        self._protegidos: Set[str] = set()
+
+    def iniciar(self) -> None:
+        """Inicia el recolector en segundo plano si no está en ejecución."""
+        with self._bloqueo:
+            if self._hilo and self._hilo.is_alive():
+                return
+            os.makedirs(self.directorio_base, exist_ok=True)
+            self._hilo = threading.Thread(
+                target=self._ejecutar,
+                name="recolector-temporales",
+                daemon=True
+            )
+            self._hilo.start()
+
+        # Purgar restos de ejecuciones anteriores que no llegaron a limpiarse
+        self.purgar_antiguos()
+
+    def detener(self, tiempo_espera: float = 5.0) -> None:
+        """
+        Detiene el recolector tras procesar las rutas ya encoladas.
+
+        Args:
+            tiempo_espera: Segundos máximos de espera para que termine el hilo
+        """
+        with self._bloqueo:
+            hilo = self._hilo
+            self._hilo = None
+        if hilo and hilo.is_alive():
+            self._cola.put(None)
+            hilo.join(tiempo_espera)
+
+    @contextmanager
+    def directorio_trabajo(self) -> Iterator[str]:
+        """
+        Proporciona un directorio de trabajo exclusivo para una solicitud.
+
+        Al salir del contexto, el directorio completo se entrega al recolector.
+
+        Yields:
+            Ruta al directorio de trabajo
+        """
+        os.makedirs(self.directorio_base, exist_ok=True)
+        directorio = tempfile.mkdtemp(prefix="solicitud_", dir=self.directorio_base)
+        try:
+            yield directorio
+        finally:
+            self.liberar(directorio)
+
+    def proteger(self, ruta: str) -> None:
+        """
+        Excluye una ruta de la purga de restos hasta que se libere.
+
+        Se usa para los directorios de trabajos de larga duración (por ejemplo, los
+        lotes), que pueden superar la antigüedad máxima mientras siguen en uso.
+
+        Args:
+            ruta: Ruta al archivo o directorio a conservar
+        """
+        with self._bloqueo:
+            self._protegidos.add(os.path.abspath(ruta))
+
+    def liberar(self, ruta: str) -> None:
+        """
+        Encola un archivo o directorio para su eliminación asíncrona.
+
+        Args:
+            ruta: Ruta al archivo o directorio a eliminar
+        """
+        if not ruta:
+            return
+        with self._bloqueo:
+            self._protegidos.discard(os.path.abspath(ruta))
+        self.iniciar()
+        self._cola.put(ruta)
+
+    def purgar_antiguos(self) -> None:
+        """
+        Encola los directorios de trabajo abandonados más antiguos que la antigüedad máxima.
+
+        Las rutas protegidas se conservan aunque sean antiguas.
+        """
+        limite = time.time() - self.antiguedad_maxima
+        with self._bloqueo:
+            protegidos = set(self._protegidos)
+        try:
+            with os.scandir(self.directorio_base) as entradas:
+                for entrada in entradas:
+                    if os.path.abspath(entrada.path) in protegidos:
+                        continue
+                    try:
+                        if entrada.stat().st_mtime < limite:
+                            self._cola.put(entrada.path)
+                    except OSError:
+                        continue
+        except FileNotFoundError:
+            pass
+
+    def _ejecutar(self) -> None:
+        """Bucle principal del recolector."""
+        while True:
+            try:
+                ruta = self._cola.get(timeout=self.intervalo_reintento)
+            except queue.Empty:
+                ruta = ""
+
+            if ruta is None:
+                # Último intento para las rutas pendientes antes de salir
+                for ruta_pendiente, _, _ in self._pendientes:
+                    self._eliminar(ruta_pendiente)
+                self._pendientes.clear()
+                return
+
+            if ruta and not self._eliminar(ruta):
+                self._pendientes.append((ruta, 1, time.monotonic() + self.intervalo_reintento))
+
+            self._reintentar_pendientes()
+
+    def _reintentar_pendientes(self) -> None:
+        """Reintenta la eliminación de las rutas cuyo plazo de espera ha vencido."""
+        if not self._pendientes:
+            return
+
+        ahora = time.monotonic()
+        restantes = []
+        for ruta, intentos, proximo_intento in self._pendientes:
+            if proximo_intento > ahora:
+                restantes.append((ruta, intentos, proximo_intento))
+            elif not self._eliminar(ruta) and intentos < self.max_reintentos:
+                restantes.append((ruta, intentos + 1, ahora + self.intervalo_reintento))
+        self._pendientes = restantes
+
+    @staticmethod
+    def _eliminar(ruta: str) -> bool:
+        """
+        Elimina un archivo o directorio.
+
+        Args:
+            ruta: Ruta a eliminar
+
+        Returns:
+            True si la ruta ya no existe, False si debe reintentarse
+        """
+        try:
+            if os.path.isdir(ruta):
+                shutil.rmtree(ruta)
+            else:
+                os.remove(ruta)
+            return True
+        except FileNotFoundError:
+            return True
+        except OSError:
+            return False
+
+# Instancia global del gestor
+gestor_recursos = GestorRecursosTemporales(configuracion.directorio_temporal or None)
@@ -0,0 +1,115 @@
+"""
+Registro estructurado y no bloqueante del servicio.
+
+Los módulos usan `logging.getLogger(__name__)` con argumentos diferidos
+(`logger.debug("... %s", valor)`), de modo que los mensajes por debajo del nivel
+configurado no se formatean. Los registros emitidos pasan por una cola en memoria y
+un hilo de fondo los formatea como JSON y los escribe en la salida estándar y en el
+archivo de log, así que la solicitud nunca espera a una escritura en la tubería del
+contenedor. Cada registro lleva el identificador de la solicitud que lo originó.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# Identificador de la solicitud en curso (cabecera X-Request-ID o generado)
+id_solicitud: ContextVar[str] = ContextVar("id_solicitud", default="-")
+
+# Atributos estándar de LogRecord que no se copian como campos adicionales
+_ATRIBUTOS_ESTANDAR = frozenset(vars(logging.makeLogRecord({})).keys()) | {"message", "asctime"}
+
+class FiltroContexto(logging.Filter):
+    """Añade el identificador de la solicitud al registro en el hilo que lo emite."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.id_solicitud = id_solicitud.get()
+        return True
+
+class FormateadorJSON(logging.Formatter):
+    """Formatea cada registro como una línea JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            "tiempo": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "modulo": record.name,
+            "mensaje": record.getMessage(),
+            "id_solicitud": getattr(record, "id_solicitud", "-"),
+        }
+        # Campos pasados con extra={...}
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_ESTANDAR and clave not in datos:
+                datos[clave] = valor
+        if record.exc_info:
+            datos["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+class ManejadorCola(QueueHandler):
+    """
+    Encola los registros sin formatearlos.
+
+    El QueueHandler estándar formatea el mensaje en el hilo que registra; aquí todo el
+    formateo (incluidas las trazas de excepción) se hace en el hilo del QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+_escucha: Optional[QueueListener] = None
+
+def configurar_registro(nivel: str = "INFO", archivo: Optional[str] = None, formato: str = "json") -> None:
+    """
+    Configura el registro raíz con una cola y un hilo escritor.
+
+    Args:
+        nivel: Nivel mínimo de los registros (DEBUG, INFO, WARNING...)
+        archivo: Ruta del archivo de log (None = solo salida estándar)
+        formato: "json" para líneas JSON o "texto" para líneas legibles
+    """
+    global _escucha
+    detener_registro()
+
+    if formato == "texto":
+        formateador = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - [%(id_solicitud)s] %(message)s"
+        )
+    else:
+        formateador = FormateadorJSON()
+
+    manejadores = [logging.StreamHandler()]
+    if archivo:
+        os.makedirs(os.path.dirname(archivo) or ".", exist_ok=True)
+        manejadores.append(logging.FileHandler(archivo, encoding="utf-8"))
+    for manejador in manejadores:
+        manejador.setFormatter(formateador)
+
+    cola: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    manejador_cola = ManejadorCola(cola)
+    manejador_cola.addFilter(FiltroContexto())
+
+    raiz = logging.getLogger()
+    for manejador in list(raiz.handlers):
+        raiz.removeHandler(manejador)
+    raiz.addHandler(manejador_cola)
+    raiz.setLevel(getattr(logging, nivel.upper(), logging.INFO))
+
+    _escucha = QueueListener(cola, *manejadores, respect_handler_level=True)
+    _escucha.start()
+    # Vaciar la cola al salir del proceso
+    atexit.unregister(detener_registro)
+    atexit.register(detener_registro)
+
+def detener_registro() -> None:
+    """Escribe los registros pendientes y detiene el hilo escritor."""
+    global _escucha
+    if _escucha is not None:
+        _escucha.stop()
+        for manejador in _escucha.handlers:
+            manejador.close()
+        _escucha = None
@@ -0,0 +1,128 @@
+"""
+Remuestreo polifásico de PCM con NumPy.
+
+Convierte el audio PCM de un WAV directamente al formato nativo del motor (frecuencia,
+canales y ancho de muestra) sin lanzar ffmpeg. El filtro es un sinc con ventana de
+Kaiser descompuesto en fases, de modo que cada muestra de salida se calcula con un
+único producto escalar sobre las muestras de entrada vecinas.
+"""
+from functools import lru_cache
+from math import ceil, gcd
+from typing import Tuple
+
+import numpy as np
+
+from .error_utils import ErrorFormatoAudio
+
+# Cruces por cero del sinc a cada lado de la muestra (calidad del filtro)
+SEMIANCHO_FILTRO = 16
+# Parámetro beta de la ventana de Kaiser
+BETA_KAISER = 8.6
+# Fracción de la nueva frecuencia de Nyquist que conserva el filtro al reducir la frecuencia
+ANCHO_BANDA = 0.95
+# Muestras de salida calculadas por bloque (limita la memoria de la indexación vectorizada)
+TAMANO_BLOQUE = 16384
+
+def _a_flotante(pcm: bytes, ancho_muestra: int) -> np.ndarray:
+    """Convierte PCM entero little-endian de 8, 16, 24 o 32 bits a flotante en escala de 16 bits."""
+    if ancho_muestra == 1:
+        # El PCM de 8 bits de WAV es sin signo
+        return (np.frombuffer(pcm, dtype=np.uint8).astype(np.float32) - 128.0) * 256.0
+    if ancho_muestra == 2:
+        return np.frombuffer(pcm, dtype="<i2").astype(np.float32)
+    if ancho_muestra == 3:
+        bytes_muestras = np.frombuffer(pcm[:len(pcm) // 3 * 3], dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        valores = bytes_muestras[:, 0] | (bytes_muestras[:, 1] << 8) | (bytes_muestras[:, 2] << 16)
+        valores = np.where(valores & 0x800000, valores - 0x1000000, valores)
+        return valores.astype(np.float32) / 256.0
+    if ancho_muestra == 4:
+        return np.frombuffer(pcm, dtype="<i4").astype(np.float32) / 65536.0
+    raise ErrorFormatoAudio(f"Ancho de muestra PCM no soportado: {ancho_muestra} bytes")
+
+@lru_cache(maxsize=16)
+def _banco_filtros(frecuencia_origen: int, frecuencia_destino: int) -> Tuple[np.ndarray, np.ndarray, int, int]:
+    """
+    Calcula el banco de filtros polifásico para una conversión de frecuencia.
+
+    Returns:
+        Tupla con los coeficientes (una fila por fase), los desplazamientos de las
+        derivaciones, el factor de interpolación y el de decimación
+    """
+    divisor = gcd(frecuencia_origen, frecuencia_destino)
+    interpolacion = frecuencia_destino // divisor
+    decimacion = frecuencia_origen // divisor
+
+    # Frecuencia de corte relativa al Nyquist de entrada
+    corte = 1.0 if interpolacion >= decimacion else ANCHO_BANDA * interpolacion / decimacion
+    semiancho = int(ceil(SEMIANCHO_FILTRO / corte))
+    desplazamientos = np.arange(-semiancho + 1, semiancho + 1)
+
+    # Distancia de cada derivación a la posición fraccionaria de la muestra de salida
+    distancias = desplazamientos[None, :] - np.arange(interpolacion)[:, None] / interpolacion
+    relativas = np.clip(distancias / semiancho, -1.0, 1.0)
+    ventana = np.i0(BETA_KAISER * np.sqrt(1.0 - relativas * relativas)) / np.i0(BETA_KAISER)
+    coeficientes = (corte * np.sinc(corte * distancias) * ventana).astype(np.float32)
+    return coeficientes, desplazamientos, interpolacion, decimacion
+
+def remuestrear(muestras: np.ndarray, frecuencia_origen: int, frecuencia_destino: int) -> np.ndarray:
+    """
+    Cambia la frecuencia de muestreo de una señal mono.
+
+    Args:
+        muestras: Señal mono en coma flotante
+        frecuencia_origen: Frecuencia de muestreo de la señal en Hz
+        frecuencia_destino: Frecuencia de muestreo deseada en Hz
+
+    Returns:
+        Señal remuestreada en coma flotante
+    """
+    if frecuencia_origen == frecuencia_destino or not len(muestras):
+        return muestras
+
+    coeficientes, desplazamientos, interpolacion, decimacion = _banco_filtros(
+        frecuencia_origen, frecuencia_destino
+    )
+    margen = len(desplazamientos)
+    extendidas = np.concatenate([
+        np.zeros(margen, dtype=np.float32), muestras, np.zeros(margen, dtype=np.float32)
+    ])
+
+    total = int(ceil(len(muestras) * interpolacion / decimacion))
+    salida = np.empty(total, dtype=np.float32)
+    for inicio in range(0, total, TAMANO_BLOQUE):
+        indices = np.arange(inicio, min(inicio + TAMANO_BLOQUE, total), dtype=np.int64) * decimacion
+        base = indices // interpolacion
+        fase = indices % interpolacion
+        ventanas = extendidas[base[:, None] + desplazamientos[None, :] + margen]
+        salida[inicio:inicio + len(indices)] = np.einsum("ij,ij->i", ventanas, coeficientes[fase])
+    return salida
+
+def remuestrear_pcm(
+    pcm: bytes,
+    frecuencia_origen: int,
+    frecuencia_destino: int,
+    canales: int = 1,
+    ancho_muestra: int = 2
+) -> bytes:
+    """
+    Convierte PCM entero intercalado a PCM de 16 bits mono a la frecuencia indicada.
+
+    Args:
+        pcm: Muestras PCM intercaladas little-endian
+        frecuencia_origen: Frecuencia de muestreo del PCM en Hz
+        frecuencia_destino: Frecuencia de muestreo de salida en Hz
+        canales: Número de canales del PCM (se mezclan a mono)
+        ancho_muestra: Bytes por muestra del PCM (1, 2, 3 o 4)
+
+    Returns:
+        Muestras PCM de 16 bits mono
+
+    Raises:
+        ErrorFormatoAudio: Si el ancho de muestra no está soportado
+    """
+    muestras = _a_flotante(pcm, ancho_muestra)
+    if canales > 1:
+        muestras = muestras[:len(muestras) // canales * canales].reshape(-1, canales).mean(axis=1)
+
+    salida = remuestrear(muestras, frecuencia_origen, frecuencia_destino)
+    return np.clip(np.rint(salida), -32768, 32767).astype("<i2").tobytes()
@@ -0,0 +1,318 @@
+"""
+Detección de actividad de voz (VAD) basada en energía.
+"""
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .audio_utils import FRECUENCIA_MUESTREO_OBJETIVO, ANCHO_MUESTRA_OBJETIVO
+
+def energia_tramas(pcm: bytes, tamano_trama: int) -> np.ndarray:
+    """
+    Calcula la energía RMS de cada trama completa de un buffer PCM de 16 bits.
+
+    Args:
+        pcm: Muestras PCM de 16 bits mono
+        tamano_trama: Número de muestras por trama
+
+    Returns:
+        Vector con la energía de cada trama
+    """
+    muestras = np.frombuffer(pcm, dtype=np.int16)
+    num_tramas = len(muestras) // tamano_trama
+    tramas = muestras[:num_tramas * tamano_trama].reshape(num_tramas, tamano_trama).astype(np.float32)
+    return np.sqrt(np.mean(tramas * tramas, axis=1))
+
+def estimar_piso_ruido(
+    pcm: bytes,
+    frecuencia_muestreo: int = FRECUENCIA_MUESTREO_OBJETIVO,
+    duracion_trama: int = 30,
+    percentil: float = 10.0,
+    energias: Optional[np.ndarray] = None
+) -> float:
+    """
+    Estima el ruido de fondo de un buffer PCM sin consumir audio.
+    
+    Sustituye a `Recognizer.adjust_for_ambient_noise`, que recorre el primer segundo
+    trama a trama en Python y lo descarta de la transcripción. Aquí se calcula la
+    energía de todas las tramas de una vez y se toma un percentil bajo, que corresponde
+    a las pausas aunque el audio empiece hablando.
+    
+    Args:
+        pcm: Muestras PCM de 16 bits mono
+        frecuencia_muestreo: Frecuencia de muestreo del buffer en Hz
+        duracion_trama: Duración de cada trama de análisis en milisegundos
+        percentil: Percentil de la energía de las tramas que se toma como ruido de fondo
+        energias: Energía de las tramas de `duracion_trama` ya calculada (se calcula si es None)
+        
+    Returns:
+        Energía RMS del ruido de fondo (0 si el buffer no tiene ninguna trama completa)
+    """
+    if energias is None:
+        energias = energia_tramas(pcm, max(int(frecuencia_muestreo * duracion_trama / 1000), 1))
+    if not len(energias):
+        return 0.0
+    return float(np.percentile(energias, percentil))
+
+def recortar_silencios(
+    pcm: bytes,
+    frecuencia_muestreo: int = FRECUENCIA_MUESTREO_OBJETIVO,
+    relleno: int = 300,
+    silencio_maximo: int = 1000,
+    duracion_trama: int = 30,
+    umbral_minimo: float = 200.0,
+    factor_umbral: float = 3.0,
+    ajustar_ruido: bool = True,
+    energias: Optional[np.ndarray] = None
+) -> Tuple[bytes, int]:
+    """
+    Elimina el silencio inicial y final y acorta las pausas largas antes de transcribir.
+    
+    Cada trama se clasifica como voz si su energía supera el umbral (un múltiplo del ruido
+    de fondo estimado, o el umbral mínimo si no se ajusta al ruido). Se conserva `relleno`
+    milisegundos alrededor de la voz para no cortar el inicio y el final de las palabras,
+    y las pausas internas se acortan a `silencio_maximo` milisegundos (además del relleno). Si no se detecta
+    ninguna trama de voz, el audio se devuelve intacto para que decida el motor.
+    
+    Args:
+        pcm: Muestras PCM de 16 bits mono
+        frecuencia_muestreo: Frecuencia de muestreo del buffer en Hz
+        relleno: Milisegundos de audio que se conservan antes y después de la voz
+        silencio_maximo: Duración máxima en milisegundos de una pausa entre tramos de voz
+        duracion_trama: Duración de cada trama de análisis en milisegundos
+        umbral_minimo: Energía mínima para considerar una trama como voz
+        factor_umbral: Múltiplo del ruido de fondo a partir del cual hay voz
+        ajustar_ruido: Si es False se usa siempre el umbral mínimo
+        energias: Energía de las tramas de `duracion_trama` ya calculada (se calcula si es None)
+        
+    Returns:
+        Tupla con el PCM recortado y los milisegundos eliminados
+    """
+    tamano_trama = max(int(frecuencia_muestreo * duracion_trama / 1000), 1)
+    if energias is None:
+        energias = energia_tramas(pcm, tamano_trama)
+    if not len(energias):
+        return pcm, 0
+    
+    umbral = umbral_minimo
+    if ajustar_ruido:
+        piso_ruido = estimar_piso_ruido(pcm, frecuencia_muestreo, duracion_trama, energias=energias)
+        umbral = max(piso_ruido * factor_umbral, umbral_minimo)
+    voz = energias > umbral
+    if not voz.any():
+        return pcm, 0
+    
+    # Ampliar cada tramo de voz con el relleno a ambos lados. Con mode="full" la trama i
+    # queda centrada en la posición i + tramas_relleno aunque el audio sea más corto que
+    # el núcleo (mode="same" devolvería entonces tantas posiciones como el núcleo)
+    tramas_relleno = relleno // duracion_trama
+    if tramas_relleno:
+        ampliada = np.convolve(voz, np.ones(2 * tramas_relleno + 1), mode="full")
+        voz = ampliada[tramas_relleno:tramas_relleno + len(voz)] > 0
+    
+    # Conservar como mucho `silencio_maximo` de cada pausa interna
+    tramas_pausa = max(silencio_maximo // duracion_trama, 0)
+    indices_voz = np.flatnonzero(voz)
+    conservar = voz.copy()
+    huecos = np.flatnonzero(np.diff(indices_voz) > 1)
+    for hueco in huecos:
+        inicio = indices_voz[hueco] + 1
+        fin = indices_voz[hueco + 1]
+        mitad = tramas_pausa // 2
+        conservar[inicio:inicio + mitad] = True
+        conservar[max(fin - (tramas_pausa - mitad), inicio):fin] = True
+    
+    muestras = np.frombuffer(pcm, dtype=np.int16)
+    num_tramas = len(energias)
+    tramas = muestras[:num_tramas * tamano_trama].reshape(num_tramas, tamano_trama)
+    recortado = tramas[conservar].reshape(-1)
+    # Las muestras finales que no completan una trama solo se conservan si la última trama es voz
+    if conservar[-1]:
+        recortado = np.concatenate([recortado, muestras[num_tramas * tamano_trama:]])
+    
+    eliminadas = len(muestras) - len(recortado)
+    return recortado.tobytes(), int(eliminadas * 1000 / frecuencia_muestreo)
+
+class EstadisticasRecorte:
+    """Contadores acumulados del audio eliminado por el recorte de silencios."""
+    
+    def __init__(self):
+        self._bloqueo = threading.Lock()
+        self.solicitudes = 0
+        self.audio_total_ms = 0
+        self.audio_recortado_ms = 0
+    
+    def registrar(self, total_ms: int, recortado_ms: int) -> None:
+        """Registra el resultado del recorte de una solicitud."""
+        with self._bloqueo:
+            self.solicitudes += 1
+            self.audio_total_ms += total_ms
+            self.audio_recortado_ms += recortado_ms
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte las estadísticas a un diccionario."""
+        with self._bloqueo:
+            return {
+                "solicitudes": self.solicitudes,
+                "audio_total_ms": self.audio_total_ms,
+                "audio_recortado_ms": self.audio_recortado_ms,
+                "proporcion_recortada": (
+                    self.audio_recortado_ms / self.audio_total_ms if self.audio_total_ms else 0.0
+                ),
+            }
+
+# Instancia global de las estadísticas de recorte
+estadisticas_recorte = EstadisticasRecorte()
+
+class DetectorActividadVoz:
+    """
+    Segmenta un flujo PCM en enunciados a medida que llegan las muestras.
+
+    Un enunciado empieza cuando una trama supera el umbral de voz y se cierra tras
+    `silencio_cierre` milisegundos consecutivos por debajo de él (o al alcanzar la
+    duración máxima). El umbral se adapta al ruido de fondo observado en las tramas
+    sin voz.
+    """
+
+    def __init__(
+        self,
+        frecuencia_muestreo: int = FRECUENCIA_MUESTREO_OBJETIVO,
+        duracion_trama: int = 30,
+        silencio_cierre: int = 700,
+        duracion_maxima: int = 15000,
+        relleno: int = 300,
+        umbral_minimo: float = 200.0,
+        factor_umbral: float = 3.0,
+        piso_ruido: Optional[float] = None,
+        adaptativo: bool = True
+    ):
+        """
+        Inicializa el detector.
+
+        Args:
+            frecuencia_muestreo: Frecuencia de muestreo del flujo en Hz
+            duracion_trama: Duración de cada trama de análisis en milisegundos
+            silencio_cierre: Silencio en milisegundos que cierra un enunciado
+            duracion_maxima: Duración máxima de un enunciado en milisegundos
+            relleno: Audio previo en milisegundos que se antepone a cada enunciado
+            umbral_minimo: Energía mínima para considerar una trama como voz
+            factor_umbral: Múltiplo del ruido de fondo a partir del cual hay voz
+            piso_ruido: Ruido de fondo inicial (p. ej. el último conocido del mismo dispositivo)
+            adaptativo: Si es False el umbral es fijo (umbral_minimo) y no se estima el ruido
+        """
+        self.tamano_trama = max(int(frecuencia_muestreo * duracion_trama / 1000), 1)
+        self.bytes_trama = self.tamano_trama * ANCHO_MUESTRA_OBJETIVO
+        self.tramas_cierre = max(silencio_cierre // duracion_trama, 1)
+        self.tramas_maximas = max(duracion_maxima // duracion_trama, 1)
+        self.umbral_minimo = umbral_minimo
+        self.factor_umbral = factor_umbral
+        self.piso_ruido: Optional[float] = piso_ruido if adaptativo else None
+        self.adaptativo = adaptativo
+
+        self._resto = b""
+        self._previas: deque = deque(maxlen=max(relleno // duracion_trama, 0))
+        self._enunciado = bytearray()
+        self._tramas_enunciado = 0
+        self._tramas_silencio = 0
+        self.en_voz = False
+
+    @property
+    def umbral(self) -> float:
+        """Energía a partir de la cual una trama se considera voz."""
+        if self.piso_ruido is None:
+            return self.umbral_minimo
+        return max(self.piso_ruido * self.factor_umbral, self.umbral_minimo)
+
+    @property
+    def enunciado_actual(self) -> bytes:
+        """PCM del enunciado en curso (vacío si no hay voz)."""
+        return bytes(self._enunciado) if self.en_voz else b""
+
+    def procesar(self, pcm: bytes) -> List[bytes]:
+        """
+        Procesa un nuevo fragmento PCM.
+
+        Args:
+            pcm: Muestras PCM de 16 bits mono
+
+        Returns:
+            Lista de enunciados cerrados durante este fragmento
+        """
+        datos = self._resto + pcm
+        completos = len(datos) // self.bytes_trama * self.bytes_trama
+        self._resto = datos[completos:]
+        if not completos:
+            return []
+
+        energias = energia_tramas(datos[:completos], self.tamano_trama)
+        if self.adaptativo and self.piso_ruido is None:
+            self._calibrar_piso(datos[:completos], energias)
+        cerrados = []
+        for indice, energia in enumerate(energias):
+            trama = datos[indice * self.bytes_trama:(indice + 1) * self.bytes_trama]
+            es_voz = energia > self.umbral
+
+            if not self.en_voz:
+                if es_voz:
+                    self.en_voz = True
+                    self._enunciado = bytearray(b"".join(self._previas))
+                    self._previas.clear()
+                    self._enunciado += trama
+                    self._tramas_enunciado = 1
+                    self._tramas_silencio = 0
+                else:
+                    self._actualizar_piso(float(energia))
+                    self._previas.append(trama)
+                continue
+
+            self._enunciado += trama
+            self._tramas_enunciado += 1
+            self._tramas_silencio = 0 if es_voz else self._tramas_silencio + 1
+            if self._tramas_silencio >= self.tramas_cierre or self._tramas_enunciado >= self.tramas_maximas:
+                cerrados.append(self._cerrar())
+
+        return cerrados
+
+    def finalizar(self) -> Optional[bytes]:
+        """
+        Cierra el enunciado en curso al terminar el flujo.
+
+        Returns:
+            PCM del último enunciado o None si no había voz
+        """
+        if not self.en_voz:
+            return None
+        self._enunciado += self._resto
+        self._resto = b""
+        return self._cerrar()
+
+    def _cerrar(self) -> bytes:
+        """Cierra el enunciado actual y devuelve su PCM."""
+        enunciado = bytes(self._enunciado)
+        self._enunciado = bytearray()
+        self._tramas_enunciado = 0
+        self._tramas_silencio = 0
+        self.en_voz = False
+        return enunciado
+
+    def _calibrar_piso(self, pcm: bytes, energias: np.ndarray) -> None:
+        """
+        Estima el ruido de fondo inicial con las pausas del primer fragmento.
+
+        Si el fragmento es todo voz, su percentil bajo no es ruido: se descarta y el
+        ruido se estima con las primeras tramas sin voz.
+        """
+        piso = estimar_piso_ruido(pcm, energias=energias)
+        if piso * self.factor_umbral <= self.umbral_minimo:
+            self.piso_ruido = piso
+
+    def _actualizar_piso(self, energia: float) -> None:
+        """Actualiza el ruido de fondo con una media móvil exponencial."""
+        if not self.adaptativo:
+            return
+        if self.piso_ruido is None:
+            self.piso_ruido = energia
+        else:
+            self.piso_ruido = 0.95 * self.piso_ruido + 0.05 * energia
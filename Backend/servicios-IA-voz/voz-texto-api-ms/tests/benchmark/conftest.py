@@ -0,0 +1,168 @@
+"""
+Configuración de los benchmarks del pipeline de audio.
+
+Los benchmarks requieren pytest-benchmark. Si no está instalado, los módulos de esta
+carpeta no se recogen y `python -m pytest` ejecuta solo las pruebas unitarias.
+
+Uso:
+    python -m pytest tests/benchmark --benchmark-only
+    python -m pytest tests/benchmark --benchmark-only --benchmark-autosave
+    python -m pytest tests/benchmark --benchmark-only --benchmark-compare --benchmark-compare-fail=mean:15%
+"""
+import importlib.util
+import io
+import resource
+import subprocess
+import sys
+import tracemalloc
+import wave
+from typing import Any, Callable, Dict, Tuple
+
+import imageio_ffmpeg
+import numpy as np
+import pytest
+
+from src.utils.audio_config import configurar_ffmpeg
+
+if importlib.util.find_spec("pytest_benchmark") is None:
+    collect_ignore_glob = ["test_*.py"]
+
+# Formatos, duraciones (segundos) y frecuencias de muestreo (Hz) del audio sintético
+FORMATOS = ("wav", "webm", "mp3", "ogg")
+DURACIONES = (5, 30, 120)
+FRECUENCIAS = (8000, 16000, 44100, 48000)
+
+# Rondas de cada benchmark: las operaciones duran de milisegundos a segundos, así que se
+# fija un número pequeño en lugar de la calibración automática de pytest-benchmark
+RONDAS = 5
+
+# Argumentos de ffmpeg para codificar cada formato comprimido
+_CODIFICADORES = {
+    "webm": ["-c:a", "libopus", "-b:a", "32k", "-f", "webm"],
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "64k", "-f", "mp3"],
+    "ogg": ["-c:a", "libvorbis", "-q:a", "3", "-f", "ogg"],
+}
+
+def generar_pcm_voz(duracion: float, frecuencia: int) -> bytes:
+    """
+    Genera PCM de 16 bits mono que imita la voz: tramos sonoros separados por pausas.
+
+    Args:
+        duracion: Duración en segundos
+        frecuencia: Frecuencia de muestreo en Hz
+
+    Returns:
+        Muestras PCM de 16 bits little-endian
+    """
+    rng = np.random.default_rng(0)
+    t = np.arange(int(duracion * frecuencia)) / frecuencia
+
+    # Tramos de voz de 1,5 a 4 s seguidos de pausas de 0,3 a 1 s
+    envolvente = np.zeros_like(t)
+    inicio = 0.0
+    while inicio < duracion:
+        fin = inicio + rng.uniform(1.5, 4.0)
+        envolvente[int(inicio * frecuencia):int(fin * frecuencia)] = 1.0
+        inicio = fin + rng.uniform(0.3, 1.0)
+
+    # Tono con modulación de amplitud y ruido, más un ruido de fondo muy bajo
+    sonoro = np.sin(2 * np.pi * 180 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    sonoro += 0.2 * rng.standard_normal(len(t))
+    muestras = sonoro * envolvente * 8000 + rng.standard_normal(len(t)) * 30
+    return np.clip(muestras, -32768, 32767).astype(np.int16).tobytes()
+
+def envolver_wav(pcm: bytes, frecuencia: int) -> bytes:
+    """Envuelve PCM de 16 bits mono en un contenedor WAV."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as archivo_wav:
+        archivo_wav.setnchannels(1)
+        archivo_wav.setsampwidth(2)
+        archivo_wav.setframerate(frecuencia)
+        archivo_wav.writeframes(pcm)
+    return buffer.getvalue()
+
+def codificar(contenido_wav: bytes, formato: str) -> bytes:
+    """
+    Codifica un WAV en el formato indicado con ffmpeg.
+
+    Args:
+        contenido_wav: Archivo WAV en memoria
+        formato: wav, webm, mp3 u ogg
+
+    Returns:
+        Archivo codificado en memoria
+    """
+    if formato == "wav":
+        return contenido_wav
+    proceso = subprocess.run(
+        [imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+         *_CODIFICADORES[formato], "pipe:1"],
+        input=contenido_wav,
+        capture_output=True,
+        check=True
+    )
+    return proceso.stdout
+
+@pytest.fixture(scope="session")
+def audio_sintetico() -> Callable[..., bytes]:
+    """
+    Devuelve una función que genera (y reutiliza durante la sesión) audio sintético.
+
+    La función recibe el formato, la duración en segundos y la frecuencia de muestreo
+    (16 kHz por defecto) y devuelve el archivo codificado.
+    """
+    configurar_ffmpeg()
+    generados: Dict[Tuple[str, int, int], bytes] = {}
+
+    def obtener(formato: str, duracion: int, frecuencia: int = 16000) -> bytes:
+        clave = (formato, duracion, frecuencia)
+        if clave not in generados:
+            wav = envolver_wav(generar_pcm_voz(duracion, frecuencia), frecuencia)
+            generados[clave] = codificar(wav, formato)
+        return generados[clave]
+
+    return obtener
+
+def _rss_pico_mb(quien: int) -> float:
+    """Memoria residente máxima en MB (ru_maxrss está en KB en Linux y en bytes en macOS)."""
+    maximo = resource.getrusage(quien).ru_maxrss
+    return maximo / (1024 * 1024) if sys.platform == "darwin" else maximo / 1024
+
+@pytest.fixture
+def rendimiento(benchmark) -> Callable[..., Any]:
+    """
+    Ejecuta un benchmark y añade al informe el rendimiento y la memoria.
+
+    Además de los tiempos de pytest-benchmark, `extra_info` recoge:
+        - audio_por_segundo: segundos de audio procesados por segundo (media de las rondas)
+        - memoria_pico_mb: pico de memoria asignada por Python y NumPy en una ejecución
+        - rss_pico_mb / rss_pico_subprocesos_mb: memoria residente máxima del proceso y de
+          sus subprocesos (ffmpeg) hasta ese benchmark; como es acumulativa, solo detecta
+          regresiones si el benchmark se ejecuta aislado (-k)
+
+    La función devuelta recibe la función a medir, sus argumentos y los segundos de audio
+    que procesa (palabra clave `segundos_audio`), y devuelve el resultado de la función.
+    """
+    def medir(funcion: Callable[..., Any], *args: Any, segundos_audio: float, **kwargs: Any) -> Any:
+        resultado = benchmark.pedantic(
+            funcion, args=args, kwargs=kwargs, rounds=RONDAS, iterations=1, warmup_rounds=1
+        )
+
+        tracemalloc.start()
+        try:
+            funcion(*args, **kwargs)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        media = benchmark.stats.stats.mean if benchmark.stats else None
+        benchmark.extra_info.update({
+            "segundos_audio": segundos_audio,
+            "audio_por_segundo": segundos_audio / media if media else None,
+            "memoria_pico_mb": pico / (1024 * 1024),
+            "rss_pico_mb": _rss_pico_mb(resource.RUSAGE_SELF),
+            "rss_pico_subprocesos_mb": _rss_pico_mb(resource.RUSAGE_CHILDREN),
+        })
+        return resultado
+
+    return medir
@@ -0,0 +1,78 @@
+"""
+Benchmarks de la decodificación, el remuestreo, el recorte de silencios y la segmentación.
+
+Miden las mismas funciones que usa el pipeline de /transcribir y de los lotes.
+"""
+import pytest
+
+from src.utils import (
+    sondear_formato,
+    decodificar_audio,
+    decodificar_audio_en_memoria,
+    segmentar_pcm,
+    AudioDecodificado,
+    FORMATO_PCM_OBJETIVO
+)
+from src.utils.remuestreo import remuestrear_pcm
+from src.utils.vad import recortar_silencios
+
+from .conftest import DURACIONES, FORMATOS, FRECUENCIAS, generar_pcm_voz
+
+def _decodificar(contenido: bytes) -> bytes:
+    """Sondeo y decodificación al formato de los motores, como en el pipeline."""
+    return decodificar_audio(contenido, sondear_formato(contenido))
+
+@pytest.mark.parametrize("duracion", DURACIONES)
+@pytest.mark.parametrize("formato", FORMATOS)
+def test_decodificar(rendimiento, audio_sintetico, formato, duracion):
+    """Decodificación a PCM 16 kHz mono de cada formato a 44,1 kHz."""
+    contenido = audio_sintetico(formato, duracion, 44100)
+    pcm = rendimiento(_decodificar, contenido, segundos_audio=duracion)
+    assert abs(len(pcm) / (FORMATO_PCM_OBJETIVO.frecuencia_muestreo * 2) - duracion) < 0.1
+
+@pytest.mark.parametrize("frecuencia", FRECUENCIAS)
+def test_decodificar_wav_por_frecuencia(rendimiento, audio_sintetico, frecuencia):
+    """WAV a distintas frecuencias: lectura directa a 16 kHz y remuestreo con NumPy en el resto."""
+    contenido = audio_sintetico("wav", 30, frecuencia)
+    rendimiento(_decodificar, contenido, segundos_audio=30)
+
+@pytest.mark.parametrize("frecuencia", [f for f in FRECUENCIAS if f != 16000])
+def test_remuestrear(rendimiento, frecuencia):
+    """Remuestreo polifásico de 30 s de PCM a 16 kHz."""
+    pcm = generar_pcm_voz(30, frecuencia)
+    rendimiento(remuestrear_pcm, pcm, frecuencia, 16000, segundos_audio=30)
+
+@pytest.mark.parametrize("duracion", DURACIONES)
+def test_recortar_silencios(rendimiento, duracion):
+    """Recorte de silencios (VAD por energía) antes de enviar el audio al motor."""
+    pcm = generar_pcm_voz(duracion, 16000)
+    rendimiento(
+        recortar_silencios, pcm, 16000, relleno=300, silencio_maximo=1000, segundos_audio=duracion
+    )
+
+@pytest.mark.parametrize("modo", ["silencio", "fija"])
+@pytest.mark.parametrize("duracion", DURACIONES)
+def test_segmentar_pcm(rendimiento, duracion, modo):
+    """Cálculo de los límites de los segmentos de un audio largo."""
+    pcm = generar_pcm_voz(duracion, 16000)
+    limites = rendimiento(segmentar_pcm, pcm, 16000, 30000, 1000, modo, segundos_audio=duracion)
+    assert limites[-1][1] == len(pcm) // 2
+
+@pytest.mark.parametrize("formato", FORMATOS)
+def test_decodificar_en_memoria(rendimiento, audio_sintetico, formato):
+    """Decodificación con el proceso de ffmpeg por tuberías, sin el atajo del sondeo para WAV."""
+    contenido = audio_sintetico(formato, 30, 44100)
+    pcm = rendimiento(decodificar_audio_en_memoria, contenido, segundos_audio=30)
+    assert abs(len(pcm) / (FORMATO_PCM_OBJETIVO.frecuencia_muestreo * 2) - 30) < 0.1
+
+def _recortar_y_segmentar(pcm: bytes):
+    """Recorte de silencios y segmentación compartiendo la energía, como en el pipeline."""
+    audio, _ = AudioDecodificado(pcm).recortar_silencios(relleno=300, silencio_maximo=1000)
+    return audio.segmentar(30000, 1000, "silencio")
+
+@pytest.mark.parametrize("duracion", DURACIONES)
+def test_recortar_y_segmentar_audio_decodificado(rendimiento, duracion):
+    """Recorte de silencios y segmentación de un AudioDecodificado antes de llamar al motor."""
+    pcm = generar_pcm_voz(duracion, 16000)
+    limites = rendimiento(_recortar_y_segmentar, pcm, segundos_audio=duracion)
+    assert limites
@@ -0,0 +1,49 @@
+"""
+Benchmarks de extremo a extremo de POST /api/v1/transcribir con un motor simulado.
+
+Miden la sobrecarga del servicio (subida, validación, decodificación en el pool de
+procesos, recorte de silencios y serialización) sin la latencia de un motor real.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.app import app
+from src.services import servicio_transcripcion, cache_transcripciones
+from src.services.motores_transcripcion import MotorTranscripcionBase, ResultadoMotor
+
+from .conftest import FORMATOS
+
+class MotorInstantaneo(MotorTranscripcionBase):
+    """Motor simulado que responde sin coste."""
+
+    def transcribir(self, audio, opciones=None):
+        return self.transcribir_detallado(audio, opciones).texto
+
+    def transcribir_detallado(self, audio, opciones=None):
+        return ResultadoMotor("hola", 0.9)
+
+@pytest.fixture
+def cliente(monkeypatch):
+    """Cliente con el ciclo de vida de la aplicación, el motor simulado y sin caché."""
+    monkeypatch.setattr(servicio_transcripcion, "motor", MotorInstantaneo())
+    monkeypatch.setattr(servicio_transcripcion, "enrutador", None)
+    # Sin caché, cada ronda recorre el pipeline completo
+    monkeypatch.setattr(cache_transcripciones, "capacidad", 0)
+    with TestClient(app) as cliente:
+        yield cliente
+
+@pytest.mark.parametrize("duracion", [5, 30])
+@pytest.mark.parametrize("formato", FORMATOS)
+def test_ruta_transcribir(rendimiento, audio_sintetico, cliente, formato, duracion):
+    """Latencia de una transcripción completa por formato y duración."""
+    contenido = audio_sintetico(formato, duracion, 44100)
+
+    def transcribir():
+        respuesta = cliente.post(
+            "/api/v1/transcribir", files={"archivo": (f"audio.{formato}", contenido, f"audio/{formato}")}
+        )
+        assert respuesta.status_code == 200, respuesta.text
+        return respuesta
+
+    respuesta = rendimiento(transcribir, segundos_audio=duracion)
+    assert respuesta.json()["duracion"] == pytest.approx(duracion, abs=0.1)
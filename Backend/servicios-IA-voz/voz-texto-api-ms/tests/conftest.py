@@ -11,6 +11,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 # Cargar variables de entorno para pruebas
 load_dotenv("tests/.env.test")
+# Las pruebas registran solo en la salida estándar, sin escribir en logs/app.log
+os.environ.setdefault("LOG_ARCHIVO", "")
 
 @pytest.fixture
 def test_configuracion():
@@ -0,0 +1,57 @@
+"""
+Pruebas para el agrupador de solicitudes en lotes.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.services.agrupador_lotes import AgrupadorLotes
+
+def test_agrupa_solicitudes_concurrentes():
+    """Las solicitudes que llegan juntas se resuelven en un solo lote, en orden."""
+    lotes = []
+    
+    def procesar(clave, entradas):
+        lotes.append(list(entradas))
+        return [entrada * 2 for entrada in entradas]
+    
+    agrupador = AgrupadorLotes(procesar, tamano_maximo=8, espera_maxima=0.2)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        resultados = list(pool.map(agrupador.enviar, [1, 2, 3, 4]))
+    agrupador.detener()
+    
+    assert resultados == [2, 4, 6, 8]
+    assert len(lotes) == 1
+    assert sorted(lotes[0]) == [1, 2, 3, 4]
+
+def test_separa_lotes_por_clave_y_tamano():
+    """Solo se agrupan entradas con la misma clave y sin superar el tamaño máximo."""
+    lotes = []
+    bloqueo = threading.Lock()
+    
+    def procesar(clave, entradas):
+        with bloqueo:
+            lotes.append((clave, len(entradas)))
+        return [f"{clave}:{entrada}" for entrada in entradas]
+    
+    agrupador = AgrupadorLotes(procesar, tamano_maximo=2, espera_maxima=0.2)
+    solicitudes = [("es", 1), ("en", 2), ("es", 3), ("es", 4)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        resultados = list(pool.map(lambda s: agrupador.enviar(s[1], clave=s[0]), solicitudes))
+    agrupador.detener()
+    
+    assert resultados == ["es:1", "en:2", "es:3", "es:4"]
+    assert all(tamano <= 2 for _, tamano in lotes)
+    assert sum(tamano for clave, tamano in lotes if clave == "es") == 3
+
+def test_excepciones_por_entrada():
+    """Un resultado que es una excepción solo afecta a su solicitud."""
+    def procesar(clave, entradas):
+        return [ValueError("impar") if entrada % 2 else entrada for entrada in entradas]
+    
+    agrupador = AgrupadorLotes(procesar, espera_maxima=0.0)
+    assert agrupador.enviar(2) == 2
+    with pytest.raises(ValueError):
+        agrupador.enviar(1)
+    agrupador.detener()
@@ -0,0 +1,96 @@
+"""
+Pruebas para el audio decodificado compartido por las etapas de una solicitud.
+"""
+import asyncio
+
+import pytest
+
+from src.services import pipeline_transcripcion, servicio_transcripcion, cache_transcripciones
+from src.services.motores_transcripcion import MotorTranscripcionBase
+from src.utils import AudioDecodificado, FormatoPCM, segmentar_pcm
+from src.utils import audio_decodificado as modulo_audio
+from src.utils.vad import recortar_silencios
+
+from .test_audio_utils import generar_wav
+from .test_vad import generar_audio, FRECUENCIA
+
+FORMATO = FormatoPCM(FRECUENCIA, 1, 2)
+
+def test_metadatos_del_buffer():
+    """La duración y el AudioData salen del mismo buffer, sin copiarlo."""
+    pcm = generar_audio([(True, 1.5)])
+    audio = AudioDecodificado(pcm, FORMATO)
+
+    assert audio.duracion == pytest.approx(1.5)
+    assert audio.duracion_ms == 1500
+    assert audio.audio_data.frame_data is pcm
+    assert audio.audio_data is audio.audio_data
+    assert not audio.muestras.flags.writeable
+
+def test_energia_se_calcula_una_vez(monkeypatch):
+    """El recorte y la segmentación reutilizan la energía por tramas ya calculada."""
+    llamadas = []
+    original = modulo_audio.energia_tramas
+
+    def contar(pcm, tamano_trama):
+        llamadas.append(tamano_trama)
+        return original(pcm, tamano_trama)
+
+    monkeypatch.setattr(modulo_audio, "energia_tramas", contar)
+    pcm = generar_audio([(True, 20.0), (False, 0.5), (True, 20.0)])
+    audio = AudioDecodificado(pcm, FORMATO)
+
+    audio.segmentar(30000, 1000, "silencio")
+    audio.segmentar(30000, 1000, "silencio")
+    audio.energia()
+    assert llamadas == [480]
+
+def test_resultados_iguales_a_las_funciones_sobre_bytes():
+    """Los métodos producen lo mismo que las funciones que reciben el PCM."""
+    pcm = generar_audio([(False, 2.0), (True, 20.0), (False, 3.0), (True, 20.0), (False, 2.0)])
+    audio = AudioDecodificado(pcm, FORMATO)
+
+    assert audio.segmentar(30000, 1000, "silencio") == segmentar_pcm(pcm, FRECUENCIA, 30000, 1000, "silencio")
+    recortado, eliminado_ms = audio.recortar_silencios(relleno=300, silencio_maximo=1000)
+    assert (recortado.pcm, eliminado_ms) == recortar_silencios(pcm, FRECUENCIA, relleno=300, silencio_maximo=1000)
+    assert recortado.formato == FORMATO
+
+def test_recorte_sin_cambios_devuelve_el_mismo_objeto():
+    """Si no hay voz que delimitar, el audio y sus metadatos calculados se conservan."""
+    audio = AudioDecodificado(generar_audio([(False, 2.0)]), FORMATO)
+    assert audio.recortar_silencios() == (audio, 0)
+
+def test_segmento():
+    """Un segmento contiene exactamente las muestras pedidas."""
+    audio = AudioDecodificado(generar_audio([(True, 2.0)]), FORMATO)
+    segmento = audio.segmento(FRECUENCIA // 2, FRECUENCIA)
+    assert segmento.num_muestras == FRECUENCIA // 2
+    assert segmento.pcm == audio.pcm[FRECUENCIA:2 * FRECUENCIA]
+
+def test_pipeline_decodifica_una_sola_vez(monkeypatch):
+    """El archivo se decodifica una vez y el motor recibe el AudioData del mismo buffer."""
+    decodificaciones = []
+    original = pipeline_transcripcion.decodificar_audio
+
+    def contar(*args, **kwargs):
+        decodificaciones.append(args[1].estrategia)
+        return original(*args, **kwargs)
+
+    recibidos = []
+
+    class MotorRegistro(MotorTranscripcionBase):
+        def transcribir(self, audio, opciones=None):
+            recibidos.append(audio)
+            return "hola"
+
+    monkeypatch.setattr(pipeline_transcripcion, "decodificar_audio", contar)
+    monkeypatch.setattr(servicio_transcripcion, "motor", MotorRegistro())
+    monkeypatch.setattr(cache_transcripciones, "capacidad", 0)
+    monkeypatch.setattr(pipeline_transcripcion.configuracion, "vad_recorte", False)
+
+    contenido = generar_wav(duracion=1.0, frecuencia_muestreo=16000, canales=1)
+    resultado = asyncio.run(pipeline_transcripcion.transcribir_contenido(contenido))
+
+    assert resultado.texto == "hola"
+    assert len(decodificaciones) == 1
+    assert len(recibidos) == 1 and recibidos[0].frame_data == contenido[-len(recibidos[0].frame_data):]
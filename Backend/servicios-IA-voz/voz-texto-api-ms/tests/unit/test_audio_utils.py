@@ -0,0 +1,152 @@
+"""
+Pruebas para las utilidades de procesamiento de audio.
+"""
+import io
+import wave
+import numpy as np
+import pytest
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+from src.utils.audio_config import configurar_ffmpeg
+from src.utils import (
+    sondear_formato,
+    validar_archivo_audio,
+    decodificar_audio,
+    decodificar_audio_en_memoria,
+    crear_audio_data,
+    ErrorFormatoAudio,
+    ErrorTamanoArchivo,
+    FormatoPCM,
+    ESTRATEGIA_DIRECTA,
+    ESTRATEGIA_REMUESTREO,
+    ESTRATEGIA_TUBERIA,
+    ESTRATEGIA_DISCO
+)
+
+@pytest.fixture(scope="module", autouse=True)
+def ffmpeg_configurado():
+    """Configura pydub para usar el ffmpeg incluido con imageio-ffmpeg."""
+    configurar_ffmpeg()
+
+def generar_wav(duracion: float = 1.0, frecuencia_muestreo: int = 44100, canales: int = 2) -> bytes:
+    """Genera un tono sinusoidal como archivo WAV en memoria."""
+    t = np.arange(int(duracion * frecuencia_muestreo)) / frecuencia_muestreo
+    tono = (np.sin(2 * np.pi * 440 * t) * 10000).astype(np.int16)
+    muestras = np.repeat(tono[:, None], canales, axis=1)
+    
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as archivo_wav:
+        archivo_wav.setnchannels(canales)
+        archivo_wav.setsampwidth(2)
+        archivo_wav.setframerate(frecuencia_muestreo)
+        archivo_wav.writeframes(muestras.tobytes())
+    return buffer.getvalue()
+
+def test_decodificar_audio_en_memoria():
+    """La decodificación devuelve PCM 16 kHz mono sin pasar por disco."""
+    pcm = decodificar_audio_en_memoria(generar_wav(duracion=1.0))
+    
+    # 1 segundo a 16 kHz, 16 bits, mono
+    assert abs(len(pcm) - 16000 * 2) <= 64
+    
+    audio = crear_audio_data(pcm)
+    assert audio.sample_rate == 16000
+    assert audio.sample_width == 2
+
+def test_decodificar_audio_invalido():
+    """Un contenido que no es audio produce un error de formato."""
+    with pytest.raises(ErrorFormatoAudio):
+        decodificar_audio_en_memoria(b"esto no es audio")
+
+def test_sondear_wav_objetivo_sin_conversion(monkeypatch):
+    """Un WAV PCM 16 kHz mono se usa tal cual, sin lanzar ffmpeg."""
+    contenido = generar_wav(duracion=0.5, frecuencia_muestreo=16000, canales=1)
+    formato = sondear_formato(contenido)
+    assert formato.contenedor == "wav"
+    assert formato.estrategia == ESTRATEGIA_DIRECTA
+    
+    def no_ejecutar(*args, **kwargs):
+        raise AssertionError("No se debe lanzar ningún subproceso")
+    monkeypatch.setattr("src.utils.audio_utils.subprocess.run", no_ejecutar)
+    
+    pcm = decodificar_audio(contenido, formato)
+    assert len(pcm) == 8000 * 2
+    assert pcm == contenido[-len(pcm):]
+
+def test_sondear_wav_a_convertir(monkeypatch):
+    """Un WAV PCM con otra frecuencia o canales se remuestrea con NumPy, sin lanzar ffmpeg."""
+    contenido = generar_wav(duracion=1.0, frecuencia_muestreo=44100, canales=2)
+    formato = sondear_formato(contenido)
+    assert formato.estrategia == ESTRATEGIA_REMUESTREO
+    assert (formato.frecuencia_muestreo, formato.canales) == (44100, 2)
+    
+    def no_ejecutar(*args, **kwargs):
+        raise AssertionError("No se debe lanzar ningún subproceso")
+    monkeypatch.setattr("src.utils.audio_utils.subprocess.run", no_ejecutar)
+    
+    pcm = decodificar_audio(contenido, formato)
+    assert len(pcm) == 16000 * 2
+
+def test_decodificar_al_formato_del_motor():
+    """La salida se ajusta al formato nativo que declara el motor."""
+    contenido = generar_wav(duracion=1.0, frecuencia_muestreo=16000, canales=1)
+    destino = FormatoPCM(8000, 1, 2)
+    formato = sondear_formato(contenido, destino)
+    assert formato.estrategia == ESTRATEGIA_REMUESTREO
+    assert len(decodificar_audio(contenido, formato, destino)) == 8000 * 2
+    
+    # Un WAV en coma flotante no se puede recortar: se decodifica con ffmpeg
+    flotante = bytearray(contenido)
+    flotante[20:22] = (3).to_bytes(2, "little")
+    assert sondear_formato(bytes(flotante)).estrategia == ESTRATEGIA_TUBERIA
+
+@pytest.mark.parametrize("cabecera, contenedor, estrategia", [
+    (b"OggS\x00\x02" + b"\x00" * 10, "ogg", ESTRATEGIA_TUBERIA),
+    (b"fLaC" + b"\x00" * 12, "flac", ESTRATEGIA_TUBERIA),
+    (b"\x1aE\xdf\xa3" + b"\x00" * 12, "webm", ESTRATEGIA_TUBERIA),
+    (b"ID3\x04" + b"\x00" * 12, "mp3", ESTRATEGIA_TUBERIA),
+    (b"\xff\xfb\x90\x00" + b"\x00" * 12, "mp3", ESTRATEGIA_TUBERIA),
+    (b"\xff\xf1\x50\x80" + b"\x00" * 12, "aac", ESTRATEGIA_TUBERIA),
+    # MP4 con el índice al final: requiere acceso aleatorio
+    (b"\x00\x00\x00\x10ftypM4A \x00\x00\x00\x00" + b"\x00\x00\x00\x08mdat" + b"\x00\x00\x00\x08moov",
+     "mp4", ESTRATEGIA_DISCO),
+    # MP4 con el índice al principio (faststart): se puede leer por tubería
+    (b"\x00\x00\x00\x10ftypM4A \x00\x00\x00\x00" + b"\x00\x00\x00\x08moov" + b"\x00\x00\x00\x08mdat",
+     "mp4", ESTRATEGIA_TUBERIA),
+    (b"esto no es audio", "desconocido", ESTRATEGIA_TUBERIA),
+])
+def test_sondear_formato_por_bytes_magicos(cabecera, contenedor, estrategia):
+    """El contenedor y la estrategia se deducen de los primeros bytes."""
+    formato = sondear_formato(cabecera)
+    assert formato.contenedor == contenedor
+    assert formato.estrategia == estrategia
+
+def crear_upload(contenido: bytes, nombre: str, tipo: str) -> UploadFile:
+    """Crea un archivo subido en memoria."""
+    return UploadFile(
+        io.BytesIO(contenido), filename=nombre, headers=Headers({"content-type": tipo})
+    )
+
+def test_validar_archivo_por_bytes_magicos():
+    """Un WAV sin extensión ni tipo MIME de audio se acepta por su cabecera."""
+    archivo = crear_upload(generar_wav(0.1), "grabacion", "application/octet-stream")
+    validar_archivo_audio(archivo)
+    # La validación no consume el archivo
+    assert archivo.file.tell() == 0
+
+def test_validar_archivo_rechaza_contenido_que_no_es_audio():
+    """Un archivo con extensión de audio pero sin cabecera de audio se rechaza sin decodificarlo."""
+    with pytest.raises(ErrorFormatoAudio):
+        validar_archivo_audio(crear_upload(b"<html></html>", "audio.wav", "audio/wav"))
+    with pytest.raises(ErrorFormatoAudio):
+        validar_archivo_audio(crear_upload(b"texto plano", "notas.txt", "text/plain"))
+
+def test_validar_archivo_tamano_sin_leer(monkeypatch):
+    """El tamaño se comprueba aunque la subida no lo informe."""
+    from src.utils import audio_utils
+    monkeypatch.setattr(audio_utils.configuracion, "tamano_max_archivo", 1)
+    archivo = crear_upload(generar_wav(10.0), "largo.wav", "audio/wav")
+    archivo.size = None
+    with pytest.raises(ErrorTamanoArchivo):
+        validar_archivo_audio(archivo)
@@ -0,0 +1,116 @@
+"""
+Pruebas unitarias para la caché de transcripciones.
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+
+import speech_recognition as sr
+
+from src.services.cache_transcripcion import CacheTranscripcion
+
+def _audio(contenido: bytes = b"\x01\x00" * 1600) -> sr.AudioData:
+    return sr.AudioData(contenido, 16000, 2)
+
+def test_clave_depende_de_audio_motor_y_opciones():
+    """La clave cambia con el PCM, el motor o las opciones, pero no con el orden de las opciones."""
+    base = CacheTranscripcion.calcular_clave(_audio(), "local", {"idioma": "es-ES", "modelo": "x"})
+    assert base == CacheTranscripcion.calcular_clave(_audio(), "local", {"modelo": "x", "idioma": "es-ES"})
+    assert base != CacheTranscripcion.calcular_clave(_audio(b"\x02\x00" * 1600), "local", {"idioma": "es-ES", "modelo": "x"})
+    assert base != CacheTranscripcion.calcular_clave(_audio(), "google", {"idioma": "es-ES", "modelo": "x"})
+    assert base != CacheTranscripcion.calcular_clave(_audio(), "local", {"idioma": "en-US", "modelo": "x"})
+
+def test_lru_expulsa_la_menos_usada():
+    """Al superar la capacidad se expulsa la entrada usada hace más tiempo."""
+    cache = CacheTranscripcion(capacidad=2, ttl=60)
+    cache.guardar("a", "uno")
+    cache.guardar("b", "dos")
+    assert cache.obtener("a").texto == "uno"
+    cache.guardar("c", "tres")
+
+    assert cache.obtener("b") is None
+    assert cache.obtener("a").texto == "uno"
+    assert cache.obtener("c").texto == "tres"
+    metricas = cache.obtener_metricas()
+    assert metricas["expulsiones"] == 1
+    assert metricas["aciertos_memoria"] == 3
+    assert metricas["fallos"] == 1
+
+def test_entradas_expiradas():
+    """Las entradas dejan de devolverse al expirar su TTL."""
+    cache = CacheTranscripcion(capacidad=10, ttl=0.05)
+    cache.guardar("a", "uno")
+    time.sleep(0.1)
+    assert cache.obtener("a") is None
+
+def test_cache_desactivada():
+    """Con capacidad 0 la caché no guarda nada."""
+    cache = CacheTranscripcion(capacidad=0, ttl=60)
+    cache.guardar("a", "uno")
+    assert cache.obtener("a") is None
+
+def test_nivel_disco_sobrevive_a_reinicio(tmp_path):
+    """Las entradas guardadas en disco se recuperan desde una nueva instancia."""
+    ruta = str(tmp_path / "cache.db")
+    cache = CacheTranscripcion(capacidad=10, ttl=60, ruta_disco=ruta)
+    cache.guardar("a", "uno", 0.75)
+    cache.cerrar()
+
+    reiniciada = CacheTranscripcion(capacidad=10, ttl=60, ruta_disco=ruta)
+    assert reiniciada.obtener("a") == ("uno", 0.75)
+    assert reiniciada.obtener_metricas()["aciertos_disco"] == 1
+    # La segunda lectura ya se sirve desde memoria
+    assert reiniciada.obtener("a") == ("uno", 0.75)
+    assert reiniciada.obtener_metricas()["aciertos_memoria"] == 1
+    reiniciada.cerrar()
+
+def test_nivel_disco_anade_columna_confianza(tmp_path):
+    """Una base creada sin la columna de confianza se actualiza al abrirla."""
+    ruta = str(tmp_path / "cache.db")
+    conexion = sqlite3.connect(ruta)
+    conexion.execute(
+        "CREATE TABLE transcripciones ("
+        "clave TEXT PRIMARY KEY, texto TEXT NOT NULL, expira REAL NOT NULL, acceso REAL NOT NULL)"
+    )
+    conexion.execute("INSERT INTO transcripciones VALUES ('a', 'uno', ?, 0)", (time.time() + 60,))
+    conexion.commit()
+    conexion.close()
+
+    cache = CacheTranscripcion(capacidad=10, ttl=60, ruta_disco=ruta)
+    assert cache.obtener("a") == ("uno", None)
+    cache.guardar("b", "dos", 0.5)
+    assert cache.obtener("b") == ("dos", 0.5)
+    cache.cerrar()
+
+def test_cache_fuera_del_bucle_de_eventos(monkeypatch):
+    """El hash del PCM y el acceso a la caché no se ejecutan en el hilo del bucle de eventos."""
+    from src.services import pipeline_transcripcion, servicio_transcripcion
+    from src.services.motores_transcripcion import MotorTranscripcionBase
+    from .test_audio_utils import generar_wav
+
+    class MotorFijo(MotorTranscripcionBase):
+        def transcribir(self, audio, opciones=None):
+            return "hola"
+
+    cache = CacheTranscripcion(capacidad=10, ttl=60)
+    hilos = []
+    for metodo in ("obtener", "guardar"):
+        original = getattr(cache, metodo)
+        def registrar(*args, _original=original):
+            hilos.append(threading.current_thread())
+            return _original(*args)
+        monkeypatch.setattr(cache, metodo, registrar)
+    monkeypatch.setattr(pipeline_transcripcion, "cache_transcripciones", cache)
+    monkeypatch.setattr(servicio_transcripcion, "motor", MotorFijo())
+
+    async def transcribir_dos_veces():
+        principal = threading.current_thread()
+        primero = await pipeline_transcripcion.transcribir_contenido(generar_wav(0.5))
+        segundo = await pipeline_transcripcion.transcribir_contenido(generar_wav(0.5))
+        return principal, primero, segundo
+
+    principal, primero, segundo = asyncio.run(transcribir_dos_veces())
+    assert primero.texto == segundo.texto == "hola"
+    assert cache.obtener_metricas()["aciertos_memoria"] == 1
+    assert len(hilos) == 3 and principal not in hilos
@@ -0,0 +1,59 @@
+"""
+Pruebas para el ejecutor acotado de trabajos.
+"""
+import asyncio
+import threading
+import pytest
+
+from src.services.ejecutor import EjecutorTrabajos
+from src.utils import ErrorColaLlena, ErrorTiempoEsperaCola
+
+def test_ejecutar_en_hilo_registra_metricas():
+    """Las tareas completadas actualizan las métricas del pool."""
+    ejecutor = EjecutorTrabajos(hilos=2, procesos=0, cola_max=2, tiempo_max_cola=5)
+    
+    resultado = asyncio.run(ejecutor.ejecutar_en_hilo(sum, [1, 2, 3]))
+    
+    assert resultado == 6
+    metricas = ejecutor.obtener_metricas()["hilos"]
+    assert metricas["completadas"] == 1
+    assert metricas["en_curso"] == 0
+    ejecutor.cerrar()
+
+def test_cola_llena_rechaza_solicitudes():
+    """Cuando la cola está llena las nuevas tareas se rechazan de inmediato."""
+    ejecutor = EjecutorTrabajos(hilos=1, procesos=0, cola_max=0, tiempo_max_cola=5)
+    liberar = threading.Event()
+    
+    async def escenario():
+        ocupada = asyncio.ensure_future(ejecutor.ejecutar_en_hilo(liberar.wait, 5))
+        await asyncio.sleep(0.05)
+        try:
+            with pytest.raises(ErrorColaLlena):
+                await ejecutor.ejecutar_en_hilo(sum, [1])
+        finally:
+            liberar.set()
+            await ocupada
+    
+    asyncio.run(escenario())
+    assert ejecutor.obtener_metricas()["hilos"]["rechazadas"] == 1
+    ejecutor.cerrar()
+
+def test_tiempo_maximo_en_cola():
+    """Una tarea que no empieza dentro del tiempo máximo de cola se abandona."""
+    ejecutor = EjecutorTrabajos(hilos=1, procesos=0, cola_max=1, tiempo_max_cola=0.1)
+    liberar = threading.Event()
+    
+    async def escenario():
+        ocupada = asyncio.ensure_future(ejecutor.ejecutar_en_hilo(liberar.wait, 5))
+        await asyncio.sleep(0.05)
+        try:
+            with pytest.raises(ErrorTiempoEsperaCola):
+                await ejecutor.ejecutar_en_hilo(sum, [1])
+        finally:
+            liberar.set()
+            await ocupada
+    
+    asyncio.run(escenario())
+    assert ejecutor.obtener_metricas()["hilos"]["expiradas"] == 1
+    ejecutor.cerrar()
@@ -0,0 +1,108 @@
+"""
+Pruebas para el enrutamiento entre varios motores de transcripción.
+"""
+import time
+import pytest
+import speech_recognition as sr
+
+from src.services import EnrutadorMotores
+from src.services.motores_transcripcion import MotorTranscripcionBase
+from src.utils import ErrorAudioSinVoz, ErrorTranscripcion
+
+class MotorPrueba(MotorTranscripcionBase):
+    """Motor que responde su nombre tras una espera, o falla."""
+    def __init__(self, nombre: str, espera: float = 0.0, error: Exception = None):
+        self.nombre = nombre
+        self.espera = espera
+        self.error = error
+        self.llamadas = 0
+
+    def transcribir(self, audio, opciones=None):
+        self.llamadas += 1
+        time.sleep(self.espera)
+        if self.error:
+            raise self.error
+        return self.nombre
+
+@pytest.fixture
+def audio():
+    """Audio de prueba vacío (los motores de prueba no lo leen)."""
+    return sr.AudioData(b"\0\0" * 160, 16000, 2)
+
+def test_elige_el_motor_mas_rapido(audio):
+    """Tras medir ambos motores, las solicitudes van al de menor latencia."""
+    lento = MotorPrueba("lento", espera=0.05)
+    rapido = MotorPrueba("rapido")
+    enrutador = EnrutadorMotores({"lento": lento, "rapido": rapido})
+
+    # Los motores sin latencias medidas se prueban primero
+    assert enrutador.transcribir(audio) == "lento"
+    assert enrutador.transcribir(audio) == "rapido"
+    for _ in range(5):
+        assert enrutador.transcribir(audio) == "rapido"
+    assert enrutador.ordenar() == ["rapido", "lento"]
+    assert lento.llamadas == 1
+    enrutador.cerrar()
+
+def test_recurre_al_siguiente_motor_si_falla(audio):
+    """Un fallo se reintenta con otro motor y los fallos seguidos apartan al motor."""
+    roto = MotorPrueba("roto", error=ErrorTranscripcion("caído"))
+    sano = MotorPrueba("sano", espera=0.01)
+    enrutador = EnrutadorMotores({"roto": roto, "sano": sano}, errores_max=2, enfriamiento=60)
+
+    for _ in range(4):
+        assert enrutador.transcribir(audio) == "sano"
+    # Apartado tras dos fallos seguidos aunque no tenga latencias medidas
+    assert roto.llamadas == 2
+    assert enrutador.obtener_metricas()["motores"]["roto"]["saludable"] is False
+    enrutador.cerrar()
+
+def test_sin_voz_no_se_reintenta(audio):
+    """No reconocer voz es una respuesta válida y no se prueba con otro motor."""
+    sin_voz = MotorPrueba("sin_voz", error=ErrorAudioSinVoz("sin voz"))
+    otro = MotorPrueba("otro")
+    enrutador = EnrutadorMotores({"sin_voz": sin_voz, "otro": otro})
+
+    with pytest.raises(ErrorAudioSinVoz):
+        enrutador.transcribir(audio)
+    assert otro.llamadas == 0
+    enrutador.cerrar()
+
+def test_todos_los_motores_fallan(audio):
+    """Si fallan todos los motores se propaga el último error."""
+    enrutador = EnrutadorMotores({
+        "a": MotorPrueba("a", error=ErrorTranscripcion("a caído")),
+        "b": MotorPrueba("b", error=RuntimeError("b caído")),
+    })
+    with pytest.raises(ErrorTranscripcion):
+        enrutador.transcribir(audio)
+    enrutador.cerrar()
+
+def test_cobertura_tras_el_percentil(audio):
+    """Si el motor elegido tarda más que su percentil, responde el segundo motor."""
+    principal = MotorPrueba("principal", espera=0.01)
+    respaldo = MotorPrueba("respaldo", espera=0.02)
+    enrutador = EnrutadorMotores({"principal": principal, "respaldo": respaldo}, cobertura=True)
+
+    # Medir ambos motores
+    enrutador.transcribir(audio)
+    enrutador.transcribir(audio)
+    assert enrutador.ordenar()[0] == "principal"
+
+    # El principal se vuelve lento: la cobertura responde mucho antes
+    principal.espera = 1.0
+    inicio = time.monotonic()
+    assert enrutador.transcribir(audio) == "respaldo"
+    assert time.monotonic() - inicio < 0.5
+    assert enrutador.obtener_metricas()["motores"]["respaldo"]["coberturas"] == 1
+    enrutador.cerrar()
+
+def test_nombre_motores_incluye_todos_los_enrutables(monkeypatch):
+    """La caché se identifica con todos los motores que pueden responder, no solo el principal."""
+    from src.services import servicio_transcripcion
+
+    enrutador = EnrutadorMotores({"whisper": MotorPrueba("whisper"), "local": MotorPrueba("local")})
+    assert servicio_transcripcion.nombre_motores == servicio_transcripcion.configuracion.motor_transcripcion
+    monkeypatch.setattr(servicio_transcripcion, "enrutador", enrutador)
+    assert servicio_transcripcion.nombre_motores == "local,whisper"
+    enrutador.cerrar()
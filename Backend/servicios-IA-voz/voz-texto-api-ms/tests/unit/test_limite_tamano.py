@@ -0,0 +1,59 @@
+"""
+Pruebas para el límite de tamaño de las subidas.
+"""
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from src.api.limite_tamano import LimiteTamanoCuerpo, MARGEN_MULTIPART
+
+def crear_app(limite: int) -> FastAPI:
+    """Aplicación mínima con una ruta de subida limitada."""
+    app = FastAPI()
+
+    @app.post("/subir")
+    async def subir(archivo: UploadFile = File(...)):
+        return {"tamano": len(await archivo.read())}
+
+    app.add_middleware(LimiteTamanoCuerpo, limites={"/subir": limite})
+    return app
+
+def test_subida_dentro_del_limite():
+    """Las subidas que no superan el límite llegan a la ruta."""
+    cliente = TestClient(crear_app(1024))
+    respuesta = cliente.post("/subir", files={"archivo": ("a.wav", b"x" * 1000, "audio/wav")})
+    assert respuesta.status_code == 200
+    assert respuesta.json() == {"tamano": 1000}
+
+def test_content_length_excedido():
+    """Una cabecera Content-Length demasiado grande se rechaza antes de leer el cuerpo."""
+    cliente = TestClient(crear_app(1024))
+    respuesta = cliente.post(
+        "/subir", files={"archivo": ("a.wav", b"x" * (MARGEN_MULTIPART + 2048), "audio/wav")}
+    )
+    assert respuesta.status_code == 413
+
+def test_cuerpo_sin_content_length_excedido():
+    """Sin Content-Length, la subida se corta al superar el límite mientras se recibe."""
+    cliente = TestClient(crear_app(1024))
+
+    def trozos():
+        for _ in range(100):
+            yield b"x" * 4096
+
+    respuesta = cliente.post("/subir", content=trozos(), headers={"content-type": "multipart/form-data; boundary=x"})
+    assert respuesta.status_code == 413
+
+def test_rechazo_lleva_cabeceras_cors():
+    """El 413 de la aplicación pasa por CORS para que el navegador pueda leerlo."""
+    from src.api.app import app
+    from src.config import configuracion
+
+    cliente = TestClient(app)
+    tamano = configuracion.tamano_max_archivo * 1024 * 1024 + MARGEN_MULTIPART + 1
+    respuesta = cliente.post(
+        "/api/v1/transcribir",
+        files={"archivo": ("a.wav", b"x" * tamano, "audio/wav")},
+        headers={"Origin": "http://ejemplo.com"},
+    )
+    assert respuesta.status_code == 413
+    assert "access-control-allow-origin" in respuesta.headers
@@ -0,0 +1,67 @@
+"""
+Pruebas para las métricas de latencia por etapa.
+"""
+import pytest
+
+from src.services import servicio_transcripcion, cache_transcripciones
+from src.services.motores_transcripcion import MotorTranscripcionBase, ResultadoMotor
+from src.utils.metricas import Histograma
+
+from .test_audio_utils import generar_wav
+
+class MotorFijo(MotorTranscripcionBase):
+    """Motor de prueba sin red."""
+    def transcribir(self, audio, opciones=None):
+        return "hola"
+
+    def transcribir_detallado(self, audio, opciones=None):
+        return ResultadoMotor("hola", 0.87)
+
+def test_histograma_acumulativo():
+    """Los intervalos son acumulativos y +Inf cuenta todas las observaciones."""
+    histograma = Histograma("prueba_segundos", "Prueba", "etapa", (0.1, 1.0))
+    for valor in (0.05, 0.5, 0.5, 3.0):
+        histograma.observar(valor, "motor")
+
+    lineas = histograma.exponer().splitlines()
+    assert '# TYPE prueba_segundos histogram' in lineas
+    assert 'prueba_segundos_bucket{etapa="motor",le="0.1"} 1' in lineas
+    assert 'prueba_segundos_bucket{etapa="motor",le="1.0"} 3' in lineas
+    assert 'prueba_segundos_bucket{etapa="motor",le="+Inf"} 4' in lineas
+    assert 'prueba_segundos_count{etapa="motor"} 4' in lineas
+    assert 'prueba_segundos_sum{etapa="motor"} 4.05' in lineas
+
+def test_server_timing_y_metrics(cliente_prueba, monkeypatch):
+    """La transcripción devuelve sus etapas en Server-Timing y quedan en /metrics."""
+    monkeypatch.setattr(servicio_transcripcion, "motor", MotorFijo())
+    monkeypatch.setattr(cache_transcripciones, "capacidad", 0)
+    respuesta = cliente_prueba.post(
+        "/api/v1/transcribir", files={"archivo": ("a.wav", generar_wav(1.0), "audio/wav")}
+    )
+    assert respuesta.status_code == 200
+
+    etapas = dict(
+        parte.strip().split(";dur=") for parte in respuesta.headers["Server-Timing"].split(",")
+    )
+    assert {"lectura", "decodificacion", "motor", "total"} <= set(etapas)
+    assert float(etapas["total"]) >= float(etapas["decodificacion"])
+
+    metricas = cliente_prueba.get("/metrics")
+    assert metricas.headers["content-type"].startswith("text/plain")
+    assert 'voz_texto_etapa_segundos_count{etapa="motor"}' in metricas.text
+    assert "voz_texto_duracion_audio_segundos_count" in metricas.text
+
+def test_respuesta_incluye_duracion_confianza_y_factor(cliente_prueba, monkeypatch):
+    """La duración sale del PCM decodificado, la confianza del motor y el RTF del tiempo total."""
+    monkeypatch.setattr(servicio_transcripcion, "motor", MotorFijo())
+    monkeypatch.setattr(cache_transcripciones, "capacidad", 0)
+    respuesta = cliente_prueba.post(
+        "/api/v1/transcribir", files={"archivo": ("a.wav", generar_wav(2.0), "audio/wav")}
+    )
+    assert respuesta.status_code == 200
+
+    datos = respuesta.json()
+    assert datos["duracion"] == pytest.approx(2.0, abs=0.01)
+    assert datos["confianza"] == 0.87
+    assert 0 < datos["factor_tiempo_real"] < 1
+    assert "voz_texto_factor_tiempo_real_count" in cliente_prueba.get("/metrics").text
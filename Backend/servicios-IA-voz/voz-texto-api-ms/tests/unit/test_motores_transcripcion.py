@@ -0,0 +1,128 @@
+"""
+Pruebas para los motores de transcripción.
+"""
+import base64
+import json
+import math
+import sys
+import types
+
+import httpx
+import numpy as np
+import pytest
+import speech_recognition as sr
+
+from src.services.motores_transcripcion import (
+    MotorTranscripcionGoogle,
+    MotorTranscripcionLocal,
+    MotorTranscripcionWhisper
+)
+from src.utils import ErrorTranscripcion, ErrorAudioSinVoz
+
+@pytest.fixture
+def motor_google():
+    """Motor de Google con el transporte HTTP simulado."""
+    motor = MotorTranscripcionGoogle("clave-de-prueba")
+    yield motor
+    motor.cerrar()
+
+def _simular(motor, manejador):
+    motor.cliente = httpx.Client(
+        transport=httpx.MockTransport(manejador),
+        headers={"X-Goog-Api-Key": motor.api_clave}
+    )
+
+def test_google_envia_audio_en_base64_por_bloques(motor_google):
+    """El cuerpo generado por bloques es un JSON válido con el PCM completo en base64."""
+    pcm = bytes(range(256)) * 3000  # No múltiplo del tamaño de bloque
+    recibidas = []
+    
+    def manejador(solicitud: httpx.Request) -> httpx.Response:
+        recibidas.append(solicitud)
+        return httpx.Response(200, json={"results": [{"alternatives": [{"transcript": "hola"}]}]})
+    
+    _simular(motor_google, manejador)
+    texto = motor_google.transcribir(sr.AudioData(pcm, 8000, 2), {"idioma": "es-MX"})
+    
+    assert texto == "hola"
+    solicitud = recibidas[0]
+    assert solicitud.headers["X-Goog-Api-Key"] == "clave-de-prueba"
+    cuerpo = json.loads(solicitud.read())
+    assert cuerpo["config"]["sampleRateHertz"] == 8000
+    assert cuerpo["config"]["languageCode"] == "es-MX"
+    assert base64.b64decode(cuerpo["audio"]["content"]) == pcm
+
+def test_google_confianza_media(motor_google):
+    """La confianza es la media de la mejor alternativa de cada resultado."""
+    def manejador(solicitud: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"results": [
+            {"alternatives": [{"transcript": "hola ", "confidence": 0.9}]},
+            {"alternatives": [{"transcript": "mundo", "confidence": 0.7}]},
+        ]})
+    
+    _simular(motor_google, manejador)
+    resultado = motor_google.transcribir_detallado(sr.AudioData(b"\x00\x00" * 160, 16000, 2))
+    assert resultado.texto == "hola mundo"
+    assert resultado.confianza == pytest.approx(0.8)
+
+def test_local_confianza_de_show_all(monkeypatch):
+    """El motor local pide la respuesta completa y toma la confianza de la mejor alternativa."""
+    motor = MotorTranscripcionLocal()
+    respuestas = [
+        {"alternative": [{"transcript": "hola", "confidence": 0.92}, {"transcript": "ola"}], "final": True},
+        [],
+    ]
+    monkeypatch.setattr(motor.recognizer, "recognize_google", lambda *args, **kwargs: respuestas.pop(0))
+    audio = sr.AudioData(b"\x00\x00" * 160, 16000, 2)
+    
+    assert motor.transcribir_detallado(audio) == ("hola", 0.92)
+    # Las versiones antiguas de SpeechRecognition devuelven una lista vacía si no hay voz
+    with pytest.raises(ErrorAudioSinVoz):
+        motor.transcribir_detallado(audio)
+
+def test_google_error_de_red(motor_google):
+    """Los errores de conexión se notifican como errores de transcripción."""
+    def manejador(solicitud: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("sin conexión", request=solicitud)
+    
+    _simular(motor_google, manejador)
+    with pytest.raises(ErrorTranscripcion):
+        motor_google.transcribir(sr.AudioData(b"\x00\x00" * 160, 16000, 2))
+
+def test_whisper_transcribe_lote_con_un_fragmento_por_audio(monkeypatch):
+    """Los audios del lote se concatenan y cada segmento vuelve a su solicitud."""
+    llamadas = []
+    
+    class Segmento:
+        def __init__(self, inicio, fin, texto):
+            self.start, self.end, self.text = inicio, fin, texto
+            self.avg_logprob = math.log(0.8)
+    
+    class Canalizacion:
+        def __init__(self, model):
+            pass
+        
+        def transcribe(self, audio, language, clip_timestamps, batch_size, without_timestamps):
+            llamadas.append((len(audio), language, clip_timestamps, batch_size))
+            return [Segmento(f["start"], f["end"], f" texto{i} ") for i, f in enumerate(clip_timestamps)], None
+    
+    modulo = types.ModuleType("faster_whisper")
+    modulo.WhisperModel = lambda *args, **kwargs: object()
+    modulo.BatchedInferencePipeline = Canalizacion
+    monkeypatch.setitem(sys.modules, "faster_whisper", modulo)
+    
+    motor = MotorTranscripcionWhisper()
+    try:
+        segundo = np.zeros(16000, dtype=np.float32)
+        resultados = motor._transcribir_lote("es", [segundo, np.concatenate([segundo] * 45)])
+    finally:
+        motor.cerrar()
+    
+    # El segundo audio (45 s) se divide en dos fragmentos de hasta 30 s
+    assert [r.texto for r in resultados] == ["texto0", "texto1 texto2"]
+    assert all(r.confianza == pytest.approx(0.8) for r in resultados)
+    longitud, idioma, fragmentos, tamano_lote = llamadas[0]
+    assert longitud == 46 * 16000
+    assert idioma == "es"
+    assert tamano_lote == 3
+    assert fragmentos[1] == {"start": 1.0, "end": 31.0}
@@ -0,0 +1,41 @@
+"""
+Pruebas para el gestor de recursos temporales.
+"""
+import os
+import time
+
+from src.utils import GestorRecursosTemporales
+
+def esperar_eliminacion(ruta: str, tiempo_maximo: float = 5.0) -> bool:
+    """Espera a que el recolector elimine una ruta."""
+    limite = time.monotonic() + tiempo_maximo
+    while time.monotonic() < limite:
+        if not os.path.exists(ruta):
+            return True
+        time.sleep(0.05)
+    return False
+
+def test_directorio_trabajo_se_elimina_en_segundo_plano(tmp_path):
+    """El directorio de trabajo y su contenido se eliminan al salir del contexto."""
+    gestor = GestorRecursosTemporales(str(tmp_path), intervalo_reintento=0.05)
+    
+    with gestor.directorio_trabajo() as directorio:
+        with open(os.path.join(directorio, "audio.wav"), "wb") as archivo:
+            archivo.write(b"datos")
+        assert os.path.isdir(directorio)
+    
+    assert esperar_eliminacion(directorio)
+    gestor.detener()
+
+def test_purgar_antiguos(tmp_path):
+    """Los restos de ejecuciones anteriores se purgan al iniciar el recolector."""
+    abandonado = tmp_path / "solicitud_abandonada"
+    abandonado.mkdir()
+    antiguo = time.time() - 7200
+    os.utime(abandonado, (antiguo, antiguo))
+    
+    gestor = GestorRecursosTemporales(str(tmp_path), intervalo_reintento=0.05, antiguedad_maxima=3600)
+    gestor.iniciar()
+    
+    assert esperar_eliminacion(str(abandonado))
+    gestor.detener()
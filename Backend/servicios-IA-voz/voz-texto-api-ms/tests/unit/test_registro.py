@@ -0,0 +1,31 @@
+"""
+Pruebas para el registro estructurado.
+"""
+import json
+import logging
+
+from src.utils.registro import FiltroContexto, FormateadorJSON, id_solicitud
+
+def test_formateador_json_incluye_id_y_campos_adicionales():
+    """Cada registro es una línea JSON con el id de la solicitud y los campos de extra."""
+    registro = logging.makeLogRecord({
+        "name": "prueba", "levelname": "INFO", "msg": "Transcripción de %d caracteres",
+        "args": (12,), "audio_recortado_ms": 300,
+    })
+    token = id_solicitud.set("abc123")
+    try:
+        FiltroContexto().filter(registro)
+    finally:
+        id_solicitud.reset(token)
+
+    datos = json.loads(FormateadorJSON().format(registro))
+    assert datos["mensaje"] == "Transcripción de 12 caracteres"
+    assert datos["id_solicitud"] == "abc123"
+    assert datos["audio_recortado_ms"] == 300
+    assert datos["nivel"] == "INFO"
+
+def test_id_solicitud_en_la_respuesta(cliente_prueba):
+    """La respuesta devuelve el X-Request-ID recibido o uno generado."""
+    respuesta = cliente_prueba.get("/salud", headers={"X-Request-ID": "mi-id"})
+    assert respuesta.headers["X-Request-ID"] == "mi-id"
+    assert cliente_prueba.get("/salud").headers["X-Request-ID"]
@@ -0,0 +1,46 @@
+"""
+Pruebas para el remuestreo polifásico de PCM.
+"""
+import numpy as np
+import pytest
+
+from src.utils import remuestrear_pcm
+
+def _tono(frecuencia_muestreo: int, duracion: float = 1.0, hz: float = 440.0) -> np.ndarray:
+    t = np.arange(int(frecuencia_muestreo * duracion)) / frecuencia_muestreo
+    return np.sin(2 * np.pi * hz * t) * 10000
+
+@pytest.mark.parametrize("origen", [8000, 22050, 44100, 48000])
+def test_remuestrear_conserva_el_tono(origen):
+    """El tono remuestreado a 16 kHz coincide con el mismo tono generado a 16 kHz."""
+    pcm = _tono(origen).astype("<i2").tobytes()
+    salida = np.frombuffer(remuestrear_pcm(pcm, origen, 16000), dtype="<i2")
+    
+    assert len(salida) == 16000
+    referencia = _tono(16000)
+    # Se ignoran los bordes, donde el filtro ve ceros
+    assert np.abs(salida[200:-200] - referencia[200:-200]).max() < 20
+
+def test_remuestrear_elimina_frecuencias_sobre_nyquist():
+    """Al reducir la frecuencia, los tonos por encima del nuevo Nyquist se filtran."""
+    pcm = _tono(48000, hz=12000).astype("<i2").tobytes()
+    salida = np.frombuffer(remuestrear_pcm(pcm, 48000, 16000), dtype="<i2")
+    assert np.abs(salida[200:-200]).max() < 100
+
+def test_mezcla_canales_y_convierte_ancho():
+    """El PCM estéreo de 8, 24 o 32 bits se convierte a mono de 16 bits."""
+    tono = _tono(16000)
+    estereo = np.stack([tono, tono], axis=1)
+    
+    pcm_32 = (estereo * 65536).astype("<i4").tobytes()
+    salida = np.frombuffer(remuestrear_pcm(pcm_32, 16000, 16000, canales=2, ancho_muestra=4), dtype="<i2")
+    assert np.abs(salida - tono).max() <= 1
+    
+    valores_24 = (estereo * 256).astype("<i4").reshape(-1)
+    pcm_24 = b"".join(int(v).to_bytes(4, "little", signed=True)[:3] for v in valores_24)
+    salida = np.frombuffer(remuestrear_pcm(pcm_24, 16000, 16000, canales=2, ancho_muestra=3), dtype="<i2")
+    assert np.abs(salida - tono).max() <= 1
+    
+    pcm_8 = (estereo / 256 + 128).astype(np.uint8).tobytes()
+    salida = np.frombuffer(remuestrear_pcm(pcm_8, 16000, 16000, canales=2, ancho_muestra=1), dtype="<i2")
+    assert np.abs(salida - tono).max() <= 256
@@ -15,3 +15,15 @@ def test_endpoint_salud(cliente_prueba):
     assert "motor_transcripcion" in datos
     
     assert datos["estado"] == "en línea"
+
+def test_endpoint_metricas(cliente_prueba):
+    """Prueba el endpoint de métricas internas."""
+    respuesta = cliente_prueba.get("/salud/metricas")
+    
+    assert respuesta.status_code == 200
+    datos = respuesta.json()
+    
+    assert "ejecutor" in datos
+    assert "hilos" in datos["ejecutor"]
+    assert "procesos" in datos["ejecutor"]
+    assert "recorte_silencios" in datos
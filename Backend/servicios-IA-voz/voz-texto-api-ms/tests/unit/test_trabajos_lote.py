@@ -0,0 +1,172 @@
+"""
+Pruebas para la transcripción por lotes.
+"""
+import io
+import json
+import os
+import time
+import zipfile
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.app import app
+from src.services import servicio_transcripcion, cache_transcripciones, trabajos_lote
+from src.services.motores_transcripcion import MotorTranscripcionBase
+from src.services.trabajos_lote import GestorLotes, extraer_zip
+from src.utils import ErrorColaLlena, ErrorFormatoAudio, GestorRecursosTemporales
+
+from .test_audio_utils import generar_wav
+
+class MotorDuracion(MotorTranscripcionBase):
+    """Motor de prueba que devuelve la duración del audio recibido."""
+    def transcribir(self, audio, opciones=None):
+        return f"{len(audio.frame_data) / (2 * audio.sample_rate):.1f}s"
+
+@pytest.fixture
+def cliente_lotes(monkeypatch):
+    """Cliente con el ciclo de vida activo para que los trabajadores de lotes estén en marcha."""
+    monkeypatch.setattr(servicio_transcripcion, "motor", MotorDuracion())
+    # Sin caché, para no reutilizar transcripciones de otras pruebas con el mismo audio
+    monkeypatch.setattr(cache_transcripciones, "capacidad", 0)
+    with TestClient(app) as cliente:
+        yield cliente
+
+def esperar_lote(cliente, id_lote: str, tiempo_maximo: float = 30.0) -> dict:
+    """Consulta el lote hasta que termina."""
+    limite = time.time() + tiempo_maximo
+    while time.time() < limite:
+        estado = cliente.get(f"/api/v1/transcribir/lote/{id_lote}").json()
+        if estado["estado"] == "completado":
+            return estado
+        time.sleep(0.05)
+    raise AssertionError("El lote no terminó a tiempo")
+
+def crear_zip(archivos: dict) -> bytes:
+    """Crea un zip en memoria con los archivos indicados."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archivo_zip:
+        for nombre, contenido in archivos.items():
+            archivo_zip.writestr(nombre, contenido)
+    return buffer.getvalue()
+
+def test_lote_por_sondeo(cliente_lotes):
+    """Cada archivo del lote se transcribe y los inválidos fallan sin afectar al resto."""
+    respuesta = cliente_lotes.post("/api/v1/transcribir/lote", files=[
+        ("archivos", ("uno.wav", generar_wav(1.0), "audio/wav")),
+        ("archivos", ("dos.wav", generar_wav(2.0), "audio/wav")),
+        ("archivos", ("roto.wav", b"RIFF\0\0\0\0WAVE" + b"corrupto" * 10, "audio/wav")),
+    ])
+    assert respuesta.status_code == 202
+    assert respuesta.json()["total"] == 3
+
+    estado = esperar_lote(cliente_lotes, respuesta.json()["id"])
+    archivos = {a["nombre"]: a for a in estado["archivos"]}
+    assert archivos["uno.wav"]["texto"] == "1.0s"
+    assert archivos["dos.wav"]["texto"] == "2.0s"
+    assert archivos["roto.wav"]["estado"] == "fallido"
+    assert estado["completados"] == 2
+    assert estado["fallidos"] == 1
+
+def test_lote_zip_y_eventos(cliente_lotes):
+    """Los audios de un zip se encolan y el flujo de eventos termina con el resumen."""
+    contenido_zip = crear_zip({
+        "carpeta/a.wav": generar_wav(1.0),
+        "b.wav": generar_wav(1.0),
+        "__MACOSX/._a.wav": b"metadatos",
+    })
+    respuesta = cliente_lotes.post("/api/v1/transcribir/lote", files=[
+        ("archivos", ("audios.zip", contenido_zip, "application/zip")),
+    ])
+    assert respuesta.status_code == 202
+    id_lote = respuesta.json()["id"]
+    assert [a["nombre"] for a in respuesta.json()["archivos"]] == ["a.wav", "b.wav"]
+
+    eventos = []
+    with cliente_lotes.stream("GET", f"/api/v1/transcribir/lote/{id_lote}/eventos") as flujo:
+        assert flujo.headers["content-type"].startswith("text/event-stream")
+        tipo = None
+        for linea in flujo.iter_lines():
+            if linea.startswith("event: "):
+                tipo = linea[len("event: "):]
+            elif linea.startswith("data: "):
+                eventos.append((tipo, json.loads(linea[len("data: "):])))
+
+    assert eventos[0][0] == "estado"
+    assert eventos[-1][0] == "fin"
+    assert eventos[-1][1]["completados"] == 2
+
+def test_lote_inexistente(cliente_lotes):
+    """Un identificador desconocido devuelve 404."""
+    assert cliente_lotes.get("/api/v1/transcribir/lote/desconocido").status_code == 404
+    assert cliente_lotes.get("/api/v1/transcribir/lote/desconocido/eventos").status_code == 404
+
+def test_extraer_zip_limita_archivos_y_tamano(tmp_path):
+    """El zip no puede superar el número de archivos ni el tamaño por archivo."""
+    audio = generar_wav(0.1)
+    ruta = tmp_path / "audios.zip"
+    ruta.write_bytes(crear_zip({"a.wav": audio, "b.wav": audio}))
+
+    with pytest.raises(ErrorFormatoAudio):
+        extraer_zip(str(ruta), str(tmp_path), max_archivos=1, tamano_max=len(audio))
+    with pytest.raises(ErrorFormatoAudio):
+        extraer_zip(str(ruta), str(tmp_path), max_archivos=10, tamano_max=len(audio) - 1)
+    assert len(extraer_zip(str(ruta), str(tmp_path), max_archivos=10, tamano_max=len(audio))) == 2
+
+def test_extraer_zip_omite_entradas_que_no_son_audio(tmp_path):
+    """Las entradas sin cabecera de audio reconocida no se extraen, tengan la extensión que tengan."""
+    ruta = tmp_path / "audios.zip"
+    ruta.write_bytes(crear_zip({
+        "a.wav": generar_wav(0.1),
+        "leeme.txt": b"instrucciones",
+        "falso.wav": b"MZ\x90\x00" + b"\x00" * 64,
+    }))
+
+    extraidos = extraer_zip(str(ruta), str(tmp_path), max_archivos=10, tamano_max=1024 * 1024)
+    assert [nombre for nombre, _ in extraidos] == ["a.wav"]
+    assert sorted(os.listdir(tmp_path)) == sorted(["audios.zip", os.path.basename(extraidos[0][1])])
+
+def test_purgar_antiguos_conserva_lotes_activos(tmp_path, monkeypatch):
+    """La purga de temporales no borra el directorio de un lote en curso aunque sea antiguo."""
+    gestor_temporales = GestorRecursosTemporales(str(tmp_path), intervalo_reintento=0.05, antiguedad_maxima=3600)
+    monkeypatch.setattr(trabajos_lote, "gestor_recursos", gestor_temporales)
+    gestor = GestorLotes(trabajadores=1, max_archivos=10, retencion=0, max_activos=4)
+
+    trabajo = gestor.crear_trabajo()
+    abandonado = tmp_path / "solicitud_abandonada"
+    abandonado.mkdir()
+    antiguo = time.time() - 7200
+    os.utime(trabajo.directorio, (antiguo, antiguo))
+    os.utime(abandonado, (antiguo, antiguo))
+
+    gestor_temporales.iniciar()
+    gestor_temporales.detener()
+    assert not abandonado.exists()
+    assert os.path.isdir(trabajo.directorio)
+
+    # Al expirar los resultados del lote, su directorio sí se libera
+    trabajo.finalizado = antiguo
+    gestor.purgar_expirados()
+    gestor_temporales.detener()
+    assert not os.path.exists(trabajo.directorio)
+
+def test_crear_trabajo_limita_lotes_activos(tmp_path, monkeypatch):
+    """Con el máximo de lotes sin terminar, los nuevos se rechazan hasta que alguno termina."""
+    monkeypatch.setattr(trabajos_lote, "gestor_recursos", GestorRecursosTemporales(str(tmp_path)))
+    gestor = GestorLotes(trabajadores=1, max_archivos=10, retencion=3600, max_activos=2)
+
+    primero = gestor.crear_trabajo()
+    gestor.crear_trabajo()
+    with pytest.raises(ErrorColaLlena):
+        gestor.crear_trabajo()
+
+    primero.finalizado = time.time()
+    gestor.crear_trabajo()
+
+def test_lote_rechazado_con_demasiados_lotes_activos(cliente_lotes, monkeypatch):
+    """La ruta de lotes responde 429 cuando se alcanza el máximo de lotes en curso."""
+    monkeypatch.setattr(trabajos_lote.gestor_lotes, "max_activos", 0)
+    respuesta = cliente_lotes.post("/api/v1/transcribir/lote", files=[
+        ("archivos", ("uno.wav", generar_wav(1.0), "audio/wav")),
+    ])
+    assert respuesta.status_code == 429
+    assert respuesta.headers["retry-after"] == "1"
@@ -0,0 +1,90 @@
+"""
+Pruebas para la segmentación y la transcripción en paralelo de audios largos.
+"""
+import asyncio
+import time
+import numpy as np
+import pytest
+
+from src.utils import segmentar_pcm, AudioDecodificado, FormatoPCM
+from src.services import transcripcion_paralela
+from src.services.motores_transcripcion import MotorTranscripcionBase, ResultadoMotor
+from src.services.transcripcion_paralela import (
+    combinar_confianzas,
+    unir_transcripciones,
+    transcribir_en_paralelo
+)
+
+FRECUENCIA = 16000
+
+def generar_pcm(segundos_voz: list, silencio: float = 0.5) -> bytes:
+    """Genera tramos de tono separados por silencios, como PCM de 16 bits."""
+    rng = np.random.default_rng(0)
+    partes = []
+    for duracion in segundos_voz:
+        t = np.arange(int(duracion * FRECUENCIA)) / FRECUENCIA
+        partes.append(np.sin(2 * np.pi * 300 * t) * 8000)
+        partes.append(rng.normal(0, 20, int(silencio * FRECUENCIA)))
+    return np.concatenate(partes).astype(np.int16).tobytes()
+
+def test_segmentar_pcm_corta_en_silencios():
+    """En modo silencio los cortes caen en las pausas y no hay solapamiento."""
+    pcm = generar_pcm([8, 8, 8])
+    limites = segmentar_pcm(pcm, FRECUENCIA, duracion_segmento=10000, solapamiento=1000)
+    
+    assert len(limites) == 3
+    for numero, ((_, fin), (inicio, _)) in enumerate(zip(limites, limites[1:]), start=1):
+        assert fin == inicio
+        # El corte está dentro de la pausa de 0.5 s que sigue a cada tramo de 8 s
+        assert 8.5 * numero - 0.5 <= fin / FRECUENCIA <= 8.5 * numero
+
+def test_segmentar_pcm_fija_con_solapamiento():
+    """En modo fijo los segmentos se solapan la duración indicada."""
+    pcm = generar_pcm([25], silencio=0)
+    limites = segmentar_pcm(pcm, FRECUENCIA, duracion_segmento=10000, solapamiento=1000, modo="fija")
+    
+    assert limites[0] == (0, 10 * FRECUENCIA)
+    assert limites[1][0] == 9 * FRECUENCIA
+    assert limites[-1][1] == 25 * FRECUENCIA
+
+def test_unir_transcripciones_elimina_solapamiento():
+    """El texto repetido por el solapamiento solo aparece una vez."""
+    texto = unir_transcripciones(
+        ["hola a todos los", "Todos los presentes, bienvenidos", "bienvenidos al curso"],
+        [False, True, True]
+    )
+    assert texto == "hola a todos los presentes, bienvenidos al curso"
+
+def test_unir_transcripciones_sin_solapamiento_conserva_repeticiones():
+    """Sin solapamiento no se eliminan palabras repetidas legítimas."""
+    assert unir_transcripciones(["no", "no"], [False, False]) == "no no"
+
+def test_combinar_confianzas_ponderada_por_duracion():
+    """Los segmentos largos pesan más y los que no informan confianza se ignoran."""
+    assert combinar_confianzas([0.9, 0.6, None], [1, 2, 5]) == pytest.approx(0.7)
+    assert combinar_confianzas([None, None], [1, 1]) is None
+
+def test_transcribir_en_paralelo(monkeypatch):
+    """Los segmentos se transcriben de forma concurrente y se unen en orden."""
+    class MotorLento(MotorTranscripcionBase):
+        def transcribir(self, audio, opciones=None):
+            return self.transcribir_detallado(audio, opciones).texto
+        
+        def transcribir_detallado(self, audio, opciones=None):
+            time.sleep(0.2)
+            segundos = len(audio.frame_data) // (2 * FRECUENCIA)
+            return ResultadoMotor(f"{segundos}s", 0.9 if segundos < 10 else 0.5)
+    
+    monkeypatch.setattr(transcripcion_paralela.servicio_transcripcion, "motor", MotorLento())
+    monkeypatch.setattr(transcripcion_paralela.configuracion, "umbral_audio_largo", 5.0)
+    monkeypatch.setattr(transcripcion_paralela.configuracion, "duracion_segmento", 10.0)
+    monkeypatch.setattr(transcripcion_paralela.configuracion, "segmentos_concurrentes", 4)
+    
+    audio = AudioDecodificado(generar_pcm([8, 8, 8, 8]), FormatoPCM(FRECUENCIA, 1, 2))
+    inicio = time.monotonic()
+    resultado = asyncio.run(transcribir_en_paralelo(audio, {}))
+    transcurrido = time.monotonic() - inicio
+    
+    assert resultado.texto.split() == ["8s", "8s", "8s", "8s"]
+    assert resultado.confianza == pytest.approx(0.9)
+    assert transcurrido < 0.6
@@ -0,0 +1,142 @@
+"""
+Pruebas para la transcripción en tiempo real por WebSocket.
+"""
+import subprocess
+import pytest
+from pydub import AudioSegment
+
+from src.services import servicio_transcripcion, transcripcion_stream
+from src.services.motores_transcripcion import MotorTranscripcionBase
+from src.utils import FormatoPCM
+from src.utils.audio_config import configurar_ffmpeg
+from src.utils.vad import DetectorActividadVoz, estimar_piso_ruido
+
+from .test_transcripcion_paralela import generar_pcm, FRECUENCIA
+
+class MotorDuracion(MotorTranscripcionBase):
+    """Motor de prueba que devuelve la duración del audio recibido."""
+    def transcribir(self, audio, opciones=None):
+        return f"{len(audio.frame_data) / (2 * audio.sample_rate):.1f}s"
+
+@pytest.fixture
+def motor_prueba(monkeypatch):
+    """Sustituye el motor de transcripción por uno local sin red."""
+    monkeypatch.setattr(servicio_transcripcion, "motor", MotorDuracion())
+
+def recibir_hasta_fin(ws) -> list:
+    """Recibe mensajes hasta el mensaje de fin."""
+    mensajes = []
+    while True:
+        mensaje = ws.receive_json()
+        mensajes.append(mensaje)
+        if mensaje["tipo"] == "fin":
+            return mensajes
+
+def test_detector_actividad_voz_separa_enunciados():
+    """Cada tramo de voz seguido de un silencio suficiente forma un enunciado."""
+    detector = DetectorActividadVoz(silencio_cierre=500, relleno=0)
+    pcm = generar_pcm([1.0, 2.0], silencio=1.0)
+    
+    enunciados = []
+    for i in range(0, len(pcm), 3200):
+        enunciados.extend(detector.procesar(pcm[i:i + 3200]))
+    assert detector.finalizar() is None
+    
+    duraciones = [len(e) / (2 * FRECUENCIA) for e in enunciados]
+    assert len(duraciones) == 2
+    # Voz más el silencio de cierre
+    assert duraciones[0] == pytest.approx(1.5, abs=0.1)
+    assert duraciones[1] == pytest.approx(2.5, abs=0.1)
+
+def test_stream_pcm(cliente_prueba, motor_prueba):
+    """Un flujo PCM produce un final por enunciado, en orden."""
+    pcm = generar_pcm([1.0, 1.0], silencio=1.0)
+    
+    with cliente_prueba.websocket_connect("/api/v1/transcribir/stream") as ws:
+        ws.send_json({"formato": "pcm", "opciones": {"idioma": "es-ES"}})
+        for i in range(0, len(pcm), 3200):
+            ws.send_bytes(pcm[i:i + 3200])
+        ws.send_json({"evento": "fin"})
+        mensajes = recibir_hasta_fin(ws)
+    
+    finales = [m for m in mensajes if m["tipo"] == "final"]
+    assert [m["indice"] for m in finales] == [0, 1]
+    assert all(m["texto"] for m in finales)
+
+def test_stream_webm(cliente_prueba, motor_prueba):
+    """Los fragmentos webm se decodifican de forma incremental con ffmpeg."""
+    configurar_ffmpeg()
+    webm = subprocess.run(
+        [AudioSegment.converter, "-f", "s16le", "-ar", str(FRECUENCIA), "-ac", "1", "-i", "pipe:0",
+         "-c:a", "libopus", "-f", "webm", "pipe:1"],
+        input=generar_pcm([1.5, 1.5], silencio=1.0),
+        capture_output=True,
+        check=True
+    ).stdout
+    
+    with cliente_prueba.websocket_connect("/api/v1/transcribir/stream") as ws:
+        for i in range(0, len(webm), 2000):
+            ws.send_bytes(webm[i:i + 2000])
+        ws.send_json({"evento": "fin"})
+        mensajes = recibir_hasta_fin(ws)
+    
+    finales = [m for m in mensajes if m["tipo"] == "final"]
+    assert len(finales) == 2
+
+def test_stream_webm_en_formato_del_motor(cliente_prueba, monkeypatch):
+    """El flujo se decodifica directamente a la frecuencia nativa del motor activo."""
+    class MotorOchoKHz(MotorDuracion):
+        formato_nativo = FormatoPCM(8000, 1, 2)
+        frecuencias = []
+
+        def transcribir(self, audio, opciones=None):
+            self.frecuencias.append(audio.sample_rate)
+            return super().transcribir(audio, opciones)
+
+    motor = MotorOchoKHz()
+    monkeypatch.setattr(servicio_transcripcion, "motor", motor)
+    configurar_ffmpeg()
+    webm = subprocess.run(
+        [AudioSegment.converter, "-f", "s16le", "-ar", str(FRECUENCIA), "-ac", "1", "-i", "pipe:0",
+         "-c:a", "libopus", "-f", "webm", "pipe:1"],
+        input=generar_pcm([1.5], silencio=1.0),
+        capture_output=True,
+        check=True
+    ).stdout
+    
+    with cliente_prueba.websocket_connect("/api/v1/transcribir/stream") as ws:
+        ws.send_bytes(webm)
+        ws.send_json({"evento": "fin"})
+        mensajes = recibir_hasta_fin(ws)
+    
+    finales = [m for m in mensajes if m["tipo"] == "final"]
+    assert len(finales) == 1
+    assert set(motor.frecuencias) == {8000}
+    assert finales[0]["texto"] == f"{finales[0]['duracion']:.1f}s"
+    assert finales[0]["duracion"] == pytest.approx(2.0, abs=0.5)
+
+def test_estimar_piso_ruido_sin_consumir_audio():
+    """El ruido de fondo se estima sobre todo el buffer aunque empiece con voz."""
+    pcm = generar_pcm([2.0], silencio=1.0)
+    piso = estimar_piso_ruido(pcm)
+    
+    detector = DetectorActividadVoz()
+    assert piso < detector.umbral_minimo
+    assert estimar_piso_ruido(b"") == 0.0
+
+def test_piso_ruido_recordado_por_dispositivo(cliente_prueba, motor_prueba):
+    """Una nueva sesión del mismo dispositivo empieza con el ruido de fondo ya estimado."""
+    pcm = generar_pcm([1.0], silencio=1.0)
+    
+    with cliente_prueba.websocket_connect("/api/v1/transcribir/stream") as ws:
+        ws.send_json({"formato": "pcm", "dispositivo": "mic-prueba"})
+        ws.send_bytes(pcm)
+        ws.send_json({"evento": "fin"})
+        recibir_hasta_fin(ws)
+    
+    piso = transcripcion_stream._pisos_ruido["mic-prueba"]
+    assert 0 < piso < DetectorActividadVoz().umbral_minimo
+    
+    # Sin ajuste de ruido el umbral es fijo
+    fijo = DetectorActividadVoz(piso_ruido=1000.0, adaptativo=False)
+    assert fijo.umbral == fijo.umbral_minimo
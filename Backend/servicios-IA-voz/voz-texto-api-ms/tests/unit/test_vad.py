@@ -0,0 +1,100 @@
+"""
+Pruebas para el recorte de silencios antes de transcribir.
+"""
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from src.services import servicio_transcripcion, cache_transcripciones
+from src.services.motores_transcripcion import MotorTranscripcionBase
+from src.utils.vad import recortar_silencios, DetectorActividadVoz, EstadisticasRecorte
+
+FRECUENCIA = 16000
+
+def generar_audio(tramos: list) -> bytes:
+    """Genera PCM a partir de tramos (es_voz, segundos) con tono o ruido de fondo."""
+    rng = np.random.default_rng(1)
+    partes = []
+    for es_voz, duracion in tramos:
+        muestras = int(duracion * FRECUENCIA)
+        if es_voz:
+            t = np.arange(muestras) / FRECUENCIA
+            partes.append(np.sin(2 * np.pi * 300 * t) * 8000)
+        else:
+            partes.append(rng.normal(0, 20, muestras))
+    return np.concatenate(partes).astype(np.int16).tobytes()
+
+def test_recorta_silencio_inicial_final_y_pausas():
+    """Se elimina el silencio de los extremos y las pausas largas se acortan."""
+    pcm = generar_audio([(False, 2.0), (True, 1.0), (False, 3.0), (True, 1.0), (False, 2.0)])
+    recortado, eliminado_ms = recortar_silencios(pcm, FRECUENCIA, relleno=300, silencio_maximo=1000)
+    
+    duracion = len(recortado) / (2 * FRECUENCIA)
+    # 2 s de voz + 0.3 s de relleno en cada lado de cada tramo + 1 s de pausa interna
+    assert duracion == pytest.approx(2.0 + 4 * 0.3 + 1.0, abs=0.1)
+    assert eliminado_ms == pytest.approx(9000 - duracion * 1000, abs=1)
+
+def test_pausas_cortas_intactas():
+    """Las pausas más cortas que el máximo no se modifican."""
+    pcm = generar_audio([(True, 1.0), (False, 0.5), (True, 1.0)])
+    recortado, eliminado_ms = recortar_silencios(pcm, FRECUENCIA)
+    assert eliminado_ms < 40
+    assert len(pcm) - len(recortado) < 2 * FRECUENCIA * 0.04
+
+def test_audio_mas_corto_que_el_relleno():
+    """Un audio con menos tramas que el núcleo del relleno se recorta sin errores."""
+    # 0,6 s son 20 tramas de 30 ms; el núcleo de 300 ms de relleno abarca 21
+    pcm = generar_audio([(False, 0.4), (True, 0.2)])
+    recortado, eliminado_ms = recortar_silencios(pcm, FRECUENCIA, relleno=300)
+    
+    # Se conservan la voz y los 300 ms de relleno previos; cae el inicio del silencio
+    assert len(recortado) / (2 * FRECUENCIA) == pytest.approx(0.2 + 0.3, abs=0.04)
+    assert eliminado_ms == pytest.approx(100, abs=40)
+
+def test_transcribir_audio_de_menos_de_un_segundo(cliente_prueba, monkeypatch):
+    """Una orden de voz corta (0,4 s con silencio inicial) se transcribe con normalidad."""
+    class MotorFijo(MotorTranscripcionBase):
+        def transcribir(self, audio, opciones=None):
+            return "hola"
+    
+    monkeypatch.setattr(servicio_transcripcion, "motor", MotorFijo())
+    monkeypatch.setattr(cache_transcripciones, "capacidad", 0)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(FRECUENCIA)
+        wav.writeframes(generar_audio([(False, 0.2), (True, 0.2)]))
+    
+    respuesta = cliente_prueba.post(
+        "/api/v1/transcribir", files={"archivo": ("orden.wav", buffer.getvalue(), "audio/wav")}
+    )
+    assert respuesta.status_code == 200
+    assert respuesta.json()["texto"] == "hola"
+
+def test_detector_calibra_el_ruido_con_el_primer_fragmento():
+    """El ruido de fondo inicial sale de las pausas del primer fragmento, no de la voz."""
+    solo_voz = DetectorActividadVoz()
+    solo_voz.procesar(generar_audio([(True, 0.5)]))
+    assert solo_voz.piso_ruido is None
+    
+    detector = DetectorActividadVoz()
+    detector.procesar(generar_audio([(True, 0.3), (False, 0.7)]))
+    assert 0 < detector.piso_ruido < 40
+
+def test_sin_voz_devuelve_el_audio_intacto():
+    """Si no se detecta voz el audio no se modifica y decide el motor."""
+    pcm = generar_audio([(False, 2.0)])
+    assert recortar_silencios(pcm, FRECUENCIA) == (pcm, 0)
+
+def test_estadisticas_recorte():
+    """Las estadísticas acumulan el audio total y el eliminado."""
+    estadisticas = EstadisticasRecorte()
+    estadisticas.registrar(10000, 2500)
+    estadisticas.registrar(10000, 500)
+    datos = estadisticas.to_dict()
+    assert datos["solicitudes"] == 2
+    assert datos["audio_recortado_ms"] == 3000
+    assert datos["proporcion_recortada"] == pytest.approx(0.15)